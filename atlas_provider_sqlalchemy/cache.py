@@ -0,0 +1,424 @@
+"""Persistent, content-addressed cache for the DDL emitted by `load`.
+
+An entry is keyed by the provider and SQLAlchemy versions, the dialect, the
+loading flags and the content of every Python file found under the requested
+paths.  Each entry also records the project files that were imported while the
+models were loaded (e.g. a shared declarative base living outside `--path`),
+and is only replayed if all of them are unchanged.
+"""
+
+import hashlib
+import json
+import os
+import sys
+import sysconfig
+import threading
+import time
+from contextlib import contextmanager
+from importlib import metadata as importlib_metadata
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Iterable, Iterator, TextIO
+
+import sqlalchemy as sa
+
+from atlas_provider_sqlalchemy.output import atomic_open
+from atlas_provider_sqlalchemy.scan import SourceFile
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+CACHE_FORMAT_VERSION = "2"
+
+
+def provider_version() -> str:
+    """Get the installed version of the provider."""
+
+    try:
+        return importlib_metadata.version("atlas-provider-sqlalchemy")
+    except importlib_metadata.PackageNotFoundError:
+        return "dev"
+
+
+def file_digest(file_path: str | Path) -> str:
+    """Get the sha256 hex digest of a file's content."""
+
+    with open(file_path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+@contextmanager
+def _file_lock(path: Path) -> Iterator[None]:
+    """Hold an exclusive lock on the file at `path`, created if needed."""
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if fcntl is None:
+        yield
+        return
+    with open(path, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _read_json(path: Path, version: str, field: str) -> dict[str, Any]:
+    """Read the entries of a cache file, or none if it's missing, invalid or
+    written by another version."""
+
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+        if data.get("version") == version and isinstance(data[field], dict):
+            return data[field]
+    except (OSError, ValueError, KeyError, AttributeError):
+        pass
+    return {}
+
+
+def _library_prefixes() -> tuple[str, ...]:
+    paths = sysconfig.get_paths()
+    return tuple(
+        os.path.join(os.path.abspath(paths[name]), "")
+        for name in ("stdlib", "platstdlib", "purelib", "platlib")
+        if name in paths
+    )
+
+
+def project_modules() -> dict[str, ModuleType]:
+    """Return the modules imported from source files of the project, excluding
+    the standard library and installed packages."""
+
+    prefixes = _library_prefixes()
+    modules = {}
+    for name, module in list(sys.modules.items()):
+        file = getattr(module, "__file__", None)
+        if (
+            file
+            and file.endswith(".py")
+            and not os.path.abspath(file).startswith(prefixes)
+        ):
+            modules[name] = module
+    return modules
+
+
+def imported_project_files(known_modules: Iterable[str]) -> list[Path]:
+    """Return the source files of the project modules imported since
+    `known_modules` was taken."""
+
+    known = set(known_modules)
+    files = {
+        os.path.abspath(str(module.__file__))
+        for name, module in project_modules().items()
+        if name not in known
+    }
+    return [Path(f) for f in sorted(files)]
+
+
+class OutputCache:
+    """On-disk cache of the `load` output, stored under `cache_dir`.
+
+    The key of an entry starts with a prefix identifying the paths, dialect
+    and flags it was loaded with.  Only the `KEEP_ENTRIES` most recently
+    stored entries with the same prefix are kept, the older ones are pruned
+    when an entry is stored.
+    """
+
+    KEEP_ENTRIES = 5
+
+    def __init__(self, cache_dir: str | Path):
+        self.cache_dir = Path(cache_dir)
+
+    def key(
+        self, scans: dict[Path, list[SourceFile]], dialect: str, *flags: object
+    ) -> str:
+        """Compute the cache key for loading the scanned paths with the given
+        dialect."""
+
+        h = hashlib.sha256()
+        for part in (
+            CACHE_FORMAT_VERSION,
+            provider_version(),
+            sa.__version__,
+            sys.version,
+            dialect,
+            *(repr(flag) for flag in flags),
+            *(str(p.absolute()) for p in scans),
+        ):
+            h.update(part.encode())
+            h.update(b"\0")
+        prefix = h.hexdigest()[:16]
+        for files in scans.values():
+            for file_path, source in files:
+                h.update(str(file_path).encode())
+                h.update(b"\0")
+                h.update(hashlib.sha256(source).digest())
+        return f"{prefix}-{h.hexdigest()}"
+
+    def _entry(self, key: str, suffix: str) -> Path:
+        return self.cache_dir / f"{key}{suffix}"
+
+    @contextmanager
+    def lock(self, key: str) -> Iterator[None]:
+        """Hold an exclusive lock on the entry, so that concurrent providers
+        compute it once and the others reuse the result."""
+
+        with _file_lock(self._entry(key, ".lock")):
+            yield
+
+    def output_path(self, key: str) -> Path:
+        """Path of the output stored for the key."""
+
+        return self._entry(key, ".sql")
+
+    def is_valid(self, key: str) -> bool:
+        """Check that an output is stored for the key, and that none of the
+        files it depends on changed since."""
+
+        try:
+            with open(self._entry(key, ".json"), "r") as f:
+                manifest = json.load(f)
+            for file, digest in manifest["dependencies"].items():
+                if file_digest(file) != digest:
+                    return False
+        except (OSError, ValueError, KeyError):
+            return False
+        return self.output_path(key).exists()
+
+    @contextmanager
+    def store(self, key: str, dependencies: Iterable[Path]) -> Iterator[TextIO]:
+        """Open the entry to write the output of a run to, and record the
+        files it depends on once the output is written."""
+
+        manifest = {
+            "dependencies": {str(p): file_digest(p) for p in dependencies},
+        }
+        with atomic_open(self.output_path(key)) as f:
+            yield f
+        with atomic_open(self._entry(key, ".json")) as f:
+            json.dump(manifest, f)
+        self._prune(key)
+
+    def _prune(self, key: str) -> None:
+        """Remove the oldest entries with the same prefix as the key, beyond
+        the `KEEP_ENTRIES` most recent ones."""
+
+        prefix, _, _ = key.partition("-")
+        modified: dict[str, float] = {}
+        for path in self.cache_dir.glob(f"{prefix}-*"):
+            try:
+                mtime = path.stat().st_mtime
+            except OSError:
+                continue
+            modified[path.stem] = max(mtime, modified.get(path.stem, mtime))
+        # The entry just stored is kept, whatever the resolution of mtimes.
+        modified.pop(key, None)
+        oldest = sorted(modified, key=modified.__getitem__)
+        for stale in oldest[: max(len(oldest) - self.KEEP_ENTRIES + 1, 0)]:
+            for suffix in (".sql", ".json", ".lock"):
+                self._entry(stale, suffix).unlink(missing_ok=True)
+
+
+class ParseCache:
+    """On-disk cache of the `(table_name, line_number)` pairs found by the
+    parser in each file, stored in a single JSON file under `cache_dir`.
+
+    An entry is only used if the size, modification time and content hash of
+    the file are unchanged.  Entries of files that no longer exist are evicted
+    when the cache is saved.  Providers sharing the cache merge their entries
+    into the file, under a lock.
+    """
+
+    FILE_NAME = "parse-cache.json"
+
+    def __init__(self, cache_dir: str | Path):
+        self.path = Path(cache_dir) / self.FILE_NAME
+        self._entries: dict[str, list[Any]] = _read_json(
+            self.path, CACHE_FORMAT_VERSION, "files"
+        )
+        # Entries stored since the last save.
+        self._changes: dict[str, list[Any]] = {}
+
+    def get(self, file: SourceFile) -> list[tuple[str, int]] | None:
+        """Return the cached tables of the file, or None if it changed."""
+
+        entry = self._entries.get(str(file.path.absolute()))
+        if entry is None:
+            return None
+        size, mtime_ns, digest, tables = entry
+        if (
+            size != len(file.source)
+            or mtime_ns != os.stat(file.path).st_mtime_ns
+            or digest != hashlib.sha256(file.source).hexdigest()
+        ):
+            return None
+        return [(name, line) for name, line in tables]
+
+    def put(self, file: SourceFile, tables: list[tuple[str, int]]) -> None:
+        """Store the tables found in the file."""
+
+        entry = [
+            len(file.source),
+            os.stat(file.path).st_mtime_ns,
+            hashlib.sha256(file.source).hexdigest(),
+            tables,
+        ]
+        self._entries[str(file.path.absolute())] = entry
+        self._changes[str(file.path.absolute())] = entry
+
+    def changes(self) -> dict[str, list[Any]]:
+        """Return the entries stored since the last save, to be merged into
+        the cache of another process."""
+
+        return self._changes
+
+    def merge(self, changes: dict[str, list[Any]]) -> None:
+        self._entries.update(changes)
+        self._changes.update(changes)
+
+    def save(self) -> None:
+        """Merge the entries stored since the last save into the file, and
+        evict the entries of deleted files."""
+
+        with _file_lock(self.path.with_suffix(".lock")):
+            # Other providers may have saved since the cache was read.
+            entries = _read_json(self.path, CACHE_FORMAT_VERSION, "files")
+            entries.update(self._changes)
+            deleted = [p for p in entries if not os.path.exists(p)]
+            for path in deleted:
+                del entries[path]
+            self._entries = entries
+            if self._changes or deleted:
+                data = {"version": CACHE_FORMAT_VERSION, "files": entries}
+                with atomic_open(self.path) as f:
+                    json.dump(data, f, separators=(",", ":"))
+            self._changes = {}
+
+
+def _today() -> int:
+    return int(time.time() // 86400)
+
+
+class CompiledCache:
+    """Cache of compiled `CREATE TABLE` and `CREATE INDEX` statements, keyed
+    by dialect and by the fingerprint of the statement (see `fingerprint`).
+
+    The cache is kept in memory, and stored in a single JSON file under
+    `cache_dir` if given.  Each statement records the day it was last used.
+    When the cache is saved, the statements unused for `MAX_AGE_DAYS` are
+    evicted, as are the least recently used ones beyond `MAX_ENTRIES` per
+    dialect, so providers loading different models can share the cache.
+    They merge their statements into the file, under a lock.
+
+    Compiled statements also depend on project code outside of the tables,
+    e.g. custom types or `@compiles` hooks.  The keys are prefixed with a
+    digest of the `dependencies`, the project files imported by the models
+    besides the model files, so a statement isn't replayed once one of them
+    changed.
+    """
+
+    FILE_NAME = "ddl-cache.json"
+    MAX_AGE_DAYS = 30
+    MAX_ENTRIES = 20000
+
+    def __init__(
+        self, cache_dir: str | Path | None = None, dependencies: Iterable[Path] = ()
+    ):
+        self.path = Path(cache_dir) / self.FILE_NAME if cache_dir else None
+        h = hashlib.sha256()
+        for file in sorted(str(p) for p in dependencies):
+            h.update(f"{file}\0{file_digest(file)}\0".encode())
+        self._prefix = f"{h.hexdigest()[:16]}:"
+        # The statements and the day they were last used, by dialect and key.
+        self._entries: dict[str, dict[str, list[Any]]] = {}
+        # Statements stored, or used on another day, since the last save.
+        self._changes: dict[str, dict[str, list[Any]]] = {}
+        # The warm server dumps concurrent requests with the same cache.
+        self._lock = threading.Lock()
+        if self.path is not None:
+            self._entries = _read_json(self.path, self._version(), "dialects")
+
+    @staticmethod
+    def _version() -> str:
+        # Compiled statements depend on the SQLAlchemy and dialect code.
+        return f"{CACHE_FORMAT_VERSION}:{provider_version()}:{sa.__version__}"
+
+    def get(self, dialect: str, key: str) -> str | None:
+        """Return the compiled statement, or None if it's not cached."""
+
+        key = self._prefix + key
+        with self._lock:
+            entry = self._entries.get(dialect, {}).get(key)
+            if entry is None:
+                return None
+            statement, day = entry
+            today = _today()
+            if day != today:
+                self._store(dialect, key, [statement, today])
+            return statement
+
+    def put(self, dialect: str, key: str, statement: str) -> None:
+        key = self._prefix + key
+        with self._lock:
+            self._store(dialect, key, [statement, _today()])
+
+    def _store(self, dialect: str, key: str, entry: list[Any]) -> None:
+        self._entries.setdefault(dialect, {})[key] = entry
+        self._changes.setdefault(dialect, {})[key] = entry
+
+    def changes(self) -> dict[str, dict[str, list[Any]]]:
+        """Return the statements stored or used since the last save, to be
+        merged into the cache of another process."""
+
+        with self._lock:
+            return self._changes
+
+    def merge(self, changes: dict[str, dict[str, list[Any]]]) -> None:
+        with self._lock:
+            for dialect, entries in changes.items():
+                for key, entry in entries.items():
+                    self._store(dialect, key, entry)
+
+    def save(self) -> None:
+        """Evict the old statements, and merge the statements stored or used
+        since the last save into the file."""
+
+        with self._lock:
+            if self.path is None:
+                self._evict(self._entries)
+                self._changes = {}
+                return
+            with _file_lock(self.path.with_suffix(".lock")):
+                # Other providers may have saved since the cache was read.
+                entries = _read_json(self.path, self._version(), "dialects")
+                for dialect, changes in self._changes.items():
+                    entries.setdefault(dialect, {}).update(changes)
+                evicted = self._evict(entries)
+                self._entries = entries
+                if self._changes or evicted:
+                    data = {"version": self._version(), "dialects": entries}
+                    with atomic_open(self.path) as f:
+                        json.dump(data, f, separators=(",", ":"))
+                self._changes = {}
+
+    def _evict(self, dialects: dict[str, dict[str, list[Any]]]) -> bool:
+        """Remove the statements unused for too long, and the least recently
+        used ones beyond the maximum number of entries.  Returns whether any
+        statement was removed."""
+
+        oldest = _today() - self.MAX_AGE_DAYS
+        evicted = False
+        for dialect, entries in dialects.items():
+            kept = {key: entry for key, entry in entries.items() if entry[1] >= oldest}
+            if len(kept) > self.MAX_ENTRIES:
+                # Sorting is stable, so the last stored statements of a day
+                # are kept first.
+                recent = sorted(kept.items(), key=lambda item: item[1][1])
+                kept = dict(recent[-self.MAX_ENTRIES :])
+            if len(kept) != len(entries):
+                dialects[dialect] = kept
+                evicted = True
+        return evicted
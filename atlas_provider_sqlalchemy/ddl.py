@@ -1,13 +1,37 @@
-import os
+import gc
 import sys
+import hashlib
 import importlib
+import importlib.machinery
 import importlib.util
-import inspect
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack, contextmanager, nullcontext
 from pathlib import Path
-from typing import Any, Protocol
-from atlas_provider_sqlalchemy import parser
+from types import FrameType, ModuleType
+from typing import (
+    Any,
+    Iterable,
+    Iterator,
+    NamedTuple,
+    Protocol,
+    Sequence,
+    TextIO,
+    cast,
+)
+from atlas_provider_sqlalchemy import parser, profiling
+from atlas_provider_sqlalchemy.cache import CompiledCache, ParseCache
+from atlas_provider_sqlalchemy.directives import Directives
+from atlas_provider_sqlalchemy.fingerprint import statement_fingerprint
+from atlas_provider_sqlalchemy.output import DDLWriter
+from atlas_provider_sqlalchemy.scan import SourceFile, scan_directory
+from atlas_provider_sqlalchemy.stubs import stubbing
 
 import sqlalchemy as sa
+from sqlalchemy import event
+from sqlalchemy.schema import AddConstraint, CreateIndex
 
 
 class DBTableDesc(Protocol):
@@ -24,6 +48,20 @@ class ModelsNotFoundError(Exception):
     pass
 
 
+class LoadedModule(NamedTuple):
+    """A model file executed by `get_metadata`."""
+
+    name: str
+    digest: str
+    module: ModuleType
+    # Tables created by the module's own code.
+    tables: list[sa.Table]
+
+
+# Modules registered by `get_metadata`, indexed by absolute file path.
+_loaded_modules: dict[Path, LoadedModule] = {}
+
+
 def sqlalchemy_version() -> tuple[int, ...]:
     """Get major and minor version of sqlalchemy."""
 
@@ -39,40 +77,76 @@ def create_mock_engine(url: str, executor: Any) -> Any:
         return sa.create_mock_engine(url, executor)
 
 
-def get_metadata(db_dir: Path, skip_errors: bool = False) -> sa.MetaData:
+def get_metadata(
+    db_dir: Path,
+    skip_errors: bool = False,
+    files: list[SourceFile] | None = None,
+    reuse_unchanged: bool = False,
+    packages: bool = False,
+    stubs: Sequence[str] = (),
+) -> sa.MetaData:
     """Walk the directory tree starting at the root, import all models and
     tables, and return metadata for one of them, as they all keep a reference
     to the `MetaData` object.  The way SQLAlchemy works, you must import all
     models and tables in order for them to be registered in metadata.
-    """
 
-    metadata: set[sa.MetaData] = set()
+    If `files` is given, the modules are executed from the already scanned
+    sources instead of walking the directory again.  If `reuse_unchanged` is
+    set, files whose content did not change since they were last loaded in
+    this process are not executed again.
+
+    If `packages` is set, files in a package or importable from `sys.path`
+    are imported under their real dotted name, adding the directory of their
+    top-level package to `sys.path` while loading if needed.  A file also
+    imported by another model file is then executed only once.
 
-    for root, _, _ in os.walk(db_dir):
-        python_file_paths = Path(root).glob("*.py")
-        for file_path in python_file_paths:
+    The modules matching the `stubs` patterns are imported as stub modules,
+    see `atlas_provider_sqlalchemy.stubs`.
+    """
+
+    if files is None:
+        files = scan_directory(db_dir)
+
+    # Unregister the modules of the files that are executed again.
+    digests: dict[Path, str] = {}
+    stale = []
+    for file_path, source in files:
+        abs_file_path = file_path.absolute()
+        digest = digests[abs_file_path] = hashlib.sha256(source).hexdigest()
+        if abs_file_path in _loaded_modules and not (
+            reuse_unchanged and _is_reusable(_loaded_modules[abs_file_path], digest)
+        ):
+            stale.append(abs_file_path)
+    unload_modules(stale)
+
+    # Invalidate import caches once to pick up files changed since the last
+    # load, e.g. after a git branch switch.
+    importlib.invalidate_caches()
+
+    specs: dict[str, importlib.machinery.ModuleSpec | None] = {}
+    # The tables of the loaded modules, and of the modules they import.
+    loaded: list[tuple[ModuleType, list[sa.Table]]] = []
+    with (
+        stubbing(stubs) if stubs else nullcontext(),
+        _record_module_tables() as module_tables,
+        _extended_sys_path() as package_roots,
+    ):
+        for file_path, source in files:
+            abs_file_path = file_path.absolute()
+            digest = digests[abs_file_path]
+            if abs_file_path in _loaded_modules:
+                reused = _loaded_modules[abs_file_path]
+                loaded.append((reused.module, reused.tables))
+                continue
             try:
-                # Use a unique module name that includes file modification time
-                # to avoid caching issues that can occur after git branch switches
-                prefix = f"atlas_dynamic_module_{abs(hash(str(file_path.absolute())))}"
-                file_mtime = int(file_path.stat().st_mtime)
-                unique_module_name = f"{prefix}_{file_mtime}"
-
-                # Clear any existing module with similar names from sys.modules
-                for name in list(sys.modules):
-                    if name.startswith(prefix):
-                        del sys.modules[name]
-
-                # Also invalidate import caches to force fresh loading
-                importlib.invalidate_caches()
-
-                module_spec = importlib.util.spec_from_file_location(
-                    unique_module_name,
-                    file_path,
-                )
-                if module_spec and module_spec.loader:
-                    module = importlib.util.module_from_spec(module_spec)
-                    module_spec.loader.exec_module(module)
+                with profiling.timed(profiling.IMPORT, str(file_path)):
+                    module = None
+                    if packages:
+                        module = _import_module(
+                            abs_file_path, digest, module_tables, specs, package_roots
+                        )
+                    if module is None:
+                        module = _exec_module(abs_file_path, file_path, source, digest)
             except Exception as e:
                 if skip_errors:
                     continue
@@ -80,72 +154,632 @@ def get_metadata(db_dir: Path, skip_errors: bool = False) -> sa.MetaData:
                 raise ModuleImportError(
                     f"{e.__class__.__name__}: {str(e)} in {file_path}"
                 )
+            loaded.append((module, module_tables.get(module.__name__, [])))
 
-            ms = {
-                v.metadata
-                for (_, v) in inspect.getmembers(module)
-                if hasattr(v, "metadata") and isinstance(v.metadata, sa.MetaData)
-            }
-            metadata.update(ms)
-
-    if not metadata:
+    metadata = find_metadata(loaded, module_tables)
+    if metadata is None:
         raise ModelsNotFoundError(
             "Found no sqlalchemy models/tables in the directory tree."
         )
 
-    return metadata.pop()
-
-
-def get_file_directives(db_dir: Path, metadata: sa.MetaData) -> list[str]:
-    """Get all file directives from the given directory."""
-    directives = []
-    for root, _, files in os.walk(db_dir):
-        for file in files:
-            if file.endswith(".py"):
-                # Parse the file for directives
-                file_path = Path(root) / file
-                abs_file_path = file_path.absolute()
-                visitor = parser.parse_file(file_path)
-                # Extract table directives
-                if visitor.tables:
-                    for table_name, (line_number, _) in visitor.tables.items():
-                        # If table_name is not in metadata, skip it
-                        if table_name not in metadata.tables:
-                            continue
-                        directive = f"atlas:pos {table_name}[type=table] {abs_file_path}:{line_number}"
-                        directives.append(directive)
+    return metadata
+
+
+def find_metadata(
+    loaded: list[tuple[ModuleType, list[sa.Table]]],
+    module_tables: dict[str, list[sa.Table]],
+) -> sa.MetaData | None:
+    """Return the `MetaData` of the tables created by the loaded model
+    modules, given with the tables recorded while executing them, or else of
+    the tables created by the modules they imported.
+
+    The metadata is found from the tables attached while loading, rather
+    than by inspecting every member of the modules, as attribute access on
+    imported objects can be costly.
+    """
+
+    for module, tables in loaded:
+        # A module executed before the load, e.g. imported by the models of
+        # an earlier call, has no recorded tables.
+        for table in tables or _defined_tables(module):
+            return table.metadata
+    for tables in module_tables.values():
+        for table in tables:
+            return table.metadata
+    return None
+
+
+def _defined_tables(module: ModuleType) -> list[sa.Table]:
+    """Return the tables and the tables of the mapped classes defined as
+    attributes of a module, without calling any attribute getter."""
+
+    tables = []
+    for value in list(vars(module).values()):
+        if isinstance(value, sa.Table):
+            tables.append(value)
+        elif isinstance(value, type):
+            table = value.__dict__.get("__table__")
+            if isinstance(table, sa.Table):
+                tables.append(table)
+    return tables
+
+
+def _exec_module(
+    abs_file_path: Path, file_path: Path, source: bytes, digest: str
+) -> ModuleType:
+    """Execute the source of a model file as a new module and register it."""
+
+    # Use a unique module name that includes the file content hash to avoid
+    # caching issues that can occur after git branch switches
+    name = f"atlas_dynamic_module_{abs(hash(str(abs_file_path)))}_{digest[:16]}"
+    module_spec = importlib.util.spec_from_file_location(name, file_path)
+    if module_spec is None:
+        raise ImportError(f"Cannot load module from {file_path}")
+    module = importlib.util.module_from_spec(module_spec)
+    sys.modules[name] = module
+    try:
+        code = compile(source, str(file_path), "exec", dont_inherit=True)
+        with _record_tables(module.__dict__) as tables:
+            try:
+                exec(code, module.__dict__)
+            except BaseException:
+                # Remove the tables created before the error, so the fixed
+                # file can define them again with a shared declarative base.
+                _remove_tables(tables)
+                raise
+    except BaseException:
+        del sys.modules[name]
+        raise
+    _loaded_modules[abs_file_path] = LoadedModule(name, digest, module, tables)
+    return module
+
+
+def _import_module(
+    abs_file_path: Path,
+    digest: str,
+    module_tables: dict[str, list[sa.Table]],
+    specs: dict[str, importlib.machinery.ModuleSpec | None],
+    package_roots: list[str],
+) -> ModuleType | None:
+    """Import a model file under its real name and register it, adding the
+    directory of its top-level package to `sys.path` and `package_roots` if
+    needed.  Returns None if the file has no importable name."""
+
+    name = _module_name(abs_file_path, specs)
+    if name is None:
+        package_root = _package_root(abs_file_path)
+        if package_root is None:
+            return None
+        if package_root not in sys.path:
+            sys.path.append(package_root)
+            package_roots.append(package_root)
+        name = _module_name(abs_file_path, specs)
+        if name is None:
+            return None
+    module = importlib.import_module(name)
+    if os.path.abspath(getattr(module, "__file__", None) or "") != str(abs_file_path):
+        # The name belongs to another module, imported from elsewhere.
+        return None
+    # The module may have been executed earlier, imported by another model
+    # file, which recorded its tables.
+    tables = module_tables.get(name, [])
+    _loaded_modules[abs_file_path] = LoadedModule(name, digest, module, tables)
+    return module
+
+
+def _package_root(abs_file_path: Path) -> str | None:
+    """Return the directory containing the top-level package of a file, if
+    it is in a package."""
+
+    directory = abs_file_path.parent
+    if not (directory / "__init__.py").exists():
+        return None
+    while (directory.parent / "__init__.py").exists():
+        directory = directory.parent
+    return str(directory.parent)
+
+
+@contextmanager
+def _extended_sys_path() -> Iterator[list[str]]:
+    """Remove the entries appended to the yielded list from `sys.path` on
+    exit, so the package roots of the models don't outlive the load in a
+    process loading them repeatedly."""
+
+    entries: list[str] = []
+    try:
+        yield entries
+    finally:
+        for entry in entries:
+            if entry in sys.path:
+                sys.path.remove(entry)
+
+
+def _find_spec(
+    fullname: str, specs: dict[str, importlib.machinery.ModuleSpec | None]
+) -> importlib.machinery.ModuleSpec | None:
+    """Find the spec of a module on `sys.path` without executing its parent
+    packages, caching the results in `specs`."""
+
+    if fullname not in specs:
+        parent, _, _ = fullname.rpartition(".")
+        path = None
+        if parent:
+            parent_spec = _find_spec(parent, specs)
+            if parent_spec is None or not parent_spec.submodule_search_locations:
+                specs[fullname] = None
+                return None
+            path = list(parent_spec.submodule_search_locations)
+        specs[fullname] = importlib.machinery.PathFinder.find_spec(fullname, path)
+    return specs[fullname]
+
+
+def _module_name(
+    abs_file_path: Path, specs: dict[str, importlib.machinery.ModuleSpec | None]
+) -> str | None:
+    """Return the name a file is imported with from `sys.path`, if any."""
+
+    for entry in sys.path:
+        root = Path(entry or ".").absolute()
+        if not abs_file_path.is_relative_to(root):
+            continue
+        parts = list(abs_file_path.relative_to(root).with_suffix("").parts)
+        if parts and parts[-1] == "__init__":
+            parts.pop()
+        if not parts or not all(part.isidentifier() for part in parts):
+            continue
+        name = ".".join(parts)
+        spec = _find_spec(name, specs)
+        if spec is not None and spec.origin == str(abs_file_path):
+            return name
+    return None
+
+
+def unload_modules(abs_file_paths: Iterable[Path]) -> None:
+    """Unregister the loaded modules of the given files, so they are executed
+    again by the next `get_metadata` call."""
+
+    released = False
+    for abs_file_path in abs_file_paths:
+        if abs_file_path in _loaded_modules:
+            _release_module(abs_file_path)
+            released = True
+    if released:
+        # Classes are kept alive by reference cycles. Collect the released
+        # ones so they don't clash with the new classes in the registry of a
+        # shared declarative base.
+        gc.collect()
+
+
+def _is_reusable(loaded: LoadedModule, digest: str) -> bool:
+    """Check that a loaded module is up to date and its tables were not
+    removed from their `MetaData` since."""
+
+    return loaded.digest == digest and all(
+        table.metadata.tables.get(table.key) is table for table in loaded.tables
+    )
+
+
+def _release_module(abs_file_path: Path) -> None:
+    """Unregister a loaded module and remove the tables it created from their
+    `MetaData`, so the file can be executed again with a shared declarative
+    base."""
+
+    loaded = _loaded_modules.pop(abs_file_path)
+    sys.modules.pop(loaded.name, None)
+    # A module imported under its real name is also referenced by its package.
+    package, _, name = loaded.name.rpartition(".")
+    if package and getattr(sys.modules.get(package), name, None) is loaded.module:
+        delattr(sys.modules[package], name)
+    _remove_tables(loaded.tables)
+
+
+def _remove_tables(tables: Iterable[sa.Table]) -> None:
+    """Remove tables from their `MetaData`, unless they were replaced."""
+
+    for table in tables:
+        if table.metadata.tables.get(table.key) is table:
+            table.metadata.remove(table)
+
+
+@contextmanager
+def _record_tables(namespace: dict[str, Any]) -> Iterator[list[sa.Table]]:
+    """Record the tables attached to a `MetaData` by the top-level code of the
+    module with the given namespace, but not by the modules it imports."""
+
+    tables: list[sa.Table] = []
+
+    def attached(table: sa.Table, _: Any) -> None:
+        frame: FrameType | None = sys._getframe(1)
+        while frame is not None and frame.f_code.co_name != "<module>":
+            frame = frame.f_back
+        if frame is not None and frame.f_globals is namespace:
+            tables.append(table)
+
+    event.listen(sa.Table, "after_parent_attach", attached)
+    try:
+        yield tables
+    finally:
+        event.remove(sa.Table, "after_parent_attach", attached)
+
+
+@contextmanager
+def _record_module_tables() -> Iterator[dict[str, list[sa.Table]]]:
+    """Record the tables attached to a `MetaData` by the top-level code of
+    each module, by module name."""
+
+    tables: dict[str, list[sa.Table]] = {}
+
+    def attached(table: sa.Table, _: Any) -> None:
+        frame: FrameType | None = sys._getframe(1)
+        while frame is not None and frame.f_code.co_name != "<module>":
+            frame = frame.f_back
+        if frame is not None:
+            name = frame.f_globals.get("__name__")
+            if isinstance(name, str):
+                tables.setdefault(name, []).append(table)
+
+    event.listen(sa.Table, "after_parent_attach", attached)
+    try:
+        yield tables
+    finally:
+        event.remove(sa.Table, "after_parent_attach", attached)
+
+
+def get_file_directives(
+    db_dir: Path,
+    metadata: sa.MetaData,
+    files: list[SourceFile] | None = None,
+    jobs: int = 1,
+    parse_cache: ParseCache | None = None,
+) -> Directives:
+    """Get all file directives from the given directory, or from the already
+    scanned `files` if given.  With `jobs` > 1, the files are parsed in a pool
+    of worker processes.  Files found in `parse_cache` are not parsed again."""
+    directives = Directives()
+    if files is None:
+        files = scan_directory(db_dir)
+    cached: list[list[tuple[str, int]] | None] = [
+        parse_cache.get(file) if parse_cache else None for file in files
+    ]
+    missing = [i for i, tables in enumerate(cached) if tables is None]
+    with ExitStack() as stack:
+        # The files are parsed as they are consumed, so only the tables of
+        # one file, and its AST, are alive at a time.
+        parsed: Iterator[list[tuple[str, int]]]
+        if jobs > 1 and len(missing) > 1:
+            executor = stack.enter_context(ProcessPoolExecutor(max_workers=jobs))
+            parsed = executor.map(
+                parser.extract_tables,
+                [files[i].source for i in missing],
+                [files[i].path for i in missing],
+                chunksize=max(1, len(missing) // (jobs * 4)),
+            )
+        else:
+            parsed = (
+                parser.extract_tables(files[i].source, files[i].path) for i in missing
+            )
+        for file, tables in zip(files, cached):
+            if tables is None:
+                tables = next(parsed)
+                if parse_cache:
+                    parse_cache.put(file, tables)
+            index: int | None = None
+            for table_name, line_number in tables:
+                table = metadata.tables.get(table_name)
+                # If table_name is not in metadata, skip it
+                if table is None:
+                    continue
+                if index is None:
+                    index = directives.add_file(str(file.path.absolute()))
+                # The key of the table is the same string, kept alive anyway.
+                directives.add(table.key, "table", index, line_number)
     return directives
 
 
-def dump_ddl(
-    dialect_driver: str, metadata: list[sa.MetaData], directives: list[str]
-) -> list[sa.MetaData]:
-    """Dump DDL statements for the given metadata to stdout."""
-
-    def dump(sql, *multiparams, **params):
-        print(
-            str(sql.compile(dialect=engine.dialect))
-            .replace("\t", "")
-            .replace("\n", ""),
-            end=";\n\n",
-        )
+# Kinds of the records yielded by `iter_ddl`.
+DIRECTIVE = "directive"
+TABLE = "table"
+INDEX = "index"
+CONSTRAINT = "constraint"
+SEQUENCE = "sequence"
+TYPE = "type"
+COMMENT = "comment"
+# Other statements, e.g. `DDL` constructs executed by event listeners.
+OTHER = "ddl"
+
+_KINDS = {
+    "create_table": TABLE,
+    "create_index": INDEX,
+    "add_constraint": CONSTRAINT,
+    "create_sequence": SEQUENCE,
+    "create_enum_type": TYPE,
+    "create_domain_type": TYPE,
+    "set_table_comment": COMMENT,
+    "set_column_comment": COMMENT,
+    "set_constraint_comment": COMMENT,
+}
+
+
+class DDLRecord(NamedTuple):
+    """A compiled statement, or a directive, yielded by `iter_ddl`."""
+
+    kind: str
+    # Full name of the table the record applies to, if any.
+    table: str | None
+    sql: str
+
+
+def iter_ddl(
+    dialect_driver: str,
+    models: "sa.MetaData | DBTableDesc | Iterable[sa.MetaData | DBTableDesc]",
+    directives: Iterable[str] = (),
+    compiled_cache: CompiledCache | None = None,
+    compile_jobs: int = 1,
+) -> Iterator[DDLRecord]:
+    """Yield the `directives`, then the statements creating the tables of the
+    given `MetaData`, tables or models, in order.  The statements are
+    compiled as they are consumed, unless `compile_jobs` > 1.
+
+    `iter_ddl` is the programmatic equivalent of the `load` command, e.g.
+
+        for record in iter_ddl("postgresql", [User, Address]):
+            if record.kind == TABLE:
+                print(record.table, record.sql)
+    """
 
-    """Add File directives to the DDL dump."""
-    if directives:
+    if isinstance(directives, Directives):
+        for position, directive in zip(directives.positions, directives):
+            yield DDLRecord(DIRECTIVE, position.name, directive)
+    else:
         for directive in directives:
-            print(f"-- {directive}")
-        print()
-    engine = create_mock_engine(f"{dialect_driver}://", dump)
-    for meta in metadata:
-        meta.create_all(engine, checkfirst=False)
+            # atlas:pos <table>[type=table] <path>:<line>
+            table = directive.split(" ", 2)[1].partition("[")[0]
+            yield DDLRecord(DIRECTIVE, table, directive)
+    statements: Iterable[Any] = (
+        sql
+        for meta in _metadata_of(models)
+        for sql in create_statements(dialect_driver, meta)
+    )
+    if compile_jobs > 1 and "fork" in multiprocessing.get_all_start_methods():
+        statements = list(statements)
+        compiled: Iterable[str] = _compile_parallel(
+            dialect_driver, statements, compile_jobs, compiled_cache
+        )
+        for sql, statement in zip(statements, compiled):
+            yield _record(sql, statement)
+        return
+    fingerprints: dict[sa.Table, str] = {}
+    for sql in statements:
+        yield _record(sql, _compile(dialect_driver, sql, compiled_cache, fingerprints))
+
+
+def _metadata_of(models: Any) -> list[sa.MetaData]:
+    """Return the distinct `MetaData` of the given models, in order."""
+
+    if isinstance(models, sa.MetaData) or hasattr(models, "metadata"):
+        models = [models]
+    metadata: dict[int, sa.MetaData] = {}
+    for model in models:
+        meta = model if isinstance(model, sa.MetaData) else model.metadata
+        metadata.setdefault(id(meta), meta)
+    return list(metadata.values())
+
+
+def _record(sql: Any, statement: str) -> DDLRecord:
+    table = _statement_table(sql)
+    return DDLRecord(
+        _KINDS.get(sql.__visit_name__, OTHER),
+        None if table is None else table.fullname,
+        statement,
+    )
+
+
+def dump_ddl(
+    dialect_driver: str,
+    metadata: list[sa.MetaData],
+    directives: Sequence[str],
+    file: TextIO | None = None,
+    compiled_cache: CompiledCache | None = None,
+    compile_jobs: int = 1,
+) -> list[sa.MetaData]:
+    """Dump DDL statements for the given metadata to `file`, or stdout.  The
+    `CREATE TABLE` and `CREATE INDEX` statements of tables found unchanged in
+    `compiled_cache` are not compiled again.  With `compile_jobs` > 1, the
+    statements are compiled in a pool of worker processes, where available."""
+
+    records = iter_ddl(
+        dialect_driver,
+        metadata,
+        compiled_cache=compiled_cache,
+        compile_jobs=compile_jobs,
+    )
+    write_ddl(directives, (record.sql for record in records), file)
     return metadata
 
 
+def write_ddl(
+    directives: Sequence[str], statements: Iterable[str], file: TextIO | None = None
+) -> None:
+    """Write the directives and the compiled statements to `file`, or stdout."""
+
+    with DDLWriter(file or sys.stdout) as writer:
+        """Add File directives to the DDL dump."""
+        writer.write_directives(directives)
+        for statement in statements:
+            writer.write_statement(statement)
+
+
+def _compile(
+    dialect_driver: str,
+    sql: Any,
+    compiled_cache: CompiledCache | None,
+    fingerprints: dict[sa.Table, str],
+) -> str:
+    key = statement = None
+    if compiled_cache is not None:
+        key = statement_fingerprint(sql, fingerprints)
+        if key is not None:
+            statement = compiled_cache.get(dialect_driver, key)
+    if statement is None:
+        with profiling.timed(profiling.COMPILE, _table_name(sql)):
+            statement = str(sql.compile(dialect=get_dialect(dialect_driver)))
+        if compiled_cache is not None and key is not None:
+            compiled_cache.put(dialect_driver, key, statement)
+    return statement
+
+
+# Statements compiled by the workers of `_compile_parallel`, which inherit
+# them from the parent process when forked.  Models can't be pickled in
+# general, e.g. their column defaults may be lambdas, and their modules can't
+# be imported by name in another process.  The lock keeps concurrent calls
+# from replacing the statements of one another before their workers fork.
+_worker_statements: list[Any] = []
+_worker_lock = threading.Lock()
+
+
+def _compile_parallel(
+    dialect_driver: str,
+    statements: list[Any],
+    jobs: int,
+    compiled_cache: CompiledCache | None,
+) -> list[str]:
+    """Compile the statements in a pool of forked worker processes, each
+    compiling a contiguous range of them, and return them in order."""
+
+    global _worker_statements
+
+    fingerprints: dict[sa.Table, str] = {}
+    keys: list[str | None] = [None] * len(statements)
+    results: list[str | None] = [None] * len(statements)
+    if compiled_cache is not None:
+        for i, sql in enumerate(statements):
+            key = keys[i] = statement_fingerprint(sql, fingerprints)
+            if key is not None:
+                results[i] = compiled_cache.get(dialect_driver, key)
+    missing = [i for i, statement in enumerate(results) if statement is None]
+    if len(missing) < 2:
+        return [
+            _compile(dialect_driver, sql, None, fingerprints)
+            if statement is None
+            else statement
+            for sql, statement in zip(statements, results)
+        ]
+    size = -(-len(missing) // (jobs * 4))
+    starts = range(0, len(missing), size)
+    with _worker_lock:
+        _worker_statements = [statements[i] for i in missing]
+        try:
+            with ProcessPoolExecutor(
+                max_workers=jobs, mp_context=multiprocessing.get_context("fork")
+            ) as executor:
+                chunks = executor.map(
+                    _compile_range,
+                    [dialect_driver] * len(starts),
+                    starts,
+                    [start + size for start in starts],
+                )
+                compiled = [statement for chunk in chunks for statement in chunk]
+        finally:
+            _worker_statements = []
+    for i, statement in zip(missing, compiled):
+        results[i] = statement
+        key = keys[i]
+        if compiled_cache is not None and key is not None:
+            compiled_cache.put(dialect_driver, key, statement)
+    return cast(list[str], results)
+
+
+def _compile_range(dialect_driver: str, start: int, stop: int) -> list[str]:
+    dialect = get_dialect(dialect_driver)
+    return [str(sql.compile(dialect=dialect)) for sql in _worker_statements[start:stop]]
+
+
+# Dialect instances, indexed by dialect driver.
+_dialects: dict[str, Any] = {}
+
+
+def get_dialect(dialect_driver: str) -> Any:
+    """Return the dialect instance of a dialect driver, created once."""
+
+    dialect = _dialects.get(dialect_driver)
+    if dialect is None:
+        dialect = create_mock_engine(f"{dialect_driver}://", None).dialect
+        _dialects[dialect_driver] = dialect
+    return dialect
+
+
+def create_statements(dialect_driver: str, metadata: sa.MetaData) -> Iterator[Any]:
+    """Yield the DDL statements creating the tables of `metadata`, in the
+    order of `MetaData.create_all`, without compiling them.
+
+    The statements are collected by running `create_all` on a mock engine,
+    so the DDL events are dispatched and the statements executed by
+    listeners, such as the `CREATE TYPE` of PostgreSQL enums or `DDL`
+    constructs, are yielded in place.
+
+    `create_all` emits the indexes of a table, and the foreign keys added
+    after the tables to close dependency cycles, in the order of sets, which
+    changes from one run to the next.  Consecutive statements of these kinds
+    are sorted by name, so the output is stable.
+    """
+
+    executed: list[Any] = []
+    engine = create_mock_engine(
+        f"{dialect_driver}://", lambda sql, *_, **__: executed.append(sql)
+    )
+    metadata.create_all(engine, checkfirst=False)
+    run: list[Any] = []
+    for sql in executed:
+        if run and type(sql) is not type(run[0]):
+            yield from sorted(run, key=_statement_key)
+            run = []
+        if isinstance(sql, (CreateIndex, AddConstraint)):
+            run.append(sql)
+        else:
+            yield sql
+    yield from sorted(run, key=_statement_key)
+
+
+def _statement_key(sql: Any) -> tuple[str, ...]:
+    if isinstance(sql, CreateIndex):
+        return (str(sql.element.name),)
+    return _constraint_key(sql.element)
+
+
+def _constraint_key(constraint: sa.ForeignKeyConstraint) -> tuple[str, ...]:
+    return (
+        constraint.parent.fullname,
+        str(constraint.name),
+        *constraint.column_keys,
+    )
+
+
+def _statement_table(sql: Any) -> sa.Table | None:
+    """Return the table a DDL statement applies to, if any."""
+
+    element = getattr(sql, "element", None)
+    if isinstance(element, sa.Table):
+        return element
+    table = getattr(element, "table", None)
+    return table if isinstance(table, sa.Table) else None
+
+
+def _table_name(sql: Any) -> str:
+    """Return the name of the table a DDL statement applies to, or the name
+    of its element, e.g. an enum type."""
+
+    table = _statement_table(sql)
+    if table is not None:
+        return table.fullname
+    element = getattr(sql, "element", None)
+    return str(getattr(element, "name", None) or type(sql).__name__)
+
+
 def print_ddl(dialect_driver: str, models: list[DBTableDesc]) -> None:
     """Dump DDL statements for the metadata from the given models/tables to stdout."""
     if len(models) == 0:
         print("No models provided", file=sys.stderr)
         return
     dump_ddl(
-        dialect_driver=dialect_driver, metadata=[models[0].metadata], directives=[]
+        dialect_driver=dialect_driver, metadata=_metadata_of(models), directives=[]
     )
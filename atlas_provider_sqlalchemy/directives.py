@@ -0,0 +1,93 @@
+"""The `atlas:pos` directives locating the tables in the model files.
+
+Directives are not kept as strings, but as compact position records: the
+names are shared with the tables of the metadata, the files are indexes in a
+table of file paths, and the indexes and line numbers are packed in arrays.
+They are only rendered as strings when they are written.
+"""
+
+from array import array
+from typing import Iterable, Iterator, NamedTuple, Sequence, overload
+
+
+class Position(NamedTuple):
+    """The position of an object of the schema in a model file."""
+
+    name: str
+    kind: str
+    # Index of the file in `Directives.files`.
+    file: int
+    line: int
+
+
+class Directives(Sequence[str]):
+    """A sequence of `atlas:pos` directives, stored as `Position` records."""
+
+    def __init__(self, directives: Iterable["Directives"] = ()) -> None:
+        self.files: list[str] = []
+        self._indexes: dict[str, int] = {}
+        self._names: list[str] = []
+        self._kinds: list[str] = []
+        self._files = array("I")
+        self._lines = array("I")
+        for other in directives:
+            self.extend(other)
+
+    def add_file(self, path: str) -> int:
+        """Return the index of a file, adding it to the table if needed."""
+
+        index = self._indexes.get(path)
+        if index is None:
+            index = self._indexes[path] = len(self.files)
+            self.files.append(path)
+        return index
+
+    def add(self, name: str, kind: str, file: int, line: int) -> None:
+        self._names.append(name)
+        self._kinds.append(kind)
+        self._files.append(file)
+        self._lines.append(line)
+
+    def extend(self, other: "Directives") -> None:
+        """Append the positions of `other`, translating its file indexes."""
+
+        indexes = [self.add_file(path) for path in other.files]
+        self._names.extend(other._names)
+        self._kinds.extend(other._kinds)
+        self._files.extend(indexes[file] for file in other._files)
+        self._lines.extend(other._lines)
+
+    @property
+    def positions(self) -> Iterator[Position]:
+        return map(Position, self._names, self._kinds, self._files, self._lines)
+
+    def _render(self, i: int) -> str:
+        return (
+            f"atlas:pos {self._names[i]}[type={self._kinds[i]}] "
+            f"{self.files[self._files[i]]}:{self._lines[i]}"
+        )
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    @overload
+    def __getitem__(self, index: int) -> str: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[str]: ...
+
+    def __getitem__(self, index: int | slice) -> str | list[str]:
+        if isinstance(index, slice):
+            return [self._render(i) for i in range(len(self))[index]]
+        return self._render(range(len(self))[index])
+
+    def __iter__(self) -> Iterator[str]:
+        return map(self._render, range(len(self)))
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (Directives, list)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"Directives({list(self)!r})"
@@ -0,0 +1,254 @@
+"""Stable structural fingerprints of SQLAlchemy tables.
+
+A fingerprint covers everything the DDL of a table depends on: its name and
+schema, columns and their types, constraints, indexes, comments and dialect
+options.  It doesn't depend on object identities or on the process, so it
+can be used as a key in on-disk caches.
+
+The fingerprint of a whole schema combines the fingerprints of its tables, in
+name order, and is printed by the `fingerprint` command.
+"""
+
+import hashlib
+import re
+from typing import Any, Iterable
+
+import sqlalchemy as sa
+from sqlalchemy.schema import CreateIndex, CreateTable
+from sqlalchemy.sql.elements import TextClause
+
+# Table attributes either covered explicitly or not affecting the DDL.
+_TABLE_ATTRIBUTES = {
+    "c",
+    "columns",
+    "comment",
+    "constraints",
+    "dialect_options",
+    "dispatch",
+    "foreign_keys",
+    "fullname",
+    "implicit_returning",
+    "indexes",
+    "info",
+    "metadata",
+    "name",
+    "primary_key",
+    "schema",
+}
+
+_ADDRESS = re.compile(r" at 0x[0-9a-fA-F]+")
+
+
+def table_fingerprint(table: sa.Table) -> str:
+    """Return the sha256 hex digest of the structure of a table."""
+
+    state = (
+        table.fullname,
+        table.comment,
+        getattr(table, "_prefixes", None),
+        _options(table),
+        table.metadata.naming_convention,
+        # Attributes set by third-party dialects, e.g. the ClickHouse engine.
+        [
+            (name, value)
+            for name, value in sorted(vars(table).items())
+            if not name.startswith("_") and name not in _TABLE_ATTRIBUTES
+        ],
+        [_column_state(column) for column in table.columns],
+        [_constraint_state(c) for c in table._sorted_constraints],
+        [
+            (
+                index.name,
+                index.unique,
+                [_sql(e) for e in index.expressions],
+                _options(index),
+            )
+            for index in sorted(table.indexes, key=lambda i: str(i.name))
+        ],
+    )
+    # The state is rendered once, without the object addresses it contains.
+    text = _ADDRESS.sub("", repr(state))
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def table_fingerprints(metadata: Iterable[sa.MetaData]) -> list[tuple[str, str]]:
+    """Return the full name and fingerprint of every table, sorted by name."""
+
+    return sorted(
+        (table.fullname, table_fingerprint(table))
+        for meta in metadata
+        for table in meta.tables.values()
+    )
+
+
+def schema_fingerprint(tables: list[tuple[str, str]]) -> str:
+    """Return the sha256 hex digest of a schema, from the fingerprints of its
+    tables.  It doesn't depend on the order the tables are defined in."""
+
+    text = "".join(f"{name}\t{fingerprint}\n" for name, fingerprint in sorted(tables))
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def statement_fingerprint(
+    statement: Any, tables: dict[sa.Table, str] | None = None
+) -> str | None:
+    """Return a fingerprint of a `CREATE TABLE` or `CREATE INDEX` statement,
+    or None for other statements.  `tables` memoizes the table fingerprints."""
+
+    if isinstance(statement, CreateTable):
+        table = statement.element
+        included = statement.include_foreign_key_constraints
+        if included is None:
+            foreign_keys = "*"
+        else:
+            foreign_keys = ",".join(
+                str(i)
+                for i, c in enumerate(table._sorted_constraints)
+                if any(c is fk for fk in included)
+            )
+        suffix = f"fk={foreign_keys}"
+    elif isinstance(statement, CreateIndex):
+        table = statement.element.table
+        if table is None or statement.element.name is None:
+            return None
+        suffix = f"index={statement.element.name}"
+    else:
+        return None
+    if tables is None:
+        fingerprint = table_fingerprint(table)
+    elif table in tables:
+        fingerprint = tables[table]
+    else:
+        fingerprint = tables[table] = table_fingerprint(table)
+    exists = getattr(statement, "if_not_exists", False)
+    return f"{type(statement).__name__}:{fingerprint}:{suffix}:{exists}"
+
+
+def _column_state(column: sa.Column) -> tuple[Any, ...]:
+    computed = getattr(column, "computed", None)
+    return (
+        column.name,
+        _type_state(column.type),
+        _default_state(column.default),
+        column.nullable,
+        column.primary_key,
+        column.autoincrement,
+        column.unique,
+        column.index,
+        getattr(column, "system", None),
+        getattr(column, "comment", None),
+        _sql(getattr(column.server_default, "arg", column.server_default)),
+        _sql(getattr(column.server_onupdate, "arg", column.server_onupdate)),
+        computed and (_sql(computed.sqltext), computed.persisted),
+        # The repr of `Identity` lists its arguments.
+        getattr(column, "identity", None),
+        _options(column),
+    )
+
+
+def _type_state(column_type: Any) -> tuple[Any, ...]:
+    cls = type(column_type)
+    if cls.__module__.partition(".")[0] == "sqlalchemy":
+        origin = cls.__module__
+    else:
+        # Custom types may be defined by the model files, whose module names
+        # change from one process and one edit to the next, and render
+        # through project code, e.g. `get_col_spec`.  Their output is used
+        # instead.
+        origin = _compiled_type(column_type)
+    return (
+        origin,
+        cls.__qualname__,
+        # The arguments of the type, e.g. the length of a string or the
+        # values of an enum, but not the attributes it memoizes.
+        [(k, v) for k, v in vars(column_type).items() if not k.startswith("_")],
+        # The types given by `with_variant` for other dialects.
+        [
+            (name, _type_state(variant))
+            for name, variant in sorted(
+                getattr(column_type, "_variant_mapping", {}).items()
+            )
+        ],
+    )
+
+
+def _compiled_type(column_type: Any) -> str | None:
+    """The DDL of a type on the default dialect, if it can be rendered."""
+
+    try:
+        return str(column_type.compile())
+    except Exception:
+        return None
+
+
+def _default_state(default: Any) -> Any:
+    """The part of a client side default affecting the DDL: a sequence, whose
+    repr lists its arguments, or else whether there is a default, which
+    decides e.g. whether an integer primary key is `SERIAL`."""
+
+    if default is None or isinstance(default, sa.Sequence):
+        return default
+    return type(default).__name__
+
+
+def _constraint_state(constraint: sa.Constraint) -> tuple[Any, ...]:
+    state: tuple[Any, ...] = (
+        type(constraint).__name__,
+        str(constraint.name),
+        [c.name for c in getattr(constraint, "columns", ())],
+        constraint.deferrable,
+        constraint.initially,
+        getattr(constraint, "comment", None),
+        _options(constraint),
+    )
+    if isinstance(constraint, sa.ForeignKeyConstraint):
+        state += (
+            [e.target_fullname for e in constraint.elements],
+            constraint.ondelete,
+            constraint.onupdate,
+            constraint.match,
+            constraint.use_alter,
+        )
+    elif isinstance(constraint, sa.CheckConstraint):
+        state += (_sql(constraint.sqltext),)
+    return state
+
+
+def _options(item: Any) -> list[tuple[str, Any]]:
+    """Dialect specific options, e.g. `mysql_engine` or `postgresql_using`."""
+
+    # Skip building the view of the options when none were given.
+    if not item.__dict__.get("dialect_options"):
+        return []
+    # Values may be expressions, e.g. the `WHERE` clause of a partial index.
+    return sorted((name, _value(value)) for name, value in item.dialect_kwargs.items())
+
+
+def _value(value: Any) -> Any:
+    if isinstance(value, (list, tuple)):
+        return [_value(v) for v in value]
+    if isinstance(value, dict):
+        return sorted((k, _value(v)) for k, v in value.items())
+    if isinstance(value, sa.ClauseElement):
+        return _sql(value)
+    return value
+
+
+def _sql(clause: Any) -> Any:
+    if clause is None or isinstance(clause, str):
+        return clause
+    if isinstance(clause, TextClause):
+        return ("text", clause.text)
+    if isinstance(clause, sa.Column):
+        return ("column", clause.name)
+    # Bound values are rendered, as `a > 1` and `a > 5` are both `a > :a_1`
+    # otherwise.
+    try:
+        return str(clause.compile(compile_kwargs={"literal_binds": True}))
+    except Exception:
+        pass
+    try:
+        compiled = clause.compile()
+        return (str(compiled), sorted(compiled.params.items()))
+    except Exception:
+        return repr(clause)
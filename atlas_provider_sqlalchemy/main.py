@@ -1,20 +1,70 @@
+import io
 import os
+import shutil
 import sys
+from contextlib import ExitStack, nullcontext
 from enum import Enum
 from pathlib import Path
+from typing import TYPE_CHECKING, Any, NamedTuple, Optional, Sequence
 
 import typer
-from sqlalchemy import MetaData
-
-from atlas_provider_sqlalchemy.ddl import (
-    ModuleImportError,
-    ModelsNotFoundError,
-    dump_ddl,
-    get_metadata,
-    get_file_directives,
+from typer.core import TyperGroup
+
+from atlas_provider_sqlalchemy import profiling
+from atlas_provider_sqlalchemy.scan import ScanRules, SourceFile, scan_directory
+from atlas_provider_sqlalchemy.server import (
+    SOCKET_ENV,
+    ServerError,
+    default_socket_path,
+    forward,
 )
+from atlas_provider_sqlalchemy.server import serve as start_server
+
+# SQLAlchemy and the models are imported only once they are needed, so that
+# forwarding a request to a warm server doesn't pay for them.
+if TYPE_CHECKING:
+    from sqlalchemy import MetaData
+
+    from atlas_provider_sqlalchemy.cache import CompiledCache, ParseCache
+    from atlas_provider_sqlalchemy.ddl import (
+        ModelsNotFoundError as ModelsNotFoundError,
+        ModuleImportError as ModuleImportError,
+        dump_ddl as dump_ddl,
+        get_file_directives as get_file_directives,
+        get_metadata as get_metadata,
+    )
+    from atlas_provider_sqlalchemy.directives import Directives
+
+# Names re-exported from `ddl`, resolved on first access by `__getattr__`, and
+# declared above for type checkers.
+_DDL_EXPORTS = {
+    "ModuleImportError",
+    "ModelsNotFoundError",
+    "dump_ddl",
+    "get_metadata",
+    "get_file_directives",
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name in _DDL_EXPORTS:
+        from atlas_provider_sqlalchemy import ddl
+
+        return getattr(ddl, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
-app = typer.Typer(no_args_is_help=True)
+class DefaultCommandGroup(TyperGroup):
+    """Run the `load` command when no other command is given, so the provider
+    can be invoked as `atlas-provider-sqlalchemy --path ... --dialect ...`."""
+
+    def parse_args(self, ctx, args):
+        if args and args[0] not in self.commands and args[0] != "--help":
+            args = ["load", *args]
+        return super().parse_args(ctx, args)
+
+
+app = typer.Typer(cls=DefaultCommandGroup, no_args_is_help=True)
 
 
 class Dialect(str, Enum):
@@ -26,42 +76,628 @@ class Dialect(str, Enum):
     clickhouse = "clickhouse"
 
 
+class ProfileFormat(str, Enum):
+    report = "report"
+    trace = "trace"
+
+
 def run(
-    dialect: Dialect, path: list[Path], skip_errors: bool = False
-) -> list[MetaData]:
+    dialect: Dialect | list[Dialect],
+    path: list[Path],
+    skip_errors: bool = False,
+    cache_dir: Path | None = None,
+    jobs: int = 1,
+    output: str | None = None,
+    static: bool = False,
+    packages: bool = False,
+    rules: ScanRules | None = None,
+    compile_jobs: int = 1,
+    stubs: Sequence[str] = (),
+) -> list["MetaData"]:
+    """Load the models once and dump their DDL for each of the given dialects,
+    to stdout or to the files named by the `output` template.  With `static`,
+    the models are loaded without importing third-party packages.  With
+    `packages`, model files are imported under their real dotted names.  The
+    files loaded under each path are selected by `rules`.  With
+    `compile_jobs` > 1, the statements are compiled in worker processes.  The
+    modules matching the `stubs` patterns are imported as stubs.
+
+    With `jobs` > 1 and several paths, each path is loaded in its own worker
+    process, isolated from the others, and no metadata is returned."""
+
+    from atlas_provider_sqlalchemy.ddl import dump_ddl, write_ddl
+    from atlas_provider_sqlalchemy.output import BUFFER_SIZE, open_output
+
+    dialects = [dialect] if isinstance(dialect, Dialect) else list(dialect)
+    with profiling.phase("scan"):
+        scans = {p: scan_directory(p, rules) for p in path}
+    isolated = jobs > 1 and len(scans) > 1
+    if cache_dir is None and isolated:
+        with profiling.phase("load_roots"):
+            result = load_roots(
+                scans, dialects, skip_errors, jobs, static, packages, stubs=stubs
+            )
+        for d in dialects:
+            with open_output(output, d.value) as f:
+                write_ddl(result.directives, result.statements[d.value], f)
+        return []
+    if cache_dir is None:
+        metadata_list, directives = collect_models(
+            scans, skip_errors, jobs, static=static, packages=packages, stubs=stubs
+        )
+        for d in dialects:
+            with profiling.phase(f"dump_ddl[{d.value}]"):
+                with open_output(output, d.value) as f:
+                    dump_ddl(
+                        d.value,
+                        metadata_list,
+                        directives,
+                        f,
+                        compile_jobs=compile_jobs,
+                    )
+        return metadata_list
+
+    from atlas_provider_sqlalchemy.cache import (
+        CompiledCache,
+        OutputCache,
+        ParseCache,
+        imported_project_files,
+    )
+
+    cache = OutputCache(cache_dir)
+    keys = {
+        d: cache.key(scans, d.value, skip_errors, static, packages, tuple(stubs))
+        for d in dialects
+    }
+    metadata_list = []
+    with ExitStack() as stack:
+        # Lock in a consistent order, so concurrent runs can't deadlock.
+        for key in sorted(set(keys.values())):
+            stack.enter_context(cache.lock(key))
+        missing = [d for d in dialects if not cache.is_valid(keys[d])]
+        if missing and isolated:
+            parse_cache = ParseCache(cache_dir)
+            compiled_cache = CompiledCache(cache_dir)
+            with profiling.phase("load_roots"):
+                result = load_roots(
+                    scans,
+                    missing,
+                    skip_errors,
+                    jobs,
+                    static,
+                    packages,
+                    cache_dir,
+                    stubs,
+                )
+            for changes in result.parse_changes:
+                parse_cache.merge(changes)
+            for compiled_changes in result.compiled_changes:
+                compiled_cache.merge(compiled_changes)
+            for d in missing:
+                with cache.store(keys[d], result.dependencies) as f:
+                    write_ddl(result.directives, result.statements[d.value], f)
+            parse_cache.save()
+            compiled_cache.save()
+        elif missing:
+            modules = set(sys.modules)
+            parse_cache = ParseCache(cache_dir)
+            metadata_list, directives = collect_models(
+                scans,
+                skip_errors,
+                jobs,
+                parse_cache,
+                static=static,
+                packages=packages,
+                stubs=stubs,
+            )
+            parse_cache.save()
+            dependencies = imported_project_files(modules)
+            scanned = {f.path.absolute() for files in scans.values() for f in files}
+            compiled_cache = CompiledCache(
+                cache_dir, [file for file in dependencies if file not in scanned]
+            )
+            for d in missing:
+                with profiling.phase(f"dump_ddl[{d.value}]"):
+                    with cache.store(keys[d], dependencies) as f:
+                        dump_ddl(
+                            d.value,
+                            metadata_list,
+                            directives,
+                            f,
+                            compiled_cache,
+                            compile_jobs,
+                        )
+            compiled_cache.save()
+        with profiling.phase("copy_cached_output"):
+            for d in dialects:
+                with open(cache.output_path(keys[d]), "r") as src:
+                    with open_output(output, d.value) as f:
+                        shutil.copyfileobj(src, f, BUFFER_SIZE)
+    return metadata_list
+
+
+def dump_models(
+    dialects: list[Dialect],
+    metadata_list: list["MetaData"],
+    directives: Sequence[str],
+    compiled_cache: "CompiledCache | None" = None,
+    compile_jobs: int = 1,
+) -> dict[Dialect, str]:
+    """Dump the DDL of the loaded models for each dialect, into strings."""
+
+    from atlas_provider_sqlalchemy.ddl import dump_ddl
+
+    outputs = {}
+    for dialect in dialects:
+        buffer = io.StringIO()
+        dump_ddl(
+            dialect.value,
+            metadata_list,
+            directives,
+            buffer,
+            compiled_cache,
+            compile_jobs,
+        )
+        outputs[dialect] = buffer.getvalue()
+    if compiled_cache:
+        compiled_cache.save()
+    return outputs
+
+
+class RootsResult(NamedTuple):
+    """The DDL of model paths loaded in worker processes."""
+
+    directives: "Directives"
+    # Compiled statements, by dialect.
+    statements: dict[str, list[str]]
+    # Project files imported by the models.
+    dependencies: list[Path]
+    # Entries stored in the caches of the workers, to be merged and saved.
+    parse_changes: list[Any]
+    compiled_changes: list[Any]
+    # Stub modules touched by the workers, with the attributes read.
+    touched_stubs: list[dict[str, set[str]]]
+
+
+def load_roots(
+    scans: dict[Path, list[SourceFile]],
+    dialects: list[Dialect],
+    skip_errors: bool = False,
+    jobs: int = 2,
+    static: bool = False,
+    packages: bool = False,
+    cache_dir: Path | None = None,
+    stubs: Sequence[str] = (),
+) -> RootsResult:
+    """Load each path in a fresh worker process, at most `jobs` at a time,
+    so that the paths don't share imported modules or SQLAlchemy registries.
+    The results of the workers are merged in the order of the paths, and the
+    stub modules they touched recorded in the active report."""
+
+    import multiprocessing
+
+    from atlas_provider_sqlalchemy.directives import Directives
+    from atlas_provider_sqlalchemy.stubs import record
+
+    tasks = [
+        (p, files, [d.value for d in dialects], skip_errors, static, packages)
+        for p, files in scans.items()
+    ]
+    # A worker process loads a single path.
+    with multiprocessing.Pool(min(jobs, len(tasks)), maxtasksperchild=1) as pool:
+        results = pool.starmap(
+            _load_root, [(*task, cache_dir, stubs) for task in tasks], chunksize=1
+        )
+    merged = RootsResult(Directives(), {d.value: [] for d in dialects}, [], [], [], [])
+    for result in results:
+        merged.directives.extend(result.directives)
+        for dialect, statements in result.statements.items():
+            merged.statements[dialect].extend(statements)
+        merged.dependencies.extend(result.dependencies)
+        merged.parse_changes.extend(result.parse_changes)
+        merged.compiled_changes.extend(result.compiled_changes)
+        merged.touched_stubs.extend(result.touched_stubs)
+    for touched in merged.touched_stubs:
+        record(touched)
+    merged.dependencies[:] = dict.fromkeys(merged.dependencies)
+    return merged
+
+
+def _load_root(
+    path: Path,
+    files: list[SourceFile],
+    dialects: list[str],
+    skip_errors: bool,
+    static: bool,
+    packages: bool,
+    cache_dir: Path | None,
+    stubs: Sequence[str],
+) -> RootsResult:
+    """Load the models of a path and compile their statements, in a worker
+    process of `load_roots`.  The caches are read, but saved by the parent."""
+
+    from atlas_provider_sqlalchemy.cache import (
+        CompiledCache,
+        ParseCache,
+        imported_project_files,
+    )
+    from atlas_provider_sqlalchemy.ddl import iter_ddl
+    from atlas_provider_sqlalchemy.stubs import StubReport, reporting
+
+    modules = set(sys.modules)
+    parse_cache = ParseCache(cache_dir) if cache_dir else None
+    with reporting(StubReport(stubs)) as report:
+        metadata_list, directives = collect_models(
+            {path: files},
+            skip_errors,
+            parse_cache=parse_cache,
+            static=static,
+            packages=packages,
+            stubs=stubs,
+        )
+    dependencies = imported_project_files(modules)
+    scanned = {f.path.absolute() for f in files}
+    compiled_cache = (
+        CompiledCache(cache_dir, [f for f in dependencies if f not in scanned])
+        if cache_dir
+        else None
+    )
+    statements = {
+        d: [r.sql for r in iter_ddl(d, metadata_list, compiled_cache=compiled_cache)]
+        for d in dialects
+    }
+    if parse_cache is None or compiled_cache is None:
+        return RootsResult(directives, statements, [], [], [], [report.touched])
+    return RootsResult(
+        directives,
+        statements,
+        dependencies,
+        [parse_cache.changes()],
+        [compiled_cache.changes()],
+        [report.touched],
+    )
+
+
+def collect_models(
+    scans: dict[Path, list[SourceFile]],
+    skip_errors: bool = False,
+    jobs: int = 1,
+    parse_cache: "ParseCache | None" = None,
+    reuse_unchanged: bool = False,
+    static: bool = False,
+    packages: bool = False,
+    stubs: Sequence[str] = (),
+) -> tuple[list["MetaData"], "Directives"]:
+    from atlas_provider_sqlalchemy.ddl import get_file_directives
+    from atlas_provider_sqlalchemy.directives import Directives
+
     metadata_list: list[MetaData] = []
-    directives = []
-    for p in path:
-        m = get_metadata(p, skip_errors)
+    directives = Directives()
+    for p, files in scans.items():
+        with profiling.phase("get_metadata"):
+            m = load_metadata(
+                p, files, skip_errors, reuse_unchanged, static, packages, stubs
+            )
         metadata_list.append(m)
-        directives.extend(get_file_directives(p, m))
-    dump_ddl(dialect.value, metadata_list, directives)
-    return metadata_list
+        with profiling.phase("get_file_directives"):
+            directives.extend(get_file_directives(p, m, files, jobs, parse_cache))
+    return metadata_list, directives
+
+
+def load_metadata(
+    path: Path,
+    files: list[SourceFile],
+    skip_errors: bool = False,
+    reuse_unchanged: bool = False,
+    static: bool = False,
+    packages: bool = False,
+    stubs: Sequence[str] = (),
+) -> "MetaData":
+    """Load the models of a path, statically or by importing them."""
+
+    if static:
+        from atlas_provider_sqlalchemy.static import get_metadata_static
+
+        return get_metadata_static(path, skip_errors, files, stubs)
+    from atlas_provider_sqlalchemy.ddl import get_metadata
+
+    return get_metadata(path, skip_errors, files, reuse_unchanged, packages, stubs)
+
+
+def print_error(e: Exception) -> None:
+    from atlas_provider_sqlalchemy.ddl import ModuleImportError
+
+    print(e, file=sys.stderr)
+    if isinstance(e, ModuleImportError):
+        print(
+            "To skip on failed import, run: atlas-provider-sqlalchemy --skip-errors",
+            file=sys.stderr,
+        )
+
+
+def check_output(dialects: list[Dialect], output: str | None) -> None:
+    if len(dialects) > 1 and (output is None or "{dialect}" not in output):
+        raise typer.BadParameter(
+            "a template containing {dialect} is required with several dialects.",
+            param_hint="'--output'",
+        )
 
 
 @app.command()
 def load(
-    dialect: Dialect = Dialect.mysql,
+    dialect: list[Dialect] = typer.Option(
+        [Dialect.mysql.value],
+        help="Dialect to dump the DDL for. Can be repeated to dump several "
+        "dialects from a single import of the models.",
+    ),
     path: list[Path] = typer.Option(
         exists=True, help="Path to directory of the sqlalchemy models."
     ),
     skip_errors: bool = typer.Option(False, help="Skip errors when loading models."),
+    cache_dir: Optional[Path] = typer.Option(
+        None,
+        envvar="ATLAS_PROVIDER_SQLALCHEMY_CACHE_DIR",
+        help="Directory for caching the output between runs.",
+    ),
+    jobs: int = typer.Option(
+        1,
+        min=1,
+        help="Number of worker processes. With several paths, each path is "
+        "loaded in its own process, isolated from the others; with one path, "
+        "the models are parsed in parallel.",
+    ),
+    compile_jobs: int = typer.Option(
+        1,
+        min=1,
+        help="Number of worker processes used to compile the statements, for "
+        "very large schemas. The output is the same as with a single process.",
+    ),
+    daemon: bool = typer.Option(
+        True, help="Forward the request to a running `serve` process, if any."
+    ),
+    socket: Optional[Path] = typer.Option(
+        None,
+        envvar=SOCKET_ENV,
+        help="Socket of the `serve` process. Defaults to a per-user path.",
+    ),
+    output: Optional[str] = typer.Option(
+        None,
+        help="Write the DDL to this file instead of stdout, replacing it once "
+        "written. Required with several dialects, as a template such as "
+        "`schema.{dialect}.sql`.",
+    ),
+    static: bool = typer.Option(
+        False,
+        help="Load the models without importing third-party packages, such as "
+        "settings or SDKs. Files using them are imported as usual.",
+    ),
+    include: list[str] = typer.Option(
+        [],
+        help="Load only the files matching this glob, e.g. `models/*.py`. "
+        "Patterns with a `/` match the path relative to `--path`, others the "
+        "file name. Can be repeated.",
+    ),
+    exclude: list[str] = typer.Option(
+        [],
+        help="Skip the files and directories matching this glob, e.g. `tests`. "
+        "Can be repeated.",
+    ),
+    gitignore: bool = typer.Option(
+        False, help="Skip the files and directories ignored by git."
+    ),
+    packages: bool = typer.Option(
+        False,
+        help="Import the model files in packages under their real dotted names, "
+        "so files imported by other model files are executed only once.",
+    ),
+    stub: list[str] = typer.Option(
+        [],
+        help="Replace the modules matching this glob, e.g. `boto3` or "
+        "`app.settings*`, and their submodules, with stub modules while "
+        "loading the models. For heavy dependencies that don't affect the "
+        "schema. Can be repeated.",
+    ),
+    stub_report: Optional[str] = typer.Option(
+        None,
+        help="Write a JSON report of the stub modules imported and the "
+        "attributes read from them to this file, or to stderr with `-`. The "
+        "models are then loaded in this process, even if a `serve` process is "
+        "running.",
+    ),
+    profile: Optional[str] = typer.Option(
+        None,
+        help="Write a JSON report of the time spent in each phase, file and "
+        "table to this file, or to stderr with `-`. The models are then loaded "
+        "in this process, even if a `serve` process is running.",
+    ),
+    profile_format: ProfileFormat = typer.Option(
+        ProfileFormat.report.value,
+        help="Format of the profile: a report with the slowest items, or trace "
+        "events for trace viewers such as Perfetto.",
+    ),
+    profile_top: int = typer.Option(
+        20, min=1, help="Number of slowest items listed in the profile report."
+    ),
 ):
     if not path:
         path = [Path(os.getcwd())]
-    try:
-        run(dialect, path, skip_errors)
-    except ModuleImportError as e:
-        print(e, file=sys.stderr)
-        print(
-            "To skip on failed import, run: atlas-provider-sqlalchemy --skip-errors",
-            file=sys.stderr,
+    dialect = list(dict.fromkeys(dialect))
+    check_output(dialect, output)
+    rules = ScanRules(tuple(include), tuple(exclude), gitignore)
+    if daemon and profile is None and stub_report is None:
+        response = forward(
+            {
+                "cwd": os.getcwd(),
+                "dialect": [d.value for d in dialect],
+                "path": [str(p) for p in path],
+                "skip_errors": skip_errors,
+                "static": static,
+                "packages": packages,
+                "stubs": stub,
+                "include": include,
+                "exclude": exclude,
+                "gitignore": gitignore,
+            },
+            socket or default_socket_path(),
         )
+        if response is not None:
+            sys.stdout.write(response["stdout"])
+            sys.stderr.write(response["stderr"])
+            if response["code"]:
+                exit(response["code"])
+            from atlas_provider_sqlalchemy.output import open_output
+
+            for d in dialect:
+                with open_output(output, d.value) as f:
+                    f.write(response["outputs"][d.value])
+            return
+    from atlas_provider_sqlalchemy.ddl import ModelsNotFoundError, ModuleImportError
+    from atlas_provider_sqlalchemy.stubs import StubReport, reporting
+
+    profiler = profiling.Profiler() if profile else None
+    report = StubReport(stub) if stub_report else None
+    try:
+        with (
+            profiling.profiling(profiler) if profiler else nullcontext(),
+            reporting(report) if report else nullcontext(),
+        ):
+            run(
+                dialect,
+                path,
+                skip_errors,
+                cache_dir,
+                jobs,
+                output,
+                static,
+                packages,
+                rules,
+                compile_jobs,
+                stub,
+            )
+    except (ModuleImportError, ModelsNotFoundError) as e:
+        print_error(e)
         exit(1)
-    except ModelsNotFoundError as e:
+    finally:
+        if profiler and profile:
+            profiler.write(profile, profile_format == ProfileFormat.trace, profile_top)
+        if report and stub_report:
+            report.write(stub_report)
+
+
+@app.command()
+def fingerprint(
+    path: list[Path] = typer.Option(
+        exists=True, help="Path to directory of the sqlalchemy models."
+    ),
+    skip_errors: bool = typer.Option(False, help="Skip errors when loading models."),
+    tables: bool = typer.Option(
+        False, help="Print the fingerprint of each table as well."
+    ),
+    static: bool = typer.Option(
+        False, help="Load the models without importing third-party packages."
+    ),
+    packages: bool = typer.Option(
+        False, help="Import the model files under their real dotted names."
+    ),
+    stub: list[str] = typer.Option(
+        [],
+        help="Replace the modules matching this glob with stub modules while "
+        "loading the models. Can be repeated.",
+    ),
+    include: list[str] = typer.Option(
+        [], help="Load only the files matching this glob. Can be repeated."
+    ),
+    exclude: list[str] = typer.Option(
+        [], help="Skip the files and directories matching this glob. Can be repeated."
+    ),
+    gitignore: bool = typer.Option(
+        False, help="Skip the files and directories ignored by git."
+    ),
+):
+    """Print a hash of the schema of the models, which only changes when the
+    tables, columns, types, constraints or indexes do."""
+    from atlas_provider_sqlalchemy.ddl import ModelsNotFoundError, ModuleImportError
+    from atlas_provider_sqlalchemy.fingerprint import (
+        schema_fingerprint,
+        table_fingerprints,
+    )
+
+    if not path:
+        path = [Path(os.getcwd())]
+    rules = ScanRules(tuple(include), tuple(exclude), gitignore)
+    try:
+        metadata_list = [
+            load_metadata(
+                p, scan_directory(p, rules), skip_errors, False, static, packages, stub
+            )
+            for p in path
+        ]
+    except (ModuleImportError, ModelsNotFoundError) as e:
+        print_error(e)
+        exit(1)
+    fingerprints = table_fingerprints(metadata_list)
+    print(schema_fingerprint(fingerprints))
+    if tables:
+        for name, table_fingerprint in fingerprints:
+            print(f"{table_fingerprint}  {name}")
+
+
+@app.command()
+def serve(
+    socket: Optional[Path] = typer.Option(
+        None,
+        envvar=SOCKET_ENV,
+        help="Socket to listen on. Defaults to a per-user path.",
+    ),
+):
+    """Keep the models loaded in a warm process serving `load` requests."""
+    try:
+        start_server(socket or default_socket_path())
+    except ServerError as e:
         print(e, file=sys.stderr)
         exit(1)
 
 
+@app.command()
+def watch(
+    dialect: list[Dialect] = typer.Option(
+        [Dialect.mysql.value], help="Dialect to dump the DDL for. Can be repeated."
+    ),
+    path: list[Path] = typer.Option(
+        exists=True, help="Path to directory of the sqlalchemy models."
+    ),
+    output: str = typer.Option(
+        help="File to write the DDL to, or a template such as "
+        "`schema.{dialect}.sql` with several dialects."
+    ),
+    skip_errors: bool = typer.Option(False, help="Skip errors when loading models."),
+    hook: Optional[str] = typer.Option(
+        None, help="Shell command to run after the DDL is written."
+    ),
+    debounce: float = typer.Option(
+        0.2, min=0, help="Seconds without changes to wait for before rebuilding."
+    ),
+    poll: bool = typer.Option(False, help="Poll for changes instead of inotify."),
+    include: list[str] = typer.Option(
+        [], help="Load only the files matching this glob. Can be repeated."
+    ),
+    exclude: list[str] = typer.Option(
+        [], help="Skip the files and directories matching this glob. Can be repeated."
+    ),
+    gitignore: bool = typer.Option(
+        False, help="Skip the files and directories ignored by git."
+    ),
+):
+    """Write the DDL of the models, and again whenever a file changes."""
+    from atlas_provider_sqlalchemy.watch import watch as start_watch
+
+    if not path:
+        path = [Path(os.getcwd())]
+    dialect = list(dict.fromkeys(dialect))
+    check_output(dialect, output)
+    rules = ScanRules(tuple(include), tuple(exclude), gitignore)
+    start_watch(dialect, path, output, skip_errors, hook, debounce, poll, rules)
+
+
 if __name__ == "__main__":
     app(prog_name="atlas-provider-sqlalchemy")
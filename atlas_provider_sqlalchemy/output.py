@@ -0,0 +1,91 @@
+"""Sinks for the DDL output: a buffered writer, and atomically written files."""
+
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Sequence, TextIO
+
+# Size of the chunks written to the underlying file, in characters.
+BUFFER_SIZE = 1 << 18
+
+# Whitespace removed from the compiled statements, in a single pass.
+_STRIP_WHITESPACE = str.maketrans("", "", "\t\n")
+
+
+class DDLWriter:
+    """Accumulate the DDL output and write it to `file` in large chunks,
+    instead of issuing a small write for each statement.  At most about
+    `buffer_size` characters are held in memory."""
+
+    def __init__(self, file: TextIO, buffer_size: int = BUFFER_SIZE):
+        self.file = file
+        self.buffer_size = buffer_size
+        self._chunks: list[str] = []
+        self._size = 0
+
+    def write(self, s: str) -> None:
+        self._chunks.append(s)
+        self._size += len(s)
+        if self._size >= self.buffer_size:
+            self.flush()
+
+    def write_statement(self, sql: str) -> None:
+        """Write a compiled statement on a single line."""
+
+        self.write(sql.translate(_STRIP_WHITESPACE))
+        self.write(";\n\n")
+
+    def write_directives(self, directives: Sequence[str]) -> None:
+        if directives:
+            self.write("".join(f"-- {directive}\n" for directive in directives))
+            self.write("\n")
+
+    def flush(self) -> None:
+        if self._chunks:
+            self.file.write("".join(self._chunks))
+            self._chunks.clear()
+            self._size = 0
+
+    def close(self) -> None:
+        self.flush()
+        self.file.flush()
+
+    def __enter__(self) -> "DDLWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+@contextmanager
+def atomic_open(path: Path) -> Iterator[TextIO]:
+    """Open a temporary file next to `path`, and move it to `path` once
+    written, so readers never see a partially written file."""
+
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    try:
+        # mkstemp creates the file readable by its owner only.
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(tmp, 0o666 & ~umask)
+        with os.fdopen(fd, "w") as f:
+            yield f
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+@contextmanager
+def open_output(output: str | None, dialect: str) -> Iterator[TextIO]:
+    """Open the output of a dialect: stdout, or the file named by the
+    `output` template, with `{dialect}` replaced by the dialect name."""
+
+    if output is None:
+        yield sys.stdout
+        return
+    path = Path(output.replace("{dialect}", dialect)).absolute()
+    with atomic_open(path) as f:
+        yield f
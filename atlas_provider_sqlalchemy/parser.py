@@ -2,20 +2,29 @@
 
 This module provides utilities to locate tables, columns, and other SQL
 elements in SQLAlchemy model definitions using source code analysis.
+
+Most files of a project, such as utilities, services and `__init__` modules,
+define no tables.  A table is defined by a `__tablename__` attribute or a
+`Table` call, so the raw source of each file is first searched for these
+names, and only the files containing one are parsed.  The AST of these files
+is then walked statement by statement, as tables are only found in
+statements, without visiting the expressions.
 """
 
-from typing import Any
 import ast
 from pathlib import Path
 
+from atlas_provider_sqlalchemy import profiling
+
 
 class SQLAlchemyModelVisitor(ast.NodeVisitor):
     """Visit AST nodes to find SQLAlchemy model definitions."""
 
     def __init__(self):
         super().__init__()
-        # Store table information: {table_name: (line_number, class_node)}
-        self.tables: dict[str, tuple[int, Any]] = {}
+        # Store table information: {table_name: line_number}.  The nodes are
+        # not kept, so the AST is released once the file is visited.
+        self.tables: dict[str, int] = {}
         # Current table being visited
         self.current_table: str | None = None
 
@@ -32,7 +41,7 @@ class SQLAlchemyModelVisitor(ast.NodeVisitor):
                         statement.value.value, str
                     ):
                         table_name = statement.value.value
-                        self.tables[table_name] = (line_number, node)
+                        self.tables[table_name] = line_number
                         break
 
         # Continue visiting child nodes
@@ -52,11 +61,33 @@ class SQLAlchemyModelVisitor(ast.NodeVisitor):
                     first_arg.value, str
                 ):
                     table_name = first_arg.value
-                    self.tables[table_name] = (node.lineno, node)
+                    self.tables[table_name] = node.lineno
 
         # Continue visiting child nodes
         self.generic_visit(node)
 
+    def generic_visit(self, node: ast.AST) -> None:
+        """Visit the statements of a node, and the blocks containing them.
+        Expressions can't contain statements, so they are not visited."""
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, _BLOCKS):
+                self.visit(child)
+
+
+# The nodes containing statements, besides the statements themselves.
+_BLOCKS = (ast.stmt, ast.excepthandler, ast.match_case)
+
+
+def may_define_tables(source: str | bytes) -> bool:
+    """Whether the source may define tables, i.e. whether it contains a
+    `__tablename__` attribute or a `Table` call.  The names are searched in
+    the raw source, so a file passing the test may still define no table."""
+    if isinstance(source, str):
+        return source.find("__tablename__") != -1 or source.find("Table") != -1
+    # Any whitespace or comment may come between `Table` and the parenthesis
+    # of the call, so only the name is searched.
+    return source.find(b"__tablename__") != -1 or source.find(b"Table") != -1
+
 
 def parse_file(file_path: str | Path) -> SQLAlchemyModelVisitor:
     """Parse a Python file and extract SQLAlchemy model information.
@@ -72,16 +103,51 @@ def parse_file(file_path: str | Path) -> SQLAlchemyModelVisitor:
         Exception: If there are parsing errors
     """
     try:
-        with open(file_path, "r") as f:
+        with open(file_path, "rb") as f:
             source_code = f.read()
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Could not find file: {file_path}")
+    return parse_source(source_code, file_path)
+
+
+def parse_source(
+    source_code: str | bytes, file_path: str | Path
+) -> SQLAlchemyModelVisitor:
+    """Parse already read Python source and extract SQLAlchemy model information.
+
+    Args:
+        source_code: Content of the Python file
+        file_path: Path of the file the source was read from
 
-        # Parse the source code with ast
-        module = ast.parse(source_code, filename=file_path)
-        visitor = SQLAlchemyModelVisitor()
-        visitor.visit(module)
+    Returns:
+        SQLAlchemyModelVisitor: A visitor instance containing found tables and columns.
+
+    Raises:
+        Exception: If there are parsing errors
+    """
+    if not may_define_tables(source_code):
+        # Not parsed, so syntax errors of the file are not reported.
+        return SQLAlchemyModelVisitor()
+    try:
+        with profiling.timed(profiling.PARSE, str(file_path)):
+            # Parse the source code with ast
+            module = ast.parse(source_code, filename=file_path)
+            visitor = SQLAlchemyModelVisitor()
+            visitor.visit(module)
 
         return visitor
-    except FileNotFoundError:
-        raise FileNotFoundError(f"Could not find file: {file_path}")
     except Exception as e:
         raise Exception(f"Error parsing file {file_path}: {str(e)}")
+
+
+def extract_tables(
+    source_code: str | bytes, file_path: str | Path
+) -> list[tuple[str, int]]:
+    """Parse Python source and return the `(table_name, line_number)` pairs of
+    the tables it defines, in the order they were found.
+
+    Unlike `parse_source`, only plain tuples are returned, so the function can
+    run in a worker process without sending back the AST.
+    """
+    visitor = parse_source(source_code, file_path)
+    return list(visitor.tables.items())
@@ -0,0 +1,169 @@
+"""Timing instrumentation of the provider, enabled by `load --profile`.
+
+The phases of `run` are timed in wall and CPU time, and the individual items
+of the phases: the import of each model file, the parse of each file and the
+compilation of the statements of each table.  Instrumented code calls
+`phase` and `timed`, which do nothing unless a `Profiler` is active.
+
+The report is written as JSON, either as a summary with the slowest items,
+or as trace events which can be loaded in trace viewers such as Perfetto or
+`chrome://tracing`.
+"""
+
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, ContextManager, Iterator, NamedTuple
+
+# Categories of the timed items.
+IMPORT = "import"
+PARSE = "parse"
+COMPILE = "compile"
+
+
+class Event(NamedTuple):
+    """A timed phase or item, in seconds since the start of the profile."""
+
+    category: str
+    name: str
+    start: float
+    duration: float
+    cpu: float | None = None
+
+
+class Profiler:
+    """Record the events of a profiled run."""
+
+    def __init__(self) -> None:
+        self.origin = time.perf_counter()
+        self.events: list[Event] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            self._add(
+                Event(
+                    "phase",
+                    name,
+                    start - self.origin,
+                    time.perf_counter() - start,
+                    time.process_time() - cpu,
+                )
+            )
+
+    @contextmanager
+    def timed(self, category: str, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._add(
+                Event(category, name, start - self.origin, time.perf_counter() - start)
+            )
+
+    def _add(self, event: Event) -> None:
+        with self._lock:
+            self.events.append(event)
+
+    def report(self, top: int = 20) -> dict[str, Any]:
+        """Return the time of each phase, the total time of each item per
+        category, and the `top` slowest items."""
+
+        phases = [
+            {"name": e.name, "wall": e.duration, "cpu": e.cpu}
+            for e in self.events
+            if e.category == "phase"
+        ]
+        # An item may be timed several times, e.g. a table compiled for
+        # several statements or dialects.
+        totals: dict[str, dict[str, float]] = {}
+        for e in self.events:
+            if e.category != "phase":
+                items = totals.setdefault(e.category, {})
+                items[e.name] = items.get(e.name, 0.0) + e.duration
+        items = {
+            category: [
+                {"name": name, "time": duration}
+                for name, duration in sorted(
+                    durations.items(), key=lambda item: item[1], reverse=True
+                )
+            ]
+            for category, durations in totals.items()
+        }
+        slowest = sorted(
+            (
+                {"category": category, "name": name, "time": duration}
+                for category, durations in totals.items()
+                for name, duration in durations.items()
+            ),
+            key=lambda item: item["time"],
+            reverse=True,
+        )[:top]
+        return {"phases": phases, "items": items, "slowest": slowest}
+
+    def trace(self) -> dict[str, Any]:
+        """Return the events in the Trace Event Format, in microseconds."""
+
+        pid = os.getpid()
+        return {
+            "traceEvents": [
+                {
+                    "name": e.name,
+                    "cat": e.category,
+                    "ph": "X",
+                    "ts": round(e.start * 1e6),
+                    "dur": round(e.duration * 1e6),
+                    "pid": pid,
+                    "tid": 0,
+                }
+                for e in sorted(self.events, key=lambda e: (e.start, -e.duration))
+            ],
+            "displayTimeUnit": "ms",
+        }
+
+    def write(self, destination: str, trace: bool = False, top: int = 20) -> None:
+        """Write the report, or the trace events, to the `destination` file,
+        or to stderr if it is `-`."""
+
+        import json
+
+        report = self.trace() if trace else self.report(top)
+        if destination == "-":
+            json.dump(report, sys.stderr, indent=2)
+            sys.stderr.write("\n")
+        else:
+            with open(destination, "w") as f:
+                json.dump(report, f, indent=2)
+
+
+_active: Profiler | None = None
+
+
+@contextmanager
+def profiling(profiler: Profiler) -> Iterator[Profiler]:
+    """Make `profiler` record the instrumented phases and items."""
+
+    global _active
+    previous, _active = _active, profiler
+    try:
+        yield profiler
+    finally:
+        _active = previous
+
+
+def phase(name: str) -> ContextManager[None]:
+    """Time a phase, if a profiler is active."""
+
+    return nullcontext() if _active is None else _active.phase(name)
+
+
+def timed(category: str, name: str) -> ContextManager[None]:
+    """Time an item of the given category, if a profiler is active."""
+
+    return nullcontext() if _active is None else _active.timed(category, name)
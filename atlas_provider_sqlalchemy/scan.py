@@ -0,0 +1,225 @@
+"""Scan a models directory for Python source files.
+
+The directory tree is walked once and every source file is read once; the
+same buffers are then used to execute the modules and to extract position
+directives.
+
+Directories that never contain models, such as virtual environments and VCS
+metadata, are pruned from the walk.  `ScanRules` further select the files by
+glob patterns, and optionally by the `.gitignore` files of the project.
+"""
+
+import os
+import re
+from fnmatch import fnmatchcase
+from pathlib import Path
+from typing import NamedTuple
+
+# Directories pruned from the walk, whatever the rules.
+DEFAULT_EXCLUDES = frozenset(
+    {
+        ".git",
+        ".hg",
+        ".svn",
+        ".venv",
+        "venv",
+        ".tox",
+        ".nox",
+        "__pycache__",
+        ".mypy_cache",
+        ".pytest_cache",
+        ".ruff_cache",
+        "node_modules",
+        "site-packages",
+    }
+)
+
+
+class SourceFile(NamedTuple):
+    """A Python source file and its raw content."""
+
+    path: Path
+    source: bytes
+
+
+class ScanRules(NamedTuple):
+    """Select the files of a models directory.
+
+    Patterns containing a `/` are matched against the path relative to the
+    scanned directory, others against the name of each file and directory.
+    A file is loaded if it matches one of the `include` patterns, if any, and
+    none of the `exclude` patterns.  Excluded directories are not entered.
+    With `gitignore`, the files ignored by git are excluded as well.
+    """
+
+    include: tuple[str, ...] = ()
+    exclude: tuple[str, ...] = ()
+    gitignore: bool = False
+
+
+def scan_directory(db_dir: Path, rules: ScanRules | None = None) -> list[SourceFile]:
+    """Walk the directory tree starting at the root and read all Python files
+    selected by `rules`."""
+
+    matcher = _Matcher(db_dir, rules or ScanRules())
+    files = []
+    for root, dirnames, names in os.walk(db_dir):
+        matcher.enter(root)
+        # Walk in name order, rather than in the order of the file system, so
+        # the models are loaded and listed the same way on every machine.
+        dirnames[:] = sorted(d for d in dirnames if not matcher.excludes(root, d, True))
+        for name in sorted(names):
+            if name.endswith(".py") and not matcher.excludes(root, name, False):
+                file_path = Path(root) / name
+                with open(file_path, "rb") as f:
+                    files.append(SourceFile(file_path, f.read()))
+    return files
+
+
+class _Matcher:
+    def __init__(self, db_dir: Path, rules: ScanRules):
+        self.db_dir = str(db_dir)
+        self.include = _split_patterns(rules.include)
+        self.exclude = _split_patterns(rules.exclude)
+        self.relative = bool(self.include[1] or self.exclude[1])
+        self.gitignore: list[tuple[str, list[_IgnoreRule]]] | None = None
+        if rules.gitignore:
+            self.gitignore = []
+            # The .gitignore files of the parent directories, up to the
+            # repository root, apply to the scanned directory too.
+            parents: list[Path] = []
+            for parent in Path(self.db_dir).absolute().parents:
+                parents.append(parent)
+                if (parent / ".git").exists():
+                    for directory in reversed(parents):
+                        self._load_gitignore(str(directory))
+                    break
+
+    def enter(self, directory: str) -> None:
+        if self.gitignore is not None:
+            self._load_gitignore(os.path.abspath(directory))
+
+    def excludes(self, root: str, name: str, is_dir: bool) -> bool:
+        if name in DEFAULT_EXCLUDES and is_dir:
+            return True
+        path = os.path.join(root, name)
+        relative = None
+        if self.relative:
+            relative = os.path.relpath(path, self.db_dir).replace(os.sep, "/")
+        if _matches(self.exclude, name, relative):
+            return True
+        # Directories are entered to look for included files.
+        if not is_dir and self.include != ((), ()):
+            if not _matches(self.include, name, relative):
+                return True
+        if self.gitignore is not None:
+            return self._ignored(os.path.abspath(path), is_dir)
+        return False
+
+    def _load_gitignore(self, directory: str) -> None:
+        assert self.gitignore is not None
+        try:
+            with open(os.path.join(directory, ".gitignore"), encoding="utf-8") as f:
+                lines = f.read().splitlines()
+        except OSError:
+            return
+        rules = [rule for rule in map(_IgnoreRule.parse, lines) if rule is not None]
+        if rules:
+            self.gitignore.append((directory + os.sep, rules))
+
+    def _ignored(self, path: str, is_dir: bool) -> bool:
+        assert self.gitignore is not None
+        ignored = False
+        # Later rules, and the rules of deeper .gitignore files, take
+        # precedence.
+        for base, rules in self.gitignore:
+            if not path.startswith(base):
+                continue
+            relative = path[len(base) :].replace(os.sep, "/")
+            for rule in rules:
+                if (is_dir or not rule.dir_only) and rule.pattern.match(relative):
+                    ignored = not rule.negate
+        return ignored
+
+
+def _split_patterns(patterns: tuple[str, ...]) -> tuple[tuple[str, ...], ...]:
+    """Split patterns into the ones matched against names and the ones
+    matched against relative paths."""
+
+    return (
+        tuple(p for p in patterns if "/" not in p),
+        tuple(p.strip("/") for p in patterns if "/" in p),
+    )
+
+
+def _matches(
+    patterns: tuple[tuple[str, ...], ...], name: str, relative: str | None
+) -> bool:
+    names, paths = patterns
+    if any(fnmatchcase(name, p) for p in names):
+        return True
+    return relative is not None and any(fnmatchcase(relative, p) for p in paths)
+
+
+class _IgnoreRule(NamedTuple):
+    """A pattern of a `.gitignore` file."""
+
+    pattern: re.Pattern[str]
+    negate: bool
+    dir_only: bool
+
+    @classmethod
+    def parse(cls, line: str) -> "_IgnoreRule | None":
+        line = line.rstrip()
+        if not line or line.startswith("#"):
+            return None
+        negate = line.startswith("!")
+        if negate:
+            line = line[1:]
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        if not line:
+            return None
+        # Patterns with a slash other than at the end are relative to the
+        # directory of the .gitignore file, others match at any depth.
+        anchored = "/" in line
+        line = line.lstrip("/")
+        prefix = "" if anchored else "(?:.*/)?"
+        return cls(re.compile(prefix + _translate(line) + "$"), negate, dir_only)
+
+
+def _translate(pattern: str) -> str:
+    """Translate a gitignore glob into a regular expression."""
+
+    parts: list[str] = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            parts.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("/**", i) and i + 3 == len(pattern):
+            parts.append("/.*")
+            i += 3
+        elif pattern.startswith("**", i):
+            parts.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            parts.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            parts.append("[^/]")
+            i += 1
+        elif pattern[i] == "[" and "]" in pattern[i + 2 :]:
+            end = pattern.index("]", i + 2)
+            chars = pattern[i + 1 : end]
+            if chars.startswith("!"):
+                chars = "^" + chars[1:]
+            parts.append("[" + chars + "]")
+            i = end + 1
+        elif pattern[i] == "\\" and i + 1 < len(pattern):
+            parts.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            parts.append(re.escape(pattern[i]))
+            i += 1
+    return "".join(parts)
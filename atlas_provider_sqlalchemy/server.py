@@ -0,0 +1,323 @@
+"""Warm provider process serving `load` requests over a Unix domain socket.
+
+The server keeps the loaded models in memory between requests and executes
+again only the model files whose content changed.  The `load` command
+forwards its request to the server when one is listening on the socket, and
+falls back to loading the models in-process otherwise.
+
+Each request is a single JSON line, and so is its response.  Requests carry
+the versions of Python, the provider and SQLAlchemy of the client, and the
+server declines the ones from another environment.
+
+The socket is only used if it and its directory belong to the current user,
+so that another local user can't serve the DDL given to Atlas.  By default,
+it is created in `XDG_RUNTIME_DIR`, or else in a private directory of the
+temporary directory.
+"""
+
+import io
+import json
+import os
+import signal
+import socket
+import socketserver
+import stat
+import sys
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, TextIO, cast
+
+SOCKET_ENV = "ATLAS_PROVIDER_SQLALCHEMY_SOCKET"
+
+
+class ServerError(Exception):
+    pass
+
+
+def default_socket_path() -> Path:
+    """Get the socket path from the environment, or a per-user default."""
+
+    if os.environ.get(SOCKET_ENV):
+        return Path(os.environ[SOCKET_ENV])
+    if os.environ.get("XDG_RUNTIME_DIR"):
+        return Path(os.environ["XDG_RUNTIME_DIR"]) / "atlas-provider-sqlalchemy.sock"
+    uid = os.getuid() if hasattr(os, "getuid") else 0
+    directory = Path(tempfile.gettempdir()) / f"atlas-provider-sqlalchemy-{uid}"
+    return directory / "provider.sock"
+
+
+def versions() -> dict[str, str]:
+    """Return the versions of Python, the provider and SQLAlchemy, which the
+    client and the server must share."""
+
+    from importlib import metadata
+
+    result = {"python": sys.version}
+    for name in ("atlas-provider-sqlalchemy", "sqlalchemy"):
+        try:
+            result[name] = metadata.version(name)
+        except metadata.PackageNotFoundError:
+            result[name] = "dev"
+    return result
+
+
+def _is_private(path: Path, is_socket: bool) -> bool:
+    """Whether a socket, or a directory, can only be used or replaced by the
+    current user."""
+
+    if not hasattr(os, "getuid"):
+        return True
+    uid = os.getuid()
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return False
+    if is_socket:
+        return stat.S_ISSOCK(st.st_mode) and st.st_uid == uid
+    # Other users can't replace the entries of a directory they can't write
+    # to, or of a sticky one such as /tmp.
+    writable = st.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+    return (
+        stat.S_ISDIR(st.st_mode)
+        and st.st_uid in (uid, 0)
+        and (not writable or bool(st.st_mode & stat.S_ISVTX))
+    )
+
+
+def forward(request: dict[str, Any], socket_path: Path) -> dict[str, Any] | None:
+    """Send a request to the server listening on `socket_path`.  Return None
+    if no server is listening or it declined to serve the request."""
+
+    if not hasattr(socket, "AF_UNIX") or not os.path.exists(socket_path):
+        return None
+    if not (_is_private(socket_path, True) and _is_private(socket_path.parent, False)):
+        print(
+            f"Ignoring {socket_path}, which doesn't belong to the current user.",
+            file=sys.stderr,
+        )
+        return None
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(str(socket_path))
+            request = {**request, "versions": versions()}
+            sock.sendall(json.dumps(request).encode() + b"\n")
+            with sock.makefile("rb") as f:
+                response = json.loads(f.readline())
+    except (OSError, ValueError):
+        return None
+    if response.get("declined"):
+        return None
+    return response
+
+
+class _ThreadLocalStream(io.TextIOBase):
+    """A stream that writes to a per-thread buffer when one is set, so that
+    concurrent requests don't mix their output."""
+
+    def __init__(self, default: TextIO):
+        self.default = default
+        self.local = threading.local()
+
+    def _target(self) -> TextIO:
+        return getattr(self.local, "buffer", None) or self.default
+
+    def write(self, s: str) -> int:
+        return self._target().write(s)
+
+    def flush(self) -> None:
+        self._target().flush()
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        server = cast("ProviderServer", self.server)
+        try:
+            request = json.loads(self.rfile.readline())
+        except ValueError:
+            return
+        if request.get("ping"):
+            response: dict[str, Any] = {"pong": True}
+        elif request.get("versions") != server.versions:
+            # The models would be loaded by another version of the provider
+            # or of SQLAlchemy than the client's.
+            response = {"declined": True}
+        elif request.get("cwd") != os.getcwd():
+            # Relative paths and imports resolve against the working directory
+            # of the server, so let the client load the models itself.
+            response = {"declined": True}
+        else:
+            response = server.handle_load(request)
+        self.wfile.write(json.dumps(response).encode() + b"\n")
+
+
+class ProviderServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Serve `load` requests with the models kept loaded between requests.
+
+    Requests are served one at a time, as importing modules mutates
+    process-wide state, and loading the models of a request may change the
+    tables another request is emitting the DDL of.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: Path):
+        from atlas_provider_sqlalchemy.cache import CompiledCache
+
+        self.socket_path = socket_path
+        self.load_lock = threading.Lock()
+        # Project files imported by the models (e.g. a shared declarative base
+        # outside the models directory), with their modification times.
+        self.dependencies: dict[str, int] = {}
+        # Statements of the tables unchanged since the previous request.
+        self.compiled_cache = CompiledCache()
+        self.versions = versions()
+        super().__init__(str(socket_path), _RequestHandler)
+        os.chmod(socket_path, 0o600)
+
+    def handle_load(self, request: dict[str, Any]) -> dict[str, Any]:
+        from atlas_provider_sqlalchemy import ddl
+        from atlas_provider_sqlalchemy.cache import imported_project_files
+        from atlas_provider_sqlalchemy.ddl import ModelsNotFoundError, ModuleImportError
+        from atlas_provider_sqlalchemy.main import (
+            Dialect,
+            collect_models,
+            dump_models,
+            print_error,
+        )
+        from atlas_provider_sqlalchemy.scan import ScanRules, scan_directory
+
+        stdout, stderr = io.StringIO(), io.StringIO()
+        _set_thread_output(stdout, stderr)
+        outputs: dict[str, str] = {}
+        code = 0
+        try:
+            dialects = [Dialect(d) for d in request["dialect"]]
+            rules = ScanRules(
+                tuple(request.get("include", ())),
+                tuple(request.get("exclude", ())),
+                request.get("gitignore", False),
+            )
+            scans = {Path(p): scan_directory(Path(p), rules) for p in request["path"]}
+            scanned = {f.path.absolute() for files in scans.values() for f in files}
+            roots = [p.absolute() for p in scans]
+            # The files are parsed and the statements compiled in this
+            # process: forking worker processes from a multi-threaded server
+            # is unsafe.
+            with self.load_lock:
+                reuse = self._purge_changed_dependencies()
+                # Unload the modules of the deleted model files.
+                ddl.unload_modules(
+                    path
+                    for path in list(ddl._loaded_modules)
+                    if path not in scanned
+                    and any(path.is_relative_to(r) for r in roots)
+                )
+                modules = set(sys.modules)
+                metadata_list, directives = collect_models(
+                    scans,
+                    request.get("skip_errors", False),
+                    reuse_unchanged=reuse,
+                    static=request.get("static", False),
+                    packages=request.get("packages", False),
+                    stubs=request.get("stubs", ()),
+                )
+                for file in imported_project_files(modules):
+                    if file not in scanned:
+                        self.dependencies[str(file)] = os.stat(file).st_mtime_ns
+                # Emitted under the lock too, as the next request may remove
+                # the tables of changed files from the metadata.
+                ddls = dump_models(
+                    dialects, metadata_list, directives, self.compiled_cache
+                )
+                self.compiled_cache.save()
+            outputs = {dialect.value: ddl for dialect, ddl in ddls.items()}
+        except (ModuleImportError, ModelsNotFoundError) as e:
+            print_error(e)
+            code = 1
+        finally:
+            _set_thread_output(None, None)
+        return {
+            "code": code,
+            "stdout": stdout.getvalue(),
+            "stderr": stderr.getvalue(),
+            "outputs": outputs,
+        }
+
+    def _purge_changed_dependencies(self) -> bool:
+        """Unload the imported project files if any of them changed. Returns
+        whether the loaded model modules can be reused."""
+
+        from atlas_provider_sqlalchemy.cache import CompiledCache
+
+        for file, mtime_ns in self.dependencies.items():
+            if not os.path.exists(file) or os.stat(file).st_mtime_ns != mtime_ns:
+                break
+        else:
+            return True
+        # Modules imported by their real name are cached in sys.modules, and
+        # the ones importing a changed file hold references to it, so import
+        # all of them again along with the model files.
+        for name, module in list(sys.modules.items()):
+            file = getattr(module, "__file__", None)
+            if file and os.path.abspath(file) in self.dependencies:
+                del sys.modules[name]
+        self.dependencies.clear()
+        # The statements may have been compiled by the changed code, e.g. of
+        # a custom type.
+        self.compiled_cache = CompiledCache()
+        return False
+
+    def server_close(self) -> None:
+        super().server_close()
+        if isinstance(sys.stdout, _ThreadLocalStream):
+            sys.stdout = sys.stdout.default
+        if isinstance(sys.stderr, _ThreadLocalStream):
+            sys.stderr = sys.stderr.default
+        try:
+            os.unlink(self.socket_path)
+        except FileNotFoundError:
+            pass
+
+
+_streams_lock = threading.Lock()
+
+
+def _set_thread_output(stdout: TextIO | None, stderr: TextIO | None) -> None:
+    """Redirect the output of the current thread, or restore it if None."""
+
+    with _streams_lock:
+        if not isinstance(sys.stdout, _ThreadLocalStream):
+            sys.stdout = _ThreadLocalStream(sys.stdout)
+        if not isinstance(sys.stderr, _ThreadLocalStream):
+            sys.stderr = _ThreadLocalStream(sys.stderr)
+    sys.stdout.local.buffer = stdout
+    sys.stderr.local.buffer = stderr
+
+
+def serve(socket_path: Path) -> None:
+    """Serve requests on `socket_path` until interrupted."""
+
+    if not hasattr(socket, "AF_UNIX"):
+        raise ServerError("Unix domain sockets are not supported on this platform.")
+    socket_path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+    if not _is_private(socket_path.parent, False):
+        raise ServerError(
+            f"{socket_path.parent} can be written to by other users, "
+            "choose another socket path."
+        )
+    if os.path.lexists(socket_path):
+        if not _is_private(socket_path, True):
+            raise ServerError(f"{socket_path} doesn't belong to the current user.")
+        if forward({"ping": True}, socket_path) is not None:
+            raise ServerError(f"A server is already listening on {socket_path}.")
+        socket_path.unlink()
+
+    # Remove the socket when terminated, not only when interrupted.
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    with ProviderServer(socket_path) as server:
+        print(f"Listening on {socket_path}", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
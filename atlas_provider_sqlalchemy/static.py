@@ -0,0 +1,347 @@
+"""Static loading of the models, without importing the application.
+
+In static mode, the model files are not imported as is.  Their source is
+executed with the imports of third-party packages removed, so settings,
+clients and SDKs imported by the models are never loaded.  Imports of
+SQLAlchemy, its extensions and the standard library are executed, and
+imports of the project's own modules load them statically in turn, without
+executing the real import.  SQLAlchemy then builds the tables from the class
+bodies and `Table(...)` calls as usual, so the schema is the same as when
+importing the models.
+
+A file that uses a name it imported from a removed import fails with a
+`NameError`.  Such files, and the files importing them, fall back to being
+imported for real by `get_metadata`.
+"""
+
+import ast
+import builtins
+import hashlib
+import importlib.machinery
+import importlib.util
+import site
+import sys
+import sysconfig
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Callable, Sequence
+
+import sqlalchemy as sa
+
+from atlas_provider_sqlalchemy import profiling
+from atlas_provider_sqlalchemy.ddl import (
+    ModelsNotFoundError,
+    ModuleImportError,
+    _find_spec,
+    _module_name,
+    _record_module_tables,
+    _record_tables,
+    _remove_tables,
+    find_metadata,
+    get_metadata,
+)
+from atlas_provider_sqlalchemy.scan import SourceFile, scan_directory
+
+# Packages imported for real in static mode, besides the standard library
+# and packages named `sqlalchemy_*`, as they define the schema.
+LIBRARIES = frozenset({"sqlalchemy", "clickhouse_sqlalchemy", "typing_extensions"})
+
+
+def _site_dirs() -> tuple[str, ...]:
+    dirs = {sysconfig.get_paths()[name] for name in ("purelib", "platlib")}
+    dirs.update(site.getsitepackages())
+    dirs.add(site.getusersitepackages())
+    return tuple(str(Path(d).absolute()) for d in dirs)
+
+
+# Directories of the installed third-party packages.
+_SITE_DIRS = _site_dirs()
+
+
+class StaticLoader:
+    """Execute model files and the project modules they import, with the
+    imports of third-party packages removed.
+
+    The loaded modules are registered in `sys.modules` under their name, so
+    files imported for real afterwards share them, until `close` restores
+    the previous modules.
+    """
+
+    def __init__(self) -> None:
+        self.modules: dict[str, ModuleType] = {}
+        self._failed: set[str] = set()
+        # Packages replaced by empty ones, as their `__init__` failed.
+        self._substituted: set[str] = set()
+        self._saved: dict[str, ModuleType | None] = {}
+        self._specs: dict[str, importlib.machinery.ModuleSpec | None] = {}
+        self._project: dict[str, bool] = {}
+        self._builtins = {**vars(builtins), "__import__": self._import}
+
+    def load_file(self, path: Path, source: bytes) -> ModuleType:
+        """Load a model file, and return its module.  Raises the error of
+        the file, or of a project module it imports, if it can't be loaded
+        statically."""
+
+        path = path.absolute()
+        name = self._module_name(path)
+        if name is None:
+            digest = hashlib.sha256(str(path).encode()).hexdigest()[:16]
+            name = f"atlas_static_module_{digest}"
+            return self._exec(name, path, source, package=None)
+        if name in self._substituted:
+            raise ImportError(f"{name} could not be loaded statically")
+        return self._load_module(name)
+
+    def close(self) -> None:
+        """Restore the modules of `sys.modules` replaced by static ones."""
+
+        for name, previous in self._saved.items():
+            if previous is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = previous
+        self._saved.clear()
+
+    def _exec(
+        self,
+        name: str,
+        path: Path,
+        source: bytes,
+        package: str | None,
+        search_locations: list[str] | None = None,
+    ) -> ModuleType:
+        module = ModuleType(name)
+        module.__file__ = str(path)
+        module.__package__ = package
+        if search_locations is not None:
+            module.__path__ = search_locations
+        module.__dict__["__builtins__"] = self._builtins
+        self._register(name, module)
+        try:
+            tree = ast.parse(source, str(path))
+            _remove_imports(tree.body, self._keep)
+            code = compile(tree, str(path), "exec", dont_inherit=True)
+            with _record_tables(module.__dict__) as tables:
+                try:
+                    exec(code, module.__dict__)
+                except BaseException:
+                    # Remove the tables created before the error, as the file
+                    # is executed again when imported for real.
+                    _remove_tables(tables)
+                    raise
+        except BaseException:
+            self._failed.add(name)
+            self._unregister(name)
+            raise
+        self.modules[name] = module
+        return module
+
+    def _register(self, name: str, module: ModuleType) -> None:
+        if name not in self._saved:
+            self._saved[name] = sys.modules.get(name)
+        sys.modules[name] = module
+
+    def _unregister(self, name: str) -> None:
+        previous = self._saved.pop(name, None)
+        if previous is None:
+            sys.modules.pop(name, None)
+        else:
+            sys.modules[name] = previous
+
+    def _load_module(self, fullname: str) -> ModuleType:
+        if fullname in self.modules:
+            return self.modules[fullname]
+        if fullname in self._failed:
+            raise ImportError(f"{fullname} could not be loaded statically")
+        parent, _, child = fullname.rpartition(".")
+        parent_module = self._load_package(parent) if parent else None
+        spec = self._find_spec(fullname)
+        if spec is None:
+            raise ModuleNotFoundError(f"No module named {fullname!r}", name=fullname)
+        search_locations = (
+            None
+            if spec.submodule_search_locations is None
+            else list(spec.submodule_search_locations)
+        )
+        package = fullname if search_locations is not None else parent or None
+        if spec.origin is None or not spec.origin.endswith(".py"):
+            # A namespace package, or a module without source.
+            if search_locations is None:
+                raise ImportError(f"{fullname} has no Python source")
+            module = ModuleType(fullname)
+            module.__package__ = package
+            module.__path__ = search_locations
+            self._register(fullname, module)
+            self.modules[fullname] = module
+        else:
+            with open(spec.origin, "rb") as f:
+                source = f.read()
+            module = self._exec(
+                fullname, Path(spec.origin), source, package, search_locations
+            )
+        if parent_module is not None:
+            setattr(parent_module, child, module)
+        return module
+
+    def _load_package(self, fullname: str) -> ModuleType:
+        """Load a package, or an empty one if its `__init__` module can't be
+        loaded statically, e.g. as it creates the application, so that the
+        modules of the package can still be."""
+
+        try:
+            return self._load_module(fullname)
+        except Exception:
+            spec = self._find_spec(fullname)
+            if spec is None or spec.submodule_search_locations is None:
+                raise
+            module = ModuleType(fullname)
+            module.__package__ = fullname
+            module.__path__ = list(spec.submodule_search_locations)
+            self._failed.discard(fullname)
+            self._substituted.add(fullname)
+            self._register(fullname, module)
+            self.modules[fullname] = module
+            return module
+
+    def _import(
+        self,
+        name: str,
+        globals: dict[str, Any] | None = None,
+        locals: Any = None,
+        fromlist: Any = (),
+        level: int = 0,
+    ) -> ModuleType:
+        """`__import__` of the statically loaded modules."""
+
+        if level:
+            package = (globals or {}).get("__package__")
+            fullname = importlib.util.resolve_name("." * level + name, package)
+        else:
+            fullname = name
+        if not self.is_project(fullname):
+            return builtins.__import__(name, globals, locals, fromlist, level)
+        module = self._load_module(fullname)
+        if not fromlist:
+            if level:
+                return module
+            return self.modules[fullname.partition(".")[0]]
+        if hasattr(module, "__path__"):
+            for item in fromlist:
+                if item != "*" and not hasattr(module, item):
+                    submodule = f"{fullname}.{item}"
+                    if self._find_spec(submodule) is not None:
+                        self._load_module(submodule)
+        return module
+
+    def _keep(self, fullname: str) -> bool:
+        return _is_library(fullname.partition(".")[0]) or self.is_project(fullname)
+
+    def is_project(self, fullname: str) -> bool:
+        """Whether a module belongs to the project, rather than to a package
+        installed in the environment or to the standard library."""
+
+        top = fullname.partition(".")[0]
+        if top not in self._project:
+            spec = None
+            if not _is_library(top):
+                spec = self._find_spec(top)
+            self._project[top] = spec is not None and not _is_installed(spec)
+        return self._project[top]
+
+    def _find_spec(self, fullname: str) -> importlib.machinery.ModuleSpec | None:
+        return _find_spec(fullname, self._specs)
+
+    def _module_name(self, path: Path) -> str | None:
+        return _module_name(path, self._specs)
+
+
+def _remove_imports(statements: list[ast.stmt], keep: Callable[[str], bool]) -> None:
+    """Replace the imports of the modules not to `keep` with `pass`, in the
+    given statements and the blocks they contain, except function bodies,
+    which are not executed by loading the module.  Only statements are
+    visited, as expressions can't contain imports."""
+
+    for i, statement in enumerate(statements):
+        if isinstance(statement, ast.Import):
+            statement.names = [alias for alias in statement.names if keep(alias.name)]
+            if not statement.names:
+                statements[i] = ast.copy_location(ast.Pass(), statement)
+        elif isinstance(statement, ast.ImportFrom):
+            if not statement.level and not keep(statement.module or ""):
+                statements[i] = ast.copy_location(ast.Pass(), statement)
+        elif not isinstance(statement, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            for field in ("body", "orelse", "finalbody"):
+                block = getattr(statement, field, None)
+                if block:
+                    _remove_imports(block, keep)
+            for handler in getattr(statement, "handlers", ()):
+                _remove_imports(handler.body, keep)
+            for case in getattr(statement, "cases", ()):
+                _remove_imports(case.body, keep)
+
+
+def _is_library(top: str) -> bool:
+    return (
+        top in LIBRARIES
+        or top in sys.stdlib_module_names
+        or top.startswith("sqlalchemy_")
+    )
+
+
+def _is_installed(spec: importlib.machinery.ModuleSpec) -> bool:
+    locations = list(spec.submodule_search_locations or ()) or [spec.origin or ""]
+    return any(
+        str(Path(location).absolute()).startswith(_SITE_DIRS)
+        for location in locations
+        if location
+    )
+
+
+def get_metadata_static(
+    db_dir: Path,
+    skip_errors: bool = False,
+    files: list[SourceFile] | None = None,
+    stubs: Sequence[str] = (),
+) -> sa.MetaData:
+    """Load the models under `db_dir` statically, like `get_metadata`.  The
+    files that can't be loaded statically are imported for real, with the
+    modules matching the `stubs` patterns imported as stubs."""
+
+    if files is None:
+        files = scan_directory(db_dir)
+    importlib.invalidate_caches()
+    loader = StaticLoader()
+    loaded: list[tuple[ModuleType, list[sa.Table]]] = []
+    fallback = []
+    try:
+        with _record_module_tables() as module_tables:
+            for file in files:
+                try:
+                    with profiling.timed(profiling.IMPORT, str(file.path)):
+                        module = loader.load_file(file.path, file.source)
+                except Exception:
+                    fallback.append(file)
+                    continue
+                loaded.append((module, module_tables.get(module.__name__, [])))
+        metadata = find_metadata(loaded, module_tables)
+        if fallback:
+            try:
+                imported = get_metadata(db_dir, skip_errors, fallback, stubs=stubs)
+            except ModelsNotFoundError:
+                pass
+            except ModuleImportError:
+                # The files imported for real may depend on names that were
+                # removed from the static modules.  Import all the files.
+                loader.close()
+                return get_metadata(db_dir, skip_errors, files, stubs=stubs)
+            else:
+                metadata = metadata or imported
+    finally:
+        loader.close()
+
+    if metadata is None:
+        raise ModelsNotFoundError(
+            "Found no sqlalchemy models/tables in the directory tree."
+        )
+
+    return metadata
@@ -0,0 +1,246 @@
+"""Stub modules replacing heavy dependencies of the models while loading.
+
+Model modules often import application settings, cloud SDK clients or ML
+libraries at module level, which take most of the time to load the models
+but don't affect the schema.  With `--stub`, the modules matching the given
+patterns are not imported: a meta path finder, installed while the models
+are imported, returns empty stub modules instead.  Attributes of a stub
+module are `Stub` placeholders, which can be called, subscripted, iterated,
+used as decorators, context managers or base classes, and whose attributes
+are stubs too.  Modules already imported are used as is.
+
+The stub modules imported while loading, and the attributes read from them,
+are recorded in the active `StubReport`, if any, so that the patterns which
+are not needed can be found.
+"""
+
+import importlib.abc
+import importlib.machinery
+import sys
+from contextlib import contextmanager
+from fnmatch import fnmatchcase
+from types import FunctionType, ModuleType, new_class
+from typing import Any, Iterable, Iterator, Mapping, Sequence
+
+
+def matches(fullname: str, patterns: Sequence[str]) -> bool:
+    """Whether a module, or one of its parent packages, matches one of the
+    glob patterns, e.g. `boto3` or `app.settings*`."""
+
+    parts = fullname.split(".")
+    return any(
+        fnmatchcase(".".join(parts[:i]), pattern)
+        for i in range(1, len(parts) + 1)
+        for pattern in patterns
+    )
+
+
+def _is_dunder(name: str) -> bool:
+    return name.startswith("__") and name.endswith("__")
+
+
+class _StubBase:
+    """Base of the classes deriving from a stub."""
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        pass
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        pass
+
+    def __getattr__(self, name: str) -> "Stub":
+        if _is_dunder(name):
+            raise AttributeError(name)
+        return Stub(f"{type(self).__qualname__}.{name}")
+
+
+class Stub:
+    """A permissive placeholder for an object of a stub module."""
+
+    __slots__ = ("_name", "_base")
+
+    def __init__(self, name: str) -> None:
+        self._name = name
+        self._base: type | None = None
+
+    def __getattr__(self, name: str) -> "Stub":
+        # Special attributes are looked up by many tools, e.g. `__wrapped__`
+        # by `inspect`, and must not be found.
+        if _is_dunder(name):
+            raise AttributeError(name)
+        return Stub(f"{self._name}.{name}")
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        # Used as a decorator, e.g. `@app.task`, keep the decorated function
+        # or class.
+        if len(args) == 1 and not kwargs and isinstance(args[0], (type, FunctionType)):
+            return args[0]
+        return Stub(f"{self._name}()")
+
+    def __getitem__(self, key: Any) -> "Stub":
+        return Stub(f"{self._name}[]")
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(())
+
+    def __len__(self) -> int:
+        return 0
+
+    def __bool__(self) -> bool:
+        return True
+
+    def __contains__(self, item: Any) -> bool:
+        return False
+
+    def __enter__(self) -> "Stub":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        pass
+
+    # Unions in evaluated annotations, e.g. `client: Client | None = None`.
+    def __or__(self, other: Any) -> "Stub":
+        return self
+
+    def __ror__(self, other: Any) -> "Stub":
+        return self
+
+    def __mro_entries__(self, bases: tuple[Any, ...]) -> tuple[type]:
+        # A plain class, so it can be mixed with bases of any metaclass.
+        if self._base is None:
+            self._base = new_class(self._name.rpartition(".")[2], (_StubBase,))
+        return (self._base,)
+
+    def __repr__(self) -> str:
+        return f"<stub {self._name}>"
+
+
+class StubModule(ModuleType):
+    """A module whose attributes are stubs, created lazily when read."""
+
+    def __init__(self, name: str, touched: set[str]) -> None:
+        super().__init__(name)
+        self._touched = touched
+
+    def __getattr__(self, name: str) -> Stub:
+        if _is_dunder(name):
+            raise AttributeError(f"stub module {self.__name__!r} has no {name!r}")
+        self._touched.add(name)
+        # Set on the module, so the same stub is returned on every access.
+        value = Stub(f"{self.__name__}.{name}")
+        setattr(self, name, value)
+        return value
+
+
+class StubFinder(importlib.abc.MetaPathFinder, importlib.abc.Loader):
+    """Find the modules matching the patterns, and load them as stubs.
+
+    The stub modules are packages without locations, so their submodules
+    are stubs too.
+    """
+
+    def __init__(self, patterns: Sequence[str]) -> None:
+        self.patterns = tuple(patterns)
+        self.modules: dict[str, StubModule] = {}
+        # The attributes read from each stub module.
+        self.touched: dict[str, set[str]] = {}
+
+    def find_spec(
+        self, fullname: str, path: Any = None, target: Any = None
+    ) -> importlib.machinery.ModuleSpec | None:
+        if not matches(fullname, self.patterns):
+            return None
+        return importlib.machinery.ModuleSpec(fullname, self, is_package=True)
+
+    def create_module(self, spec: importlib.machinery.ModuleSpec) -> ModuleType:
+        module = StubModule(spec.name, self.touched.setdefault(spec.name, set()))
+        self.modules[spec.name] = module
+        return module
+
+    def exec_module(self, module: ModuleType) -> None:
+        pass
+
+
+@contextmanager
+def stubbing(patterns: Sequence[str]) -> Iterator[StubFinder]:
+    """Import the modules matching the patterns as stubs, and record them in
+    the active report.  The stub modules are removed from `sys.modules`
+    afterwards, so later imports load the real modules."""
+
+    finder = StubFinder(patterns)
+    sys.meta_path.insert(0, finder)
+    try:
+        yield finder
+    finally:
+        sys.meta_path.remove(finder)
+        for name, module in finder.modules.items():
+            if sys.modules.get(name) is module:
+                del sys.modules[name]
+            parent, _, child = name.rpartition(".")
+            if getattr(sys.modules.get(parent), child, None) is module:
+                delattr(sys.modules[parent], child)
+        record(finder.touched)
+
+
+class StubReport:
+    """Record the stub modules imported while loading the models, and the
+    attributes read from them."""
+
+    def __init__(self, patterns: Sequence[str]) -> None:
+        self.patterns = tuple(patterns)
+        self.touched: dict[str, set[str]] = {}
+
+    def record(self, touched: Mapping[str, Iterable[str]]) -> None:
+        for name, attributes in touched.items():
+            self.touched.setdefault(name, set()).update(attributes)
+
+    def report(self) -> dict[str, Any]:
+        """Return the touched stub modules with the attributes read from
+        them, and the patterns which matched no imported module."""
+
+        return {
+            "stubs": [
+                {"module": name, "attributes": sorted(self.touched[name])}
+                for name in sorted(self.touched)
+            ],
+            "unused": [
+                pattern
+                for pattern in self.patterns
+                if not any(matches(name, (pattern,)) for name in self.touched)
+            ],
+        }
+
+    def write(self, destination: str) -> None:
+        """Write the report as JSON to the `destination` file, or to stderr
+        if it is `-`."""
+
+        import json
+
+        if destination == "-":
+            json.dump(self.report(), sys.stderr, indent=2)
+            sys.stderr.write("\n")
+        else:
+            with open(destination, "w") as f:
+                json.dump(self.report(), f, indent=2)
+
+
+_active: StubReport | None = None
+
+
+@contextmanager
+def reporting(report: StubReport) -> Iterator[StubReport]:
+    """Make `report` record the stub modules touched while loading."""
+
+    global _active
+    previous, _active = _active, report
+    try:
+        yield report
+    finally:
+        _active = previous
+
+
+def record(touched: Mapping[str, Iterable[str]]) -> None:
+    """Record touched stub modules, if a report is active."""
+
+    if _active is not None:
+        _active.record(touched)
@@ -0,0 +1,356 @@
+"""`watch` mode: keep the models loaded and write their DDL again whenever a
+model file, or a project file they import, changes.
+
+Changes are detected with inotify on Linux, and by polling the modification
+times of the files elsewhere.  Bursts of changes, e.g. an editor saving
+several files, are debounced into a single rebuild.  A rebuild executes again
+only the changed model files and the modules importing a changed module.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import subprocess
+import sys
+import time
+from pathlib import Path
+from types import ModuleType
+from typing import TYPE_CHECKING, Iterable
+
+from atlas_provider_sqlalchemy.scan import DEFAULT_EXCLUDES, ScanRules, scan_directory
+
+if TYPE_CHECKING:
+    from atlas_provider_sqlalchemy.main import Dialect
+
+
+class PollingWatcher:
+    """Detect changes by comparing the modification times and sizes of the
+    watched files every `interval` seconds."""
+
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self.roots: list[Path] = []
+        self.files: set[Path] = set()
+        self._snapshot: dict[Path, tuple[int, int]] = {}
+
+    def watch(self, roots: Iterable[Path], files: Iterable[Path] = ()) -> None:
+        """Watch the Python files under `roots`, and the given `files`."""
+
+        self.roots = [root.absolute() for root in roots]
+        self.files = {file.absolute() for file in files}
+        # Keep the previous state of the files already watched, so changes
+        # made since are still reported.
+        self._snapshot = {**self._stat(), **self._snapshot}
+
+    def wait(self, timeout: float | None = None) -> set[Path]:
+        """Wait for changes, and return the changed files, or an empty set if
+        nothing changed within `timeout` seconds."""
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            snapshot = self._stat()
+            changed = {
+                path
+                for path in snapshot.keys() | self._snapshot.keys()
+                if snapshot.get(path) != self._snapshot.get(path)
+            }
+            self._snapshot = snapshot
+            if changed:
+                return changed
+            if deadline is not None and time.monotonic() >= deadline:
+                return set()
+            delay = self.interval
+            if deadline is not None:
+                delay = min(delay, max(0.0, deadline - time.monotonic()))
+            time.sleep(delay)
+
+    def close(self) -> None:
+        pass
+
+    def _stat(self) -> dict[Path, tuple[int, int]]:
+        snapshot = {}
+        paths = list(self.files)
+        for root in self.roots:
+            for dirpath, dirnames, filenames in os.walk(root):
+                dirnames[:] = [d for d in dirnames if d not in DEFAULT_EXCLUDES]
+                paths.extend(
+                    Path(dirpath) / name for name in filenames if name.endswith(".py")
+                )
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            snapshot[path] = (st.st_mtime_ns, st.st_size)
+        return snapshot
+
+
+class InotifyWatcher:
+    """Detect changes with the Linux inotify API."""
+
+    _IN_MODIFY = 0x2
+    _IN_CLOSE_WRITE = 0x8
+    _IN_MOVED_FROM = 0x40
+    _IN_MOVED_TO = 0x80
+    _IN_CREATE = 0x100
+    _IN_DELETE = 0x200
+    _IN_Q_OVERFLOW = 0x4000
+    _IN_ISDIR = 0x40000000
+    _MASK = (
+        _IN_MODIFY
+        | _IN_CLOSE_WRITE
+        | _IN_MOVED_FROM
+        | _IN_MOVED_TO
+        | _IN_CREATE
+        | _IN_DELETE
+    )
+    _EVENT = struct.Struct("iIII")
+
+    def __init__(self) -> None:
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._dirs: dict[int, Path] = {}
+        self._watched: set[Path] = set()
+        self.roots: list[Path] = []
+        self.files: set[Path] = set()
+
+    def watch(self, roots: Iterable[Path], files: Iterable[Path] = ()) -> None:
+        """Watch the Python files under `roots`, and the given `files`."""
+
+        self.roots = [root.absolute() for root in roots]
+        self.files = {file.absolute() for file in files}
+        for root in self.roots:
+            self._add_tree(root)
+        for file in self.files:
+            self._add(file.parent)
+
+    def wait(self, timeout: float | None = None) -> set[Path]:
+        """Wait for changes, and return the changed files, or an empty set if
+        nothing changed within `timeout` seconds."""
+
+        while True:
+            ready, _, _ = select.select([self._fd], [], [], timeout)
+            if not ready:
+                return set()
+            changed = self._read()
+            if changed:
+                return changed
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+    def _add_tree(self, root: Path) -> None:
+        for dirpath, dirnames, _ in os.walk(root):
+            dirnames[:] = [d for d in dirnames if d not in DEFAULT_EXCLUDES]
+            self._add(Path(dirpath))
+
+    def _add(self, directory: Path) -> None:
+        if directory in self._watched:
+            return
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), self._MASK)
+        if wd >= 0:
+            self._dirs[wd] = directory
+            self._watched.add(directory)
+
+    def _read(self) -> set[Path]:
+        changed: set[Path] = set()
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return changed
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = self._EVENT.unpack_from(data, offset)
+            offset += self._EVENT.size
+            name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+            if mask & self._IN_Q_OVERFLOW:
+                # Events were lost, so consider every watched file changed.
+                changed.update(self._watched, self.files)
+                continue
+            if wd not in self._dirs:
+                continue
+            path = self._dirs[wd] / os.fsdecode(name)
+            if mask & self._IN_ISDIR:
+                if mask & (self._IN_CREATE | self._IN_MOVED_TO):
+                    self._add_tree(path)
+                    changed.add(path)
+            elif path.suffix == ".py" and (
+                path in self.files or any(path.is_relative_to(r) for r in self.roots)
+            ):
+                changed.add(path)
+        return changed
+
+
+def create_watcher(poll: bool = False) -> InotifyWatcher | PollingWatcher:
+    """Create an inotify watcher if available, or a polling one."""
+
+    if not poll and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher()
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher()
+
+
+class Builder:
+    """Load the models and write their DDL, reusing the modules of unchanged
+    files between builds."""
+
+    def __init__(
+        self,
+        dialects: list["Dialect"],
+        paths: list[Path],
+        output: str,
+        skip_errors: bool = False,
+        hook: str | None = None,
+        rules: ScanRules | None = None,
+    ):
+        from atlas_provider_sqlalchemy.cache import CompiledCache
+
+        self.dialects = dialects
+        self.paths = paths
+        self.output = output
+        self.skip_errors = skip_errors
+        self.hook = hook
+        self.rules = rules
+        # Project files imported by the models, outside of `paths`.
+        self.dependencies: set[Path] = set()
+        self.compiled_cache = CompiledCache()
+
+    def build(self) -> bool:
+        """Load the models and write their DDL.  Returns whether it succeeded;
+        on failure, the error is printed and the output left unchanged."""
+
+        from atlas_provider_sqlalchemy import ddl
+        from atlas_provider_sqlalchemy.cache import imported_project_files
+        from atlas_provider_sqlalchemy.main import collect_models, print_error
+        from atlas_provider_sqlalchemy.output import open_output
+
+        scans = {p: scan_directory(p, self.rules) for p in self.paths}
+        scanned = {f.path.absolute() for files in scans.values() for f in files}
+        roots = [p.absolute() for p in self.paths]
+        # Unload the modules of the deleted model files.
+        ddl.unload_modules(
+            path
+            for path in list(ddl._loaded_modules)
+            if path not in scanned and any(path.is_relative_to(r) for r in roots)
+        )
+        modules = set(sys.modules)
+        try:
+            metadata_list, directives = collect_models(
+                scans, self.skip_errors, reuse_unchanged=True
+            )
+        except (ddl.ModuleImportError, ddl.ModelsNotFoundError) as e:
+            print_error(e)
+            return False
+        finally:
+            self.dependencies.update(
+                file for file in imported_project_files(modules) if file not in scanned
+            )
+        for dialect in self.dialects:
+            with open_output(self.output, dialect.value) as f:
+                ddl.dump_ddl(
+                    dialect.value, metadata_list, directives, f, self.compiled_cache
+                )
+        self.compiled_cache.save()
+        if self.hook:
+            subprocess.run(self.hook, shell=True, check=False)
+        return True
+
+    def invalidate(self, changed: set[Path]) -> None:
+        """Unload the modules of the changed files and the modules importing
+        them, so the next build executes them again.  Changed model files are
+        executed again by the build anyway, as their content changed."""
+
+        from atlas_provider_sqlalchemy import ddl
+        from atlas_provider_sqlalchemy.cache import CompiledCache, project_modules
+
+        if not changed.isdisjoint(self.dependencies):
+            # The statements may have been compiled by the changed code, e.g.
+            # of a custom type.
+            self.compiled_cache = CompiledCache()
+        project = project_modules()
+        names = {
+            name
+            for name, module in project.items()
+            if Path(os.path.abspath(module.__file__ or "")) in changed
+        }
+        names = _dependents(names, project)
+        # Referenced here, the released modules wouldn't be collected by
+        # `unload_modules`, and their classes would clash with the new ones.
+        del project
+        loaded = {m.name: path for path, m in ddl._loaded_modules.items()}
+        for name in names - loaded.keys():
+            sys.modules.pop(name, None)
+        ddl.unload_modules(loaded[name] for name in names if name in loaded)
+
+
+def _dependents(names: set[str], modules: dict[str, ModuleType]) -> set[str]:
+    """Return the given module names, along with the names of the modules
+    that import them, directly or not."""
+
+    def imports(module: ModuleType) -> set[str]:
+        referenced = set()
+        for value in list(vars(module).values()):
+            if isinstance(value, ModuleType):
+                referenced.add(value.__name__)
+            else:
+                name = getattr(value, "__module__", None)
+                if isinstance(name, str):
+                    referenced.add(name)
+        return referenced
+
+    def depends(referenced: set[str], names: set[str]) -> bool:
+        # A reference to a package covers its submodules.
+        return any(
+            r == name or name.startswith(r + ".") for r in referenced for name in names
+        )
+
+    graph = {name: imports(module) for name, module in modules.items()}
+    result = set(names)
+    while True:
+        new = {
+            name
+            for name, referenced in graph.items()
+            if name not in result and depends(referenced, result)
+        }
+        if not new:
+            return result
+        result |= new
+
+
+def watch(
+    dialects: list["Dialect"],
+    paths: list[Path],
+    output: str,
+    skip_errors: bool = False,
+    hook: str | None = None,
+    debounce: float = 0.2,
+    poll: bool = False,
+    rules: ScanRules | None = None,
+) -> None:
+    """Write the DDL of the models to `output`, and again whenever a file
+    changes, until interrupted."""
+
+    builder = Builder(dialects, paths, output, skip_errors, hook, rules)
+    watcher = create_watcher(poll)
+    try:
+        watcher.watch(paths)
+        while True:
+            if builder.build():
+                print(f"Wrote the DDL to {output}", file=sys.stderr)
+            watcher.watch(paths, builder.dependencies)
+            changed = watcher.wait()
+            # Wait for the changes to settle, to rebuild once per burst.
+            while more := watcher.wait(debounce):
+                changed |= more
+            builder.invalidate(changed)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
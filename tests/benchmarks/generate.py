@@ -0,0 +1,133 @@
+"""Generate synthetic model trees for the benchmarks.
+
+The tree is a `bench_models` package with the declarative base in
+`bench_models.base`, and the models in nested subpackages of
+`bench_models.models`, each module defining a few tables.  Tables alternate between declarative classes and
+`Table(...)` objects sharing the same `MetaData`, and have foreign keys to
+earlier tables, indexes, and every `cycle_every` tables a foreign key to a
+later table, which creates dependency cycles broken with `use_alter`.
+"""
+
+import argparse
+import random
+from pathlib import Path
+
+PACKAGE = "bench_models"
+
+BASE = """\
+from sqlalchemy.orm import DeclarativeBase
+
+
+class Base(DeclarativeBase):
+    pass
+"""
+
+HEADER = """\
+import sqlalchemy as sa
+from sqlalchemy.orm import Mapped, mapped_column
+
+from bench_models.base import Base
+"""
+
+CLASS = """
+
+class Model{i}(Base):
+    __tablename__ = "table_{i}"
+    __table_args__ = (sa.Index("ix_table_{i}_code", "code", "created_at"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    code: Mapped[str] = mapped_column(sa.String(32), unique=True)
+    name: Mapped[str] = mapped_column(sa.String({length}), index=True)
+    created_at = mapped_column(sa.DateTime, server_default=sa.func.now())
+{foreign_keys}"""
+
+TABLE = """
+
+table_{i} = sa.Table(
+    "table_{i}",
+    Base.metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("code", sa.String(32), nullable=False),
+    sa.Column("amount", sa.Numeric(12, 2), server_default="0"),
+    sa.Column("status", sa.Enum("new", "done", name="status_{i}")),
+{foreign_keys}    sa.Index("ix_table_{i}_code", "code"),
+)
+"""
+
+
+def generate(
+    root: Path,
+    tables: int,
+    tables_per_file: int = 10,
+    files_per_package: int = 10,
+    cycle_every: int = 50,
+    seed: int = 0,
+) -> Path:
+    """Write a model tree with `tables` tables under `root`, and return the
+    directory of the models.  `root` must be on `sys.path` to load them."""
+
+    rng = random.Random(seed)
+    package = root / PACKAGE
+    package.mkdir(parents=True)
+    (package / "__init__.py").write_text("")
+    (package / "base.py").write_text(BASE)
+    models = package / "models"
+    models.mkdir()
+    (models / "__init__.py").write_text("")
+    files = (tables + tables_per_file - 1) // tables_per_file
+    for f in range(files):
+        # Spread the files over two levels of subpackages.
+        directory = models
+        for level in (f // files_per_package**2, f // files_per_package):
+            directory = directory / f"pkg_{level}"
+            if not directory.exists():
+                directory.mkdir()
+                (directory / "__init__.py").write_text("")
+        source = HEADER
+        start = f * tables_per_file
+        for i in range(start, min(start + tables_per_file, tables)):
+            references = [rng.randrange(i)] if i else []
+            if i % cycle_every == cycle_every - 1 and i + 1 < tables:
+                references.append(rng.randrange(i + 1, tables))
+            source += _table(i, references, rng)
+        (directory / f"models_{f}.py").write_text(source)
+    return models
+
+
+def _table(i: int, references: list[int], rng: random.Random) -> str:
+    if i % 2:
+        foreign_keys = "".join(
+            f'    sa.Column("ref_{r}", sa.ForeignKey("table_{r}.id"{_alter(i, r)})),\n'
+            for r in references
+        )
+        return TABLE.format(i=i, foreign_keys=foreign_keys)
+    foreign_keys = "".join(
+        f"    ref_{r} = mapped_column("
+        f'sa.ForeignKey("table_{r}.id"{_alter(i, r)}), index=True)\n'
+        for r in references
+    )
+    return CLASS.format(
+        i=i, length=rng.choice((30, 60, 120)), foreign_keys=foreign_keys
+    )
+
+
+def _alter(i: int, reference: int) -> str:
+    # Foreign keys to later tables close cycles, created after the tables.
+    if reference > i:
+        return f', use_alter=True, name="fk_table_{i}_ref_{reference}"'
+    return ""
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("root", type=Path)
+    parser.add_argument("--tables", type=int, default=1000)
+    parser.add_argument("--tables-per-file", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    models = generate(args.root, args.tables, args.tables_per_file, seed=args.seed)
+    print(models)
+
+
+if __name__ == "__main__":
+    main()
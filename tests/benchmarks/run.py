@@ -0,0 +1,243 @@
+"""Benchmark the provider on synthetic model trees.
+
+For each scale, a model tree is generated (see `generate`) and measured in
+fresh processes: the phases `scan_directory`, `get_metadata`,
+`get_file_directives` and `dump_ddl` separately, then the `load` command end
+to end.  The best time of `--repeat` runs is kept, along with the peak
+resident memory of the processes.
+
+Results are written as JSON, and compared with a baseline when given:
+
+    python -m tests.benchmarks.run --tables 100 1000 10000 --output new.json \\
+        --baseline old.json --threshold 0.2
+
+The command exits with status 1 if a measure regressed by more than the
+threshold.
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+from tests.benchmarks.generate import generate
+
+ROOT = Path(__file__).parent.parent.parent
+
+# Measures compared with the baseline.
+MEASURES = (
+    "scan",
+    "get_metadata",
+    "get_file_directives",
+    "dump_ddl",
+    "load",
+    "peak_rss_kb",
+    "load_peak_rss_kb",
+)
+
+
+def measure_phases(models: Path, dialect: str) -> dict[str, Any]:
+    """Time each phase of loading the models under `models`, in this process."""
+
+    from atlas_provider_sqlalchemy.ddl import (
+        dump_ddl,
+        get_file_directives,
+        get_metadata,
+    )
+    from atlas_provider_sqlalchemy.scan import scan_directory
+
+    result: dict[str, Any] = {}
+    start = time.perf_counter()
+    files = scan_directory(models)
+    result["scan"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    metadata = get_metadata(models, files=files)
+    result["get_metadata"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    directives = get_file_directives(models, metadata, files)
+    result["get_file_directives"] = time.perf_counter() - start
+
+    output = io.StringIO()
+    start = time.perf_counter()
+    dump_ddl(dialect, [metadata], directives, output)
+    result["dump_ddl"] = time.perf_counter() - start
+
+    result["files"] = len(files)
+    result["tables"] = len(metadata.tables)
+    result["output_bytes"] = len(output.getvalue())
+    return result
+
+
+def run_process(args: list[str], cwd: Path) -> tuple[str, float, int]:
+    """Run a command, and return its output, wall time and peak resident
+    memory in KiB.  Requires `os.wait4`, available on Unix only."""
+
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join([str(ROOT), str(cwd)])}
+    # Files rather than pipes, as the process is reaped with `os.wait4` to
+    # get its resource usage, instead of `communicate`.
+    with tempfile.TemporaryFile() as out, tempfile.TemporaryFile() as err:
+        start = time.perf_counter()
+        process = subprocess.Popen(args, cwd=cwd, env=env, stdout=out, stderr=err)
+        _, status, usage = os.wait4(process.pid, 0)
+        elapsed = time.perf_counter() - start
+        process.returncode = os.waitstatus_to_exitcode(status)
+        if process.returncode:
+            err.seek(0)
+            raise RuntimeError(f"{' '.join(args)} failed:\n{err.read().decode()}")
+        out.seek(0)
+        stdout = out.read().decode()
+    maxrss = usage.ru_maxrss
+    if sys.platform == "darwin":
+        maxrss //= 1024
+    return stdout, elapsed, maxrss
+
+
+def benchmark(tables: int, dialect: str, repeat: int = 1) -> dict[str, Any]:
+    """Generate a model tree with `tables` tables and measure it."""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        models = generate(root, tables)
+        result: dict[str, Any] = {}
+        for _ in range(repeat):
+            stdout, _, maxrss = run_process(
+                [
+                    sys.executable,
+                    "-m",
+                    "tests.benchmarks.run",
+                    "--worker",
+                    str(models),
+                    "--dialect",
+                    dialect,
+                ],
+                root,
+            )
+            _keep_best(result, {**json.loads(stdout), "peak_rss_kb": maxrss})
+            _, elapsed, maxrss = run_process(
+                [
+                    sys.executable,
+                    "-m",
+                    "atlas_provider_sqlalchemy.main",
+                    "load",
+                    "--path",
+                    str(models.relative_to(root)),
+                    "--dialect",
+                    dialect,
+                    "--no-daemon",
+                ],
+                root,
+            )
+            _keep_best(result, {"load": elapsed, "load_peak_rss_kb": maxrss})
+    return result
+
+
+def _keep_best(result: dict[str, Any], run: dict[str, Any]) -> None:
+    for name, value in run.items():
+        if name in MEASURES and name in result:
+            value = min(value, result[name])
+        result[name] = value
+
+
+def compare(
+    baseline: dict[str, Any], current: dict[str, Any], threshold: float
+) -> list[str]:
+    """Return the measures of `current` that regressed by more than
+    `threshold` (a fraction) from `baseline`, matching runs by table count."""
+
+    previous = {run["tables"]: run for run in baseline["results"]}
+    regressions = []
+    for run in current["results"]:
+        old = previous.get(run["tables"])
+        if old is None:
+            continue
+        for name in MEASURES:
+            if (
+                name in run
+                and old.get(name)
+                and run[name] > old[name] * (1 + threshold)
+            ):
+                regressions.append(
+                    f"{run['tables']} tables: {name} {old[name]:.3f} -> "
+                    f"{run[name]:.3f} (+{run[name] / old[name] - 1:.0%})"
+                )
+    return regressions
+
+
+def _commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--tables", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--dialect", default="postgresql")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", type=Path, help="File to write the JSON to.")
+    parser.add_argument("--baseline", type=Path, help="Results to compare with.")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    parser.add_argument("--worker", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(measure_phases(args.worker, args.dialect)))
+        return
+
+    import sqlalchemy
+
+    results: dict[str, Any] = {
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "sqlalchemy": sqlalchemy.__version__,
+        "dialect": args.dialect,
+        "results": [],
+    }
+    for tables in args.tables:
+        run = benchmark(tables, args.dialect, args.repeat)
+        results["results"].append(run)
+        print(
+            f"{tables:>6} tables: "
+            + ", ".join(
+                f"{name}={run[name]:.3f}s"
+                for name in MEASURES
+                if not name.endswith("_kb")
+            )
+            + f", peak={run['peak_rss_kb'] // 1024}MiB",
+            file=sys.stderr,
+        )
+    text = json.dumps(results, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n")
+    else:
+        print(text)
+    if args.baseline:
+        regressions = compare(
+            json.loads(args.baseline.read_text()), results, args.threshold
+        )
+        for regression in regressions:
+            print(f"Regression: {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+MODEL = """
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import String
+
+from {prefix}_base import Base
+
+
+class {name}(Base):
+    __tablename__ = "{prefix}_{table}"
+    id: Mapped[int] = mapped_column(primary_key=True)
+    name: Mapped[str] = mapped_column(String({length}))
+{extra}"""
+
+BASE = """
+from sqlalchemy.orm import DeclarativeBase
+
+
+class Base(DeclarativeBase):
+    {body}
+"""
+
+TYPES = """
+from sqlalchemy.types import UserDefinedType
+
+
+class Money(UserDefinedType):
+    cache_ok = True
+
+    def get_col_spec(self, **kw):
+        return "{spec}"
+"""
+
+PRICE = """
+from sqlalchemy.orm import Mapped, mapped_column
+
+from {prefix}_base import Base
+from {prefix}_types import Money
+
+
+class Price(Base):
+    __tablename__ = "{prefix}_price"
+    id: Mapped[int] = mapped_column(primary_key=True)
+    amount = mapped_column(Money())
+"""
+
+
+def write_model(
+    project: Path, prefix: str, name: str, length: int = 30, extra: str = ""
+) -> Path:
+    """Write the model file of a `user` or `team` table of a project created
+    by `create_project`, followed by the `extra` code."""
+
+    table = name.lower()
+    path = project / "models" / f"{prefix}_{table}.py"
+    path.write_text(
+        MODEL.format(prefix=prefix, name=name, table=table, length=length, extra=extra)
+    )
+    return path
+
+
+def write_base(project: Path, prefix: str, body: str = "pass") -> Path:
+    """Write the module of the declarative base shared by the models."""
+
+    path = project / f"{prefix}_base.py"
+    path.write_text(BASE.format(body=body))
+    return path
+
+
+def create_project(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, prefix: str
+) -> Path:
+    """Create a project with `User` and `Team` models in a `models` directory,
+    sharing a declarative base imported from outside of it.  The tables and
+    the base module are named after `prefix`, so projects of different test
+    modules don't collide in the processes keeping models loaded."""
+
+    (tmp_path / "models").mkdir()
+    for name in ("User", "Team"):
+        write_model(tmp_path, prefix, name)
+    write_base(tmp_path, prefix)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    for module in ("base", "types"):
+        monkeypatch.delitem(sys.modules, f"{prefix}_{module}", raising=False)
+    return tmp_path
+
+
+def write_custom_type(project: Path, prefix: str, spec: str) -> Path:
+    """Write a module outside of the `models` directory defining a custom
+    type rendered as `spec`, and a `price` model using it.  Returns the path
+    of the module."""
+
+    path = project / f"{prefix}_types.py"
+    path.write_text(TYPES.format(spec=spec))
+    (project / "models" / f"{prefix}_price.py").write_text(PRICE.format(prefix=prefix))
+    return path
@@ -0,0 +1,32 @@
+import io
+from pathlib import Path
+
+import pytest
+
+from atlas_provider_sqlalchemy.ddl import dump_ddl, get_metadata
+from tests.benchmarks.generate import generate
+from tests.benchmarks.run import compare
+
+
+def test_generate(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    models = generate(tmp_path, 60, tables_per_file=4, files_per_package=3)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    metadata = get_metadata(models)
+    assert len(metadata.tables) == 60
+    output = io.StringIO()
+    dump_ddl("postgresql", [metadata], [], output)
+    assert output.getvalue().count("CREATE TABLE") == 60
+    # A foreign key to a later table closes a cycle, added with ALTER TABLE.
+    assert "ALTER TABLE" in output.getvalue()
+
+
+def test_compare() -> None:
+    baseline = {"results": [{"tables": 100, "get_metadata": 1.0, "load": 2.0}]}
+    current = {
+        "results": [
+            {"tables": 100, "get_metadata": 1.1, "load": 3.0},
+            {"tables": 1000, "get_metadata": 10.0, "load": 20.0},
+        ]
+    }
+    assert compare(baseline, current, 0.2) == ["100 tables: load 2.000 -> 3.000 (+50%)"]
+    assert compare(baseline, current, 0.6) == []
@@ -0,0 +1,192 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+from pytest import CaptureFixture
+from sqlalchemy import MetaData, Table
+
+from atlas_provider_sqlalchemy import parser
+from atlas_provider_sqlalchemy.cache import OutputCache, ParseCache
+from atlas_provider_sqlalchemy.ddl import get_file_directives
+from atlas_provider_sqlalchemy.directives import Directives
+from atlas_provider_sqlalchemy.main import Dialect, run
+from atlas_provider_sqlalchemy.scan import scan_directory
+from tests.conftest import write_custom_type
+
+MODELS = """
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import String
+
+from shared_base import Base
+
+
+class User(Base):
+    __tablename__ = "cached_user"
+    id: Mapped[int] = mapped_column(primary_key=True)
+    name: Mapped[str] = mapped_column(String({length}))
+"""
+
+BASE = """
+from sqlalchemy.orm import DeclarativeBase
+
+
+class Base(DeclarativeBase):
+    {body}
+"""
+
+
+@pytest.fixture
+def project(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    (tmp_path / "models").mkdir()
+    (tmp_path / "models" / "models.py").write_text(MODELS.format(length=30))
+    (tmp_path / "shared_base.py").write_text(BASE.format(body="pass"))
+    monkeypatch.syspath_prepend(str(tmp_path))
+    for module in ("shared_base", "shared_types"):
+        monkeypatch.delitem(sys.modules, module, raising=False)
+    return tmp_path
+
+
+def _run(project: Path, dialect: Dialect = Dialect.postgresql) -> int:
+    """Run the provider with caching and return the number of loaded metadata."""
+    metadata = run(dialect, [project / "models"], cache_dir=project / "cache")
+    for m in metadata:
+        m.clear()
+    return len(metadata)
+
+
+def test_cache_replays_output(project: Path, capsys: CaptureFixture) -> None:
+    loaded = _run(project)
+    first = capsys.readouterr().out
+    assert loaded == 1
+    assert "CREATE TABLE cached_user" in first
+
+    loaded = _run(project)
+    assert loaded == 0
+    assert capsys.readouterr().out == first
+
+
+def test_cache_invalidated_by_model_change(
+    project: Path, capsys: CaptureFixture
+) -> None:
+    _run(project)
+    capsys.readouterr()
+
+    (project / "models" / "models.py").write_text(MODELS.format(length=60))
+    loaded = _run(project)
+    assert loaded == 1
+    assert "VARCHAR(60)" in capsys.readouterr().out
+
+
+def test_cache_invalidated_by_imported_file_change(
+    project: Path, capsys: CaptureFixture
+) -> None:
+    _run(project)
+    capsys.readouterr()
+
+    # Simulate a new process that would import the changed base module.
+    (project / "shared_base.py").write_text(BASE.format(body="x = 1"))
+    del sys.modules["shared_base"]
+    loaded = _run(project)
+    assert loaded == 1
+
+
+def test_cache_invalidated_by_custom_type_change(
+    project: Path, capsys: CaptureFixture
+) -> None:
+    write_custom_type(project, "shared", "NUMERIC(10, 2)")
+    _run(project)
+    assert "amount NUMERIC(10, 2)" in capsys.readouterr().out
+
+    # The table is unchanged, but the statement compiled by the previous
+    # version of the type is not replayed.
+    write_custom_type(project, "shared", "NUMERIC(12, 4)")
+    del sys.modules["shared_types"]
+    assert _run(project) == 1
+    assert "amount NUMERIC(12, 4)" in capsys.readouterr().out
+
+
+def test_cache_keyed_by_dialect(project: Path, capsys: CaptureFixture) -> None:
+    _run(project, Dialect.postgresql)
+    capsys.readouterr()
+    loaded = _run(project, Dialect.mysql)
+    assert loaded == 1
+    assert "AUTO_INCREMENT" in capsys.readouterr().out
+
+
+def test_cache_prunes_old_entries(project: Path, capsys: CaptureFixture) -> None:
+    _run(project, Dialect.mysql)
+    for length in range(31, 31 + OutputCache.KEEP_ENTRIES + 2):
+        (project / "models" / "models.py").write_text(MODELS.format(length=length))
+        assert _run(project) == 1
+    entries = {path.stem for path in (project / "cache").glob("*.sql")}
+    # The entries of other dialects are kept.
+    assert len(entries) == OutputCache.KEEP_ENTRIES + 1
+    outputs = [(project / "cache" / f"{key}.sql").read_text() for key in entries]
+    assert sum("AUTO_INCREMENT" in output for output in outputs) == 1
+    locks = {path.stem for path in (project / "cache").glob("*.lock")}
+    assert locks == entries | {"ddl-cache", "parse-cache"}
+    capsys.readouterr()
+    assert _run(project) == 0
+    assert f"VARCHAR({length})" in capsys.readouterr().out
+
+
+def test_cache_key_stable(project: Path) -> None:
+    cache = OutputCache(project / "cache")
+    scans = {project / "models": scan_directory(project / "models")}
+    assert cache.key(scans, "mysql", False) == cache.key(scans, "mysql", False)
+    assert cache.key(scans, "mysql", False) != cache.key(scans, "mysql", True)
+
+
+def test_parse_cache(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    for name in ("a", "b"):
+        (tmp_path / "models" / f"{name}.py").parent.mkdir(exist_ok=True)
+        (tmp_path / "models" / f"{name}.py").write_text(
+            f"import sqlalchemy as sa\n\nt = sa.Table('{name}', sa.MetaData())\n"
+        )
+    metadata = MetaData()
+    Table("a", metadata)
+    Table("b", metadata)
+
+    parsed = []
+    extract_tables = parser.extract_tables
+    monkeypatch.setattr(
+        parser,
+        "extract_tables",
+        lambda source, path: parsed.append(path.name) or extract_tables(source, path),
+    )
+
+    def directives() -> Directives:
+        cache = ParseCache(tmp_path / "cache")
+        files = scan_directory(tmp_path / "models")
+        result = get_file_directives(tmp_path / "models", metadata, files, 1, cache)
+        cache.save()
+        return result
+
+    cold = directives()
+    assert sorted(parsed) == ["a.py", "b.py"]
+    parsed.clear()
+    assert directives() == cold
+    assert parsed == []
+
+    (tmp_path / "models" / "b.py").write_text(
+        "import sqlalchemy as sa\n\n\nt = sa.Table('b', sa.MetaData())\n"
+    )
+    assert directives() != cold
+    assert parsed == ["b.py"]
+
+    (tmp_path / "models" / "a.py").unlink()
+    directives()
+    cached = json.loads((tmp_path / "cache" / ParseCache.FILE_NAME).read_text())
+    assert [Path(p).name for p in cached["files"]] == ["b.py"]
+
+    # Providers parsing different files save the same cache concurrently.
+    (tmp_path / "models" / "a.py").write_text("import sqlalchemy\n")
+    first, second = ParseCache(tmp_path / "cache"), ParseCache(tmp_path / "cache")
+    files = {f.path.name: f for f in scan_directory(tmp_path / "models")}
+    first.put(files["a.py"], [])
+    second.put(files["b.py"], [("b", 4)])
+    first.save()
+    second.save()
+    cached = json.loads((tmp_path / "cache" / ParseCache.FILE_NAME).read_text())
+    assert sorted(Path(p).name for p in cached["files"]) == ["a.py", "b.py"]
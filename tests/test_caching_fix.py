@@ -6,10 +6,15 @@ particularly the scenario where file content changes (like after git branch swit
 but Python's bytecode cache might return stale data.
 """
 
+import importlib
+import sys
 import tempfile
 import time
 from pathlib import Path
 
+import pytest
+
+from atlas_provider_sqlalchemy import ddl
 from atlas_provider_sqlalchemy.ddl import get_metadata
 
 
@@ -186,3 +191,48 @@ class ModelV2(Base):
             print(f"Initial mtime: {initial_mtime}, New mtime: {new_mtime}")
             print(f"File content: {models_file.read_text()[:200]}...")
             raise
+
+
+def test_modules_tracked_and_purged(monkeypatch: pytest.MonkeyPatch):
+    """Test that reloading a file replaces its registered module, and that
+    import caches are invalidated once per load rather than once per file."""
+
+    invalidations = []
+    monkeypatch.setattr(importlib, "invalidate_caches", lambda: invalidations.append(1))
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        models_dir = Path(temp_dir)
+        create_sqlalchemy_model_file(models_dir / "a.py", "table_a", "ModelA")
+        create_sqlalchemy_model_file(models_dir / "b.py", "table_b", "ModelB")
+
+        get_metadata(models_dir)
+        assert len(invalidations) == 1
+
+        create_sqlalchemy_model_file(models_dir / "a.py", "table_a2", "ModelA")
+        get_metadata(models_dir)
+        assert len(invalidations) == 2
+
+        names = {ddl._loaded_modules[p.absolute()].name for p in models_dir.iterdir()}
+        registered = {n for n in sys.modules if n.startswith("atlas_dynamic_module_")}
+        assert names <= registered
+        for p in models_dir.iterdir():
+            prefix = ddl._loaded_modules[p.absolute()].name.rsplit("_", 1)[0]
+            assert len([n for n in registered if n.startswith(prefix + "_")]) == 1
+
+
+def test_reuse_unchanged_modules():
+    """Test that long-lived processes can skip executing unchanged files."""
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        models_dir = Path(temp_dir)
+        models_file = models_dir / "models.py"
+        create_sqlalchemy_model_file(models_file, "table_v1", "ModelV1")
+
+        metadata1 = get_metadata(models_dir, reuse_unchanged=True)
+        metadata2 = get_metadata(models_dir, reuse_unchanged=True)
+        assert metadata1 is metadata2
+
+        create_sqlalchemy_model_file(models_file, "table_v2", "ModelV2")
+        metadata3 = get_metadata(models_dir, reuse_unchanged=True)
+        assert metadata3 is not metadata1
+        assert "table_v2" in metadata3.tables
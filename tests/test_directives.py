@@ -0,0 +1,66 @@
+import tracemalloc
+from pathlib import Path
+
+import sqlalchemy as sa
+
+from atlas_provider_sqlalchemy import parser
+from atlas_provider_sqlalchemy.ddl import get_file_directives
+from atlas_provider_sqlalchemy.directives import Directives, Position
+from atlas_provider_sqlalchemy.scan import scan_directory
+
+TABLE = """
+table_{i} = sa.Table(
+    "table_{i}",
+    metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("name", sa.String(30), nullable=False, comment="name of {i}"),
+    sa.Column("parent_id", sa.ForeignKey("table_{i}.id", ondelete="CASCADE")),
+)
+"""
+
+
+def test_directives_sequence() -> None:
+    first, second = Directives(), Directives()
+    first.add("user", "table", first.add_file("/models/user.py"), 3)
+    team = second.add_file("/models/team.py")
+    second.add("team", "table", team, 1)
+    second.add("user", "table", second.add_file("/models/user.py"), 9)
+    merged = Directives([first, second])
+    assert merged.files == ["/models/user.py", "/models/team.py"]
+    assert merged == [
+        "atlas:pos user[type=table] /models/user.py:3",
+        "atlas:pos team[type=table] /models/team.py:1",
+        "atlas:pos user[type=table] /models/user.py:9",
+    ]
+    assert merged[-1] == "atlas:pos user[type=table] /models/user.py:9"
+    assert merged[1:2] == ["atlas:pos team[type=table] /models/team.py:1"]
+    assert list(merged.positions)[1] == Position("team", "table", 1, 1)
+
+
+def test_directives_memory(tmp_path: Path) -> None:
+    metadata = sa.MetaData()
+    for f in range(20):
+        source = "import sqlalchemy as sa\n"
+        for i in range(f * 50, f * 50 + 50):
+            source += TABLE.format(i=i)
+            sa.Table(f"table_{i}", metadata)
+        (tmp_path / f"models_{f}.py").write_text(source)
+    files = scan_directory(tmp_path)
+
+    tracemalloc.start()
+    try:
+        parser.extract_tables(files[0].source, files[0].path)
+        _, parse_peak = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        start, _ = tracemalloc.get_traced_memory()
+        directives = get_file_directives(tmp_path, metadata, files)
+        retained, peak = tracemalloc.get_traced_memory()
+        rendered = list(directives)
+        rendered_size = tracemalloc.get_traced_memory()[0] - retained
+    finally:
+        tracemalloc.stop()
+    assert len(rendered) == 1000
+    # The AST of each file is released before the next one is parsed.
+    assert peak - start < 2 * parse_peak
+    # The positions take a fraction of the memory of the directive strings.
+    assert retained - start < rendered_size / 3
@@ -0,0 +1,339 @@
+import io
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any, Callable
+
+import pytest
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+from typer.testing import CliRunner
+
+from atlas_provider_sqlalchemy import cache as cache_module
+from atlas_provider_sqlalchemy.cache import CompiledCache
+from atlas_provider_sqlalchemy.ddl import dump_ddl
+from atlas_provider_sqlalchemy.fingerprint import (
+    schema_fingerprint,
+    table_fingerprint,
+    table_fingerprints,
+)
+from atlas_provider_sqlalchemy.main import app
+
+ROOT = Path(__file__).parent.parent
+
+
+def build(**changes: Any) -> sa.MetaData:
+    """Build a small schema, with the given keyword arguments of the `user`
+    table changed."""
+
+    args: dict[str, Any] = {
+        "length": 30,
+        "nullable": True,
+        "comment": None,
+        "ondelete": None,
+        "index": False,
+    }
+    args.update(changes)
+    metadata = sa.MetaData()
+    sa.Table(
+        "team",
+        metadata,
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("name", sa.String(30), index=True),
+    )
+    sa.Table(
+        "user",
+        metadata,
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column(
+            "name",
+            sa.String(args["length"]),
+            nullable=args["nullable"],
+            comment=args["comment"],
+            index=args["index"],
+        ),
+        sa.Column("team_id", sa.ForeignKey("team.id", ondelete=args["ondelete"])),
+    )
+    return metadata
+
+
+def test_fingerprint_stable() -> None:
+    first, second = build(), build()
+    for name in ("team", "user"):
+        assert table_fingerprint(first.tables[name]) == table_fingerprint(
+            second.tables[name]
+        )
+    dump_ddl("postgresql", [first], [], io.StringIO())
+    assert table_fingerprint(first.tables["user"]) == table_fingerprint(
+        second.tables["user"]
+    )
+
+
+@pytest.mark.parametrize(
+    "change",
+    [
+        {"length": 60},
+        {"nullable": False},
+        {"comment": "name of the user"},
+        {"ondelete": "CASCADE"},
+        {"index": True},
+    ],
+)
+def test_fingerprint_changes(change: dict[str, Any]) -> None:
+    tables, changed = build().tables, build(**change).tables
+    assert table_fingerprint(tables["team"]) == table_fingerprint(changed["team"])
+    assert table_fingerprint(tables["user"]) != table_fingerprint(changed["user"])
+
+
+def dump(
+    metadata: sa.MetaData,
+    cache: CompiledCache | None = None,
+    dialect: str = "postgresql",
+) -> str:
+    output = io.StringIO()
+    dump_ddl(dialect, [metadata], [], output, cache)
+    return output.getvalue()
+
+
+def item_table(*items: Any) -> sa.MetaData:
+    metadata = sa.MetaData()
+    sa.Table("item", metadata, *items)
+    return metadata
+
+
+@pytest.mark.parametrize(
+    "dialect, build_items",
+    [
+        # The predicate of a partial index.
+        (
+            "postgresql",
+            lambda n: [
+                sa.Column("a", sa.Integer),
+                sa.Index("ix", "a", postgresql_where=sa.column("a") > n),
+            ],
+        ),
+        # The value of a check constraint.
+        (
+            "postgresql",
+            lambda n: [
+                sa.Column("a", sa.Integer),
+                sa.CheckConstraint(sa.column("a") > n),
+            ],
+        ),
+        # The type of another dialect.
+        (
+            "mysql",
+            lambda n: [
+                sa.Column(
+                    "a", sa.String(10).with_variant(mysql.VARCHAR(n * 100), "mysql")
+                )
+            ],
+        ),
+        # A sequence on an integer primary key, which is then not `SERIAL`.
+        (
+            "postgresql",
+            lambda n: [
+                sa.Column(
+                    "id",
+                    sa.Integer,
+                    *([sa.Sequence("s")] if n > 1 else []),
+                    primary_key=True,
+                )
+            ],
+        ),
+        # The arguments of an identity.
+        (
+            "postgresql",
+            lambda n: [
+                sa.Column("id", sa.Integer, sa.Identity(start=n), primary_key=True)
+            ],
+        ),
+    ],
+    ids=["partial-index", "check", "variant", "sequence", "identity"],
+)
+def test_fingerprint_changes_ddl(
+    tmp_path: Path, dialect: str, build_items: Callable[[int], list[Any]]
+) -> None:
+    first, second = item_table(*build_items(1)), item_table(*build_items(2))
+    assert dump(first, dialect=dialect) != dump(second, dialect=dialect)
+    assert table_fingerprint(first.tables["item"]) != table_fingerprint(
+        second.tables["item"]
+    )
+    # The compiled cache doesn't replay the statements of the first version.
+    cache = CompiledCache(tmp_path)
+    dump(first, cache, dialect)
+    assert dump(second, cache, dialect) == dump(second, dialect=dialect)
+
+
+def test_compiled_cache(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    compiled: list[str] = []
+    put: Callable[..., None] = CompiledCache.put
+    monkeypatch.setattr(
+        CompiledCache,
+        "put",
+        lambda self, dialect, key, statement: compiled.append(statement)
+        or put(self, dialect, key, statement),
+    )
+    cache = CompiledCache(tmp_path)
+    assert dump(build(), cache) == dump(build())
+    assert len(compiled) == 3
+    cache.save()
+
+    # Only the statements of the changed table are compiled again.
+    compiled.clear()
+    cache = CompiledCache(tmp_path)
+    changed = build(length=60)
+    assert dump(changed, cache) == dump(build(length=60))
+    assert len(compiled) == 1
+    assert 'CREATE TABLE "user"' in compiled[0] and "VARCHAR(60)" in compiled[0]
+
+    # The statement of the previous version of the table is kept until it's
+    # unused for `MAX_AGE_DAYS`.
+    cache.save()
+    cache = CompiledCache(tmp_path)
+    assert sum(len(entries) for entries in cache._entries.values()) == 4
+    later = cache_module._today() + CompiledCache.MAX_AGE_DAYS + 1
+    monkeypatch.setattr(cache_module, "_today", lambda: later)
+    assert dump(changed, cache) == dump(build(length=60))
+    cache.save()
+    cache = CompiledCache(tmp_path)
+    assert sum(len(entries) for entries in cache._entries.values()) == 3
+
+
+def test_compiled_cache_shared(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    # Providers loading different models save the same cache concurrently.
+    first, second = CompiledCache(tmp_path), CompiledCache(tmp_path)
+    dump(build(), first)
+    dump(item_table(sa.Column("id", sa.Integer, primary_key=True)), second)
+    first.save()
+    second.save()
+    cache = CompiledCache(tmp_path)
+    assert sum(len(entries) for entries in cache._entries.values()) == 4
+
+    # Beyond the maximum number of entries, the least recently used are evicted.
+    monkeypatch.setattr(CompiledCache, "MAX_ENTRIES", 2)
+    dump(build(length=60), cache, "mysql")
+    cache.save()
+    cache = CompiledCache(tmp_path)
+    assert {dialect: len(entries) for dialect, entries in cache._entries.items()} == {
+        "postgresql": 2,
+        "mysql": 2,
+    }
+
+
+def test_schema_fingerprint() -> None:
+    def schema(names: list[str]) -> list[sa.MetaData]:
+        # One MetaData per table, created in the given order.
+        metadata = []
+        for name in names:
+            meta = sa.MetaData()
+            sa.Table(name, meta, sa.Column("id", sa.Integer, primary_key=True))
+            metadata.append(meta)
+        return metadata
+
+    fingerprints = table_fingerprints(schema(["team", "user"]))
+    assert [name for name, _ in fingerprints] == ["team", "user"]
+    assert table_fingerprints(schema(["user", "team"])) == fingerprints
+    assert schema_fingerprint(fingerprints) == schema_fingerprint(fingerprints[::-1])
+    assert schema_fingerprint(table_fingerprints([build()])) != schema_fingerprint(
+        table_fingerprints([build(nullable=False)])
+    )
+
+
+def test_fingerprint_command() -> None:
+    args = ["fingerprint", "--path", "tests/testdata/models", "--tables"]
+    result = CliRunner().invoke(app, args)
+    assert result.exit_code == 0, result.output
+    schema, *tables = result.output.splitlines()
+    assert [line.split()[1] for line in tables] == ["address", "user_account"]
+    assert schema == schema_fingerprint(
+        [(name, fingerprint) for fingerprint, name in map(str.split, tables)]
+    )
+    # The schema of the models declared with the legacy API is the same.
+    args = ["fingerprint", "--path", "tests/testdata/old_models"]
+    assert CliRunner().invoke(app, args).output == f"{schema}\n"
+
+
+MODELS = """
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+metadata = sa.MetaData()
+item = sa.Table(
+    "item",
+    metadata,
+    sa.Column("id", sa.Integer, {sequence} primary_key=True),
+    sa.Column("name", sa.String(10).with_variant(mysql.VARCHAR({length}), "mysql")),
+    sa.Index("ix_item_id", "id", postgresql_where=sa.column("id") > {minimum}),
+)
+"""
+
+
+@pytest.mark.parametrize(
+    "change",
+    [{"minimum": 5}, {"length": 200}, {"sequence": 'sa.Sequence("item_id_seq"),'}],
+    ids=["partial-index", "variant", "sequence"],
+)
+def test_fingerprint_command_changes(tmp_path: Path, change: dict[str, Any]) -> None:
+    def fingerprint(**changes: Any) -> str:
+        models = tmp_path / str(len(list(tmp_path.iterdir())))
+        models.mkdir()
+        args = {"sequence": "", "length": 100, "minimum": 1, **changes}
+        (models / "models.py").write_text(MODELS.format(**args))
+        result = CliRunner().invoke(app, ["fingerprint", "--path", str(models)])
+        assert result.exit_code == 0, result.output
+        return result.output
+
+    assert fingerprint() == fingerprint()
+    assert fingerprint() != fingerprint(**change)
+
+
+CUSTOM_TYPE = """
+import sqlalchemy as sa
+
+
+class Money(sa.types.TypeDecorator):{comment}
+    impl = sa.Numeric
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        return dialect.type_descriptor(sa.Numeric({precision}, 2))
+
+
+metadata = sa.MetaData()
+price = sa.Table(
+    "price",
+    metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("amount", Money()),
+)
+"""
+
+
+def test_fingerprint_command_custom_type(tmp_path: Path) -> None:
+    def fingerprint(seed: str, precision: int = 10, comment: str = "") -> str:
+        models = tmp_path / "models"
+        models.mkdir(exist_ok=True)
+        (models / "models.py").write_text(
+            CUSTOM_TYPE.format(precision=precision, comment=comment)
+        )
+        # String hashes, and so the names of the model modules, differ from
+        # one process to the next.
+        result = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "from atlas_provider_sqlalchemy.main import app; app()",
+            ]
+            + ["fingerprint", "--path", str(models)],
+            env={**os.environ, "PYTHONPATH": str(ROOT), "PYTHONHASHSEED": seed},
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        return result.stdout
+
+    assert fingerprint("1") == fingerprint("2")
+    assert fingerprint("1") == fingerprint("1", comment="  # The amount.")
+    assert fingerprint("1") != fingerprint("1", precision=12)
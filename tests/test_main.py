@@ -1,17 +1,27 @@
+import io
+import multiprocessing
+import sys
 from pathlib import Path
 
 import pytest
 from pytest import CaptureFixture
-from sqlalchemy import MetaData
+import sqlalchemy as sa
+from sqlalchemy import MetaData, Table, event
+from typer.testing import CliRunner
 
+from atlas_provider_sqlalchemy import ddl
+from atlas_provider_sqlalchemy.cache import CompiledCache
 from atlas_provider_sqlalchemy.ddl import sqlalchemy_version, print_ddl
 from atlas_provider_sqlalchemy.main import (
     Dialect,
     ModuleImportError,
     ModelsNotFoundError,
+    app,
+    get_file_directives,
     get_metadata,
     run,
 )
+from atlas_provider_sqlalchemy.scan import scan_directory
 
 
 @pytest.mark.skipif(
@@ -70,14 +80,18 @@ def test_run_old_models(
         (Dialect.clickhouse, "tests/testdata/structured_models/ddl_clickhouse.sql"),
     ],
 )
+@pytest.mark.parametrize("packages", [False, True])
 def test_run_structured_models(
     dialect: Dialect,
     expected_ddl_file: str,
+    packages: bool,
     capsys: CaptureFixture,
 ) -> None:
     with open(expected_ddl_file, "r") as f:
         expected_ddl = f.read().replace("[ABS_PATH]", str(Path.cwd()))
-    metadata = run(dialect, [Path("tests/testdata/structured_models/models")])
+    metadata = run(
+        dialect, [Path("tests/testdata/structured_models/models")], packages=packages
+    )
     captured = capsys.readouterr()
     assert captured.out == expected_ddl
     for m in metadata:
@@ -129,6 +143,48 @@ def test_run_models_2(
         m.clear()
 
 
+def test_run_multiple_dialects(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, capsys: CaptureFixture
+) -> None:
+    executed = []
+    exec_module = ddl._exec_module
+    monkeypatch.setattr(
+        ddl,
+        "_exec_module",
+        lambda path, *args: executed.append(path) or exec_module(path, *args),
+    )
+    metadata = run(
+        [Dialect.postgresql, Dialect.mysql],
+        [Path("tests/testdata/tables")],
+        output=str(tmp_path / "schema.{dialect}.sql"),
+    )
+    assert capsys.readouterr().out == ""
+    assert len(executed) == 1
+    for dialect, suffix in (("postgresql", "postgres"), ("mysql", "mysql")):
+        with open(f"tests/testdata/tables/ddl_{suffix}.sql") as f:
+            expected = f.read().replace("[ABS_PATH]", str(Path.cwd()))
+        assert (tmp_path / f"schema.{dialect}.sql").read_text() == expected
+    for m in metadata:
+        m.clear()
+
+
+def test_cli_multiple_dialects_require_template() -> None:
+    result = CliRunner().invoke(
+        app,
+        [
+            "--path",
+            "tests/testdata/tables",
+            "--dialect",
+            "postgresql",
+            "--dialect",
+            "mysql",
+            "--no-daemon",
+        ],
+    )
+    assert result.exit_code == 2
+    assert "--output" in result.output
+
+
 def test_print_ddl_no_models(capsys: CaptureFixture) -> None:
     print_ddl(Dialect.mysql.value, [])
     captured = capsys.readouterr()
@@ -174,3 +230,229 @@ def test_get_metadata_invalid_models_skip_errors() -> None:
     metadata = get_metadata(Path("tests/testdata/invalid_models"), skip_errors=True)
     assert isinstance(metadata, MetaData)
     metadata.clear()
+
+
+def test_file_directives_from_scanned_sources() -> None:
+    files = scan_directory(Path("tests/testdata/tables"))
+    assert [f.path.name for f in files] == ["tables.py"]
+    metadata = get_metadata(Path("tests/testdata/tables"), files=files)
+    # Directives are extracted from the scanned buffers, not from disk.
+    shifted = [f._replace(source=b"\n" + f.source) for f in files]
+    directives = get_file_directives(Path("tests/testdata/tables"), metadata, shifted)
+    assert [d.rsplit(":", 1)[1] for d in directives] == ["7", "16"]
+    metadata.clear()
+
+
+def test_file_directives_parallel(tmp_path: Path) -> None:
+    for i in range(6):
+        (tmp_path / f"models_{i}.py").write_text(
+            "import sqlalchemy as sa\n\n"
+            "metadata = sa.MetaData()\n"
+            f"t{i} = sa.Table('table_{i}', metadata, sa.Column('id', sa.Integer))\n"
+        )
+    metadata = MetaData()
+    for i in range(6):
+        Table(f"table_{i}", metadata)
+    files = scan_directory(tmp_path)
+    serial = get_file_directives(tmp_path, metadata, files)
+    assert len(serial) == 6
+    assert get_file_directives(tmp_path, metadata, files, jobs=3) == serial
+
+
+PACKAGE_MODEL = """
+import sys
+
+from sqlalchemy.orm import Mapped, mapped_column
+
+from shop.base import Base
+
+sys.shop_executions = getattr(sys, "shop_executions", 0) + 1
+
+
+class {name}(Base):
+    __tablename__ = "{table}"
+    id: Mapped[int] = mapped_column(primary_key=True)
+"""
+
+
+def test_get_metadata_packages(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    package = tmp_path / "src" / "shop"
+    (package / "models").mkdir(parents=True)
+    (package / "__init__.py").write_text("")
+    (package / "models" / "__init__.py").write_text("")
+    (package / "base.py").write_text(
+        "from sqlalchemy.orm import DeclarativeBase\n\n\n"
+        "class Base(DeclarativeBase):\n    pass\n"
+    )
+    (package / "models" / "user.py").write_text(
+        PACKAGE_MODEL.format(name="User", table="shop_user")
+    )
+    (package / "models" / "order.py").write_text(
+        "from shop.models.user import User\n"
+        + PACKAGE_MODEL.format(name="Order", table="shop_order")
+    )
+    monkeypatch.setattr("sys.path", list(sys.path))
+    monkeypatch.setattr(sys, "shop_executions", 0, raising=False)
+
+    metadata = get_metadata(package / "models", packages=True)
+    # The package root is only on `sys.path` while loading.
+    assert str(tmp_path / "src") not in sys.path
+    assert set(metadata.tables) == {"shop_user", "shop_order"}
+    # user.py is imported by order.py, and not executed again.
+    assert getattr(sys, "shop_executions") == 2
+    user = ddl._loaded_modules[(package / "models" / "user.py").absolute()]
+    assert user.name == "shop.models.user"
+    assert sys.modules["shop.models.user"] is user.module
+    assert [t.name for t in user.tables] == ["shop_user"]
+    del user
+
+    # Loading again executes the files again, without duplicate tables.
+    metadata = get_metadata(package / "models", packages=True)
+    assert set(metadata.tables) == {"shop_user", "shop_order"}
+    ddl.unload_modules(list(ddl._loaded_modules))
+
+
+def test_get_metadata_from_attached_tables(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    (tmp_path / "models").mkdir()
+    (tmp_path / "attached_tables.py").write_text(
+        "import sqlalchemy as sa\n\n"
+        "metadata = sa.MetaData()\n"
+        "audit = sa.Table('attached_audit', metadata, sa.Column('id', sa.Integer))\n"
+    )
+    # Members are not inspected, so properties of imported objects are not
+    # evaluated, and the tables of imported modules are found.
+    (tmp_path / "models" / "client.py").write_text(
+        "import attached_tables\n\n\n"
+        "class Client:\n"
+        "    @property\n"
+        "    def metadata(self):\n"
+        "        raise RuntimeError('connected')\n\n\n"
+        "client = Client()\n"
+    )
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.delitem(sys.modules, "attached_tables", raising=False)
+    metadata = get_metadata(tmp_path / "models")
+    assert list(metadata.tables) == ["attached_audit"]
+
+
+def _cyclic_metadata() -> MetaData:
+    metadata = MetaData()
+    parent = sa.Table(
+        "parent",
+        metadata,
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("child_id", sa.Integer),
+        sa.Column("mood", sa.Enum("happy", "sad", name="mood")),
+        comment="parents",
+    )
+    sa.Table(
+        "child",
+        metadata,
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("parent_id", sa.ForeignKey("parent.id")),
+        sa.Column("name", sa.String(20), comment="a name"),
+        sa.Index("ix_b", "parent_id"),
+        sa.Index("ix_a", "name"),
+    )
+    parent.append_constraint(
+        sa.ForeignKeyConstraint(["child_id"], ["child.id"], name="fk_cycle")
+    )
+    event.listen(parent, "after_create", sa.DDL("SELECT 'parent created'"))
+    return metadata
+
+
+@pytest.mark.parametrize("dialect", ["postgresql", "mysql", "sqlite"])
+def test_create_statements(dialect: str) -> None:
+    metadata = _cyclic_metadata()
+    expected: list[str] = []
+    engine = ddl.create_mock_engine(
+        f"{dialect}://",
+        lambda sql, *_, **__: expected.append(str(sql.compile(dialect=engine.dialect))),
+    )
+    metadata.create_all(engine, checkfirst=False)
+    statements = [
+        str(sql.compile(dialect=ddl.get_dialect(dialect)))
+        for sql in ddl.create_statements(dialect, metadata)
+    ]
+    # The same statements, in the order of create_all except for the indexes
+    # and foreign keys created after the tables, which are sorted by name.
+    assert sorted(statements) == sorted(expected)
+    indexes = [s for s in statements if s.startswith("CREATE INDEX")]
+    assert indexes == sorted(indexes)
+    tables = [s.split()[2] for s in statements if s.startswith("CREATE TABLE")]
+    assert tables == [s.split()[2] for s in expected if s.startswith("CREATE TABLE")]
+
+
+@pytest.mark.skipif(
+    "fork" not in multiprocessing.get_all_start_methods(),
+    reason="requires forked worker processes",
+)
+@pytest.mark.parametrize("dialect", ["postgresql", "mysql"])
+def test_dump_ddl_compile_jobs(dialect: str) -> None:
+    metadata = [get_metadata(Path("tests/testdata/models")), _cyclic_metadata()]
+    serial, parallel, cached = io.StringIO(), io.StringIO(), io.StringIO()
+    ddl.dump_ddl(dialect, metadata, ["directive"], serial)
+    ddl.dump_ddl(dialect, metadata, ["directive"], parallel, compile_jobs=3)
+    assert parallel.getvalue() == serial.getvalue()
+    # Statements found in the cache are not sent to the workers.
+    cache = CompiledCache()
+    ddl.dump_ddl(dialect, metadata[:1], [], io.StringIO(), cache)
+    ddl.dump_ddl(dialect, metadata, ["directive"], cached, cache, compile_jobs=3)
+    assert cached.getvalue() == serial.getvalue()
+
+
+@pytest.mark.parametrize("cached", [False, True])
+def test_run_multiple_paths_isolated(
+    cached: bool, tmp_path: Path, capsys: CaptureFixture
+) -> None:
+    with open("tests/testdata/multi_path/ddl_postgresql.sql", "r") as f:
+        expected_ddl = f.read().replace("[ABS_PATH]", str(Path.cwd()))
+    paths = [
+        Path("tests/testdata/multi_path/models1"),
+        Path("tests/testdata/multi_path/models2"),
+    ]
+    cache_dir = tmp_path if cached else None
+    # Each path is loaded by a worker process, so none is loaded here.
+    assert run(Dialect.postgresql, paths, cache_dir=cache_dir, jobs=2) == []
+    assert capsys.readouterr().out == expected_ddl
+    if cached:
+        assert (tmp_path / CompiledCache.FILE_NAME).exists()
+        assert run(Dialect.postgresql, paths, cache_dir=cache_dir, jobs=2) == []
+        assert capsys.readouterr().out == expected_ddl
+
+
+def test_iter_ddl() -> None:
+    metadata = _cyclic_metadata()
+    directive = "atlas:pos parent[type=table] /models.py:1"
+    records = list(ddl.iter_ddl("postgresql", metadata, [directive]))
+    assert records[0] == ddl.DDLRecord(ddl.DIRECTIVE, "parent", directive)
+    kinds = {(r.kind, r.table) for r in records[1:]}
+    assert kinds == {
+        (ddl.TYPE, None),
+        (ddl.TABLE, "parent"),
+        (ddl.TABLE, "child"),
+        (ddl.INDEX, "child"),
+        (ddl.CONSTRAINT, "parent"),
+        (ddl.CONSTRAINT, "child"),
+        (ddl.COMMENT, "parent"),
+        (ddl.COMMENT, "child"),
+        (ddl.OTHER, None),
+    }
+    expected = io.StringIO()
+    ddl.dump_ddl("postgresql", [metadata], [], expected)
+    # The output is the statements, on a single line each.
+    statements = [r.sql.replace("\n", "").replace("\t", "") for r in records[1:]]
+    assert "".join(f"{sql};\n\n" for sql in statements) == expected.getvalue()
+
+
+def test_print_ddl_several_metadata(capsys: CaptureFixture) -> None:
+    first, second = MetaData(), MetaData()
+    user = Table("user", first, sa.Column("id", sa.Integer, primary_key=True))
+    team = Table("team", second, sa.Column("id", sa.Integer, primary_key=True))
+    print_ddl("sqlite", [user, team, user])
+    assert capsys.readouterr().out == (
+        "CREATE TABLE user (id INTEGER NOT NULL, PRIMARY KEY (id));\n\n"
+        "CREATE TABLE team (id INTEGER NOT NULL, PRIMARY KEY (id));\n\n"
+    )
@@ -0,0 +1,66 @@
+import io
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from atlas_provider_sqlalchemy.main import app
+from atlas_provider_sqlalchemy.output import DDLWriter, atomic_open
+
+
+class CountingStream(io.StringIO):
+    def __init__(self) -> None:
+        super().__init__()
+        self.writes = 0
+
+    def write(self, s: str) -> int:
+        self.writes += 1
+        return super().write(s)
+
+
+def test_writer_buffers_statements() -> None:
+    stream = CountingStream()
+    with DDLWriter(stream, buffer_size=100) as writer:
+        writer.write_directives(["atlas:pos t[type=table] /models.py:1"])
+        for i in range(20):
+            writer.write_statement(f"\nCREATE TABLE t{i} (\n\tid INTEGER\n)\n\n")
+    lines = stream.getvalue().split("\n")
+    assert lines[:3] == [
+        "-- atlas:pos t[type=table] /models.py:1",
+        "",
+        "CREATE TABLE t0 (id INTEGER);",
+    ]
+    assert stream.getvalue().count(";\n\n") == 20
+    assert 1 < stream.writes < 20
+
+
+def test_atomic_open_keeps_previous_file(tmp_path: Path) -> None:
+    path = tmp_path / "schema.sql"
+    path.write_text("previous")
+    with pytest.raises(RuntimeError):
+        with atomic_open(path) as f:
+            f.write("partial")
+            raise RuntimeError()
+    assert path.read_text() == "previous"
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_cli_output_file(tmp_path: Path) -> None:
+    output = tmp_path / "schema.sql"
+    result = CliRunner().invoke(
+        app,
+        [
+            "--path",
+            "tests/testdata/tables",
+            "--dialect",
+            "postgresql",
+            "--output",
+            str(output),
+            "--no-daemon",
+        ],
+    )
+    assert result.exit_code == 0
+    assert result.output == ""
+    with open("tests/testdata/tables/ddl_postgres.sql") as f:
+        expected = f.read().replace("[ABS_PATH]", str(Path.cwd()))
+    assert output.read_text() == expected
@@ -0,0 +1,57 @@
+import pytest
+
+from atlas_provider_sqlalchemy import parser
+
+SOURCE = """
+import sqlalchemy as sa
+from sqlalchemy.orm import DeclarativeBase
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+class User(Base):
+    __tablename__ = "user"
+
+    class Meta:
+        __tablename__ = "nested"
+
+
+try:
+    audit = sa.Table("audit", Base.metadata, info={"table": sa.Table("info", m)})
+except ImportError:
+    audit = sa.Table  (  # the call spans several lines
+        "audit_fallback", Base.metadata
+    )
+
+match VERSION:
+    case 1:
+        legacy = sa.Table("legacy", Base.metadata)
+
+
+def make_tables():
+    if True:
+        with context():
+            history = sa.Table("history", Base.metadata)
+    items = [sa.Table("in_expression", Base.metadata)]
+"""
+
+
+def test_extract_tables() -> None:
+    assert parser.extract_tables(SOURCE, "models.py") == [
+        ("user", 10),
+        ("nested", 13),
+        ("audit", 18),
+        ("audit_fallback", 20),
+        ("legacy", 26),
+        ("history", 32),
+    ]
+
+
+def test_extract_tables_prefilter() -> None:
+    assert not parser.may_define_tables(b"import os\n\ndef helper(:\n")
+    # Files without tables are not parsed, so their errors are not reported.
+    assert parser.extract_tables(b"import os\n\ndef helper(:\n", "utils.py") == []
+    with pytest.raises(Exception, match="Error parsing file models.py"):
+        parser.extract_tables(b"Table = (\n", "models.py")
@@ -0,0 +1,79 @@
+import json
+from pathlib import Path
+
+from typer.testing import CliRunner
+
+from atlas_provider_sqlalchemy import profiling
+from atlas_provider_sqlalchemy.main import app
+
+
+def test_report() -> None:
+    profiler = profiling.Profiler()
+    with profiling.profiling(profiler):
+        with profiling.phase("load"):
+            for name in ("a", "b", "a"):
+                with profiling.timed(profiling.COMPILE, name):
+                    pass
+    # Nothing is recorded once the profiler is inactive.
+    with profiling.phase("ignored"):
+        pass
+
+    report = profiler.report(top=1)
+    assert [phase["name"] for phase in report["phases"]] == ["load"]
+    assert {item["name"] for item in report["items"][profiling.COMPILE]} == {"a", "b"}
+    assert len(report["slowest"]) == 1
+    trace = profiler.trace()["traceEvents"]
+    assert [e["name"] for e in trace] == ["load", "a", "b", "a"]
+    assert all(e["ph"] == "X" for e in trace)
+
+
+def test_cli_profile(tmp_path: Path) -> None:
+    report_path = tmp_path / "profile.json"
+    result = CliRunner().invoke(
+        app,
+        [
+            "--path",
+            "tests/testdata/models",
+            "--dialect",
+            "postgresql",
+            "--no-daemon",
+            "--profile",
+            str(report_path),
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    assert "CREATE TABLE" in result.stdout
+    report = json.loads(report_path.read_text())
+    assert [phase["name"] for phase in report["phases"]] == [
+        "scan",
+        "get_metadata",
+        "get_file_directives",
+        "dump_ddl[postgresql]",
+    ]
+    imported = {item["name"] for item in report["items"][profiling.IMPORT]}
+    assert "tests/testdata/models/models.py" in imported
+    assert "user_account" in {
+        item["name"] for item in report["items"][profiling.COMPILE]
+    }
+    assert report["items"][profiling.PARSE]
+
+
+def test_cli_profile_trace(tmp_path: Path) -> None:
+    trace_path = tmp_path / "trace.json"
+    result = CliRunner().invoke(
+        app,
+        [
+            "--path",
+            "tests/testdata/models",
+            "--dialect",
+            "mysql",
+            "--no-daemon",
+            "--profile",
+            str(trace_path),
+            "--profile-format",
+            "trace",
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    events = json.loads(trace_path.read_text())["traceEvents"]
+    assert {"phase", "import", "parse", "compile"} <= {e["cat"] for e in events}
@@ -0,0 +1,79 @@
+from pathlib import Path
+
+from atlas_provider_sqlalchemy.scan import ScanRules, scan_directory
+
+FILES = [
+    "models/user.py",
+    "models/team.py",
+    "models/__init__.py",
+    "models/tests/test_user.py",
+    "migrations/versions/0001_init.py",
+    "build/lib/models/user.py",
+    ".venv/lib/site.py",
+    "node_modules/pkg/setup.py",
+    "models/__pycache__/user.py",
+    "notes.txt",
+]
+
+
+def make_tree(root: Path, files: list[str] = FILES) -> None:
+    for name in files:
+        (root / name).parent.mkdir(parents=True, exist_ok=True)
+        (root / name).write_text("")
+
+
+def scanned(root: Path, rules: ScanRules | None = None) -> set[str]:
+    return {
+        file.path.relative_to(root).as_posix() for file in scan_directory(root, rules)
+    }
+
+
+def test_default_excludes(tmp_path: Path) -> None:
+    make_tree(tmp_path)
+    assert scanned(tmp_path) == {
+        "models/user.py",
+        "models/team.py",
+        "models/__init__.py",
+        "models/tests/test_user.py",
+        "migrations/versions/0001_init.py",
+        "build/lib/models/user.py",
+    }
+
+
+def test_include_exclude(tmp_path: Path) -> None:
+    make_tree(tmp_path)
+    rules = ScanRules(exclude=("tests", "migrations", "build/*", "__init__.py"))
+    assert scanned(tmp_path, rules) == {"models/user.py", "models/team.py"}
+    rules = ScanRules(include=("models/*.py",), exclude=("team.py",))
+    # `*` matches across directories, as in fnmatch.
+    assert scanned(tmp_path, rules) == {
+        "models/user.py",
+        "models/__init__.py",
+        "models/tests/test_user.py",
+    }
+    rules = ScanRules(include=("test_*.py",))
+    assert scanned(tmp_path, rules) == {"models/tests/test_user.py"}
+
+
+def test_gitignore(tmp_path: Path) -> None:
+    make_tree(tmp_path, [*FILES, "models/generated/schema.py", "models/keep.py"])
+    (tmp_path / ".git").mkdir()
+    (tmp_path / ".gitignore").write_text(
+        "# build output\n/build/\n*.py\n!models/*.py\n"
+    )
+    (tmp_path / "models" / ".gitignore").write_text("generated/\nteam.py\n")
+    # Without the option, .gitignore files are not read.
+    assert "models/generated/schema.py" in scanned(tmp_path)
+
+    rules = ScanRules(gitignore=True)
+    assert scanned(tmp_path, rules) == {
+        "models/user.py",
+        "models/__init__.py",
+        "models/keep.py",
+    }
+    # The .gitignore files of the parent directories apply too.
+    assert scanned(tmp_path / "models", rules) == {
+        "user.py",
+        "__init__.py",
+        "keep.py",
+    }
@@ -0,0 +1,220 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Iterator
+
+import pytest
+from typer.testing import CliRunner
+
+from atlas_provider_sqlalchemy import ddl, main, server as provider_server
+from atlas_provider_sqlalchemy.main import app
+from atlas_provider_sqlalchemy.server import ProviderServer, ServerError, forward, serve
+from tests.conftest import (
+    create_project,
+    write_base,
+    write_custom_type,
+    write_model,
+)
+
+
+@pytest.fixture
+def server(tmp_path: Path) -> Iterator[Path]:
+    socket_path = tmp_path / "provider.sock"
+    server = ProviderServer(socket_path)
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield socket_path
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+@pytest.fixture
+def project(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    return create_project(tmp_path, monkeypatch, "served")
+
+
+def request(
+    socket_path: Path, dialect: str, path: Path, **options: Any
+) -> dict[str, Any] | None:
+    return forward(
+        {"cwd": os.getcwd(), "dialect": [dialect], "path": [str(path)], **options},
+        socket_path,
+    )
+
+
+def test_forward_without_server(tmp_path: Path) -> None:
+    assert request(tmp_path / "missing.sock", "mysql", tmp_path) is None
+
+
+def test_server_declines_other_cwd(server: Path) -> None:
+    assert forward({"cwd": "/", "dialect": "mysql", "path": ["."]}, server) is None
+
+
+def test_server_declines_other_versions(
+    server: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    versions = provider_server.versions()
+    monkeypatch.setattr(
+        provider_server, "versions", lambda: {**versions, "sqlalchemy": "1.4.0"}
+    )
+    assert request(server, "mysql", Path("tests/testdata/tables")) is None
+
+
+def test_forward_ignores_shared_directory(
+    server: Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    assert request(server, "mysql", Path("tests/testdata/tables")) is not None
+    # Another user could replace the socket in a directory they can write to.
+    server.parent.chmod(0o777)
+    try:
+        assert request(server, "mysql", Path("tests/testdata/tables")) is None
+        assert "doesn't belong to the current user" in capsys.readouterr().err
+        with pytest.raises(ServerError, match="can be written to by other users"):
+            serve(server.parent / "other.sock")
+    finally:
+        server.parent.chmod(0o700)
+
+
+def test_default_socket_path(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv("ATLAS_PROVIDER_SQLALCHEMY_SOCKET", raising=False)
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    assert provider_server.default_socket_path().parent == tmp_path
+    monkeypatch.delenv("XDG_RUNTIME_DIR")
+    directory = provider_server.default_socket_path().parent
+    assert directory.name == f"atlas-provider-sqlalchemy-{os.getuid()}"
+
+
+@pytest.mark.parametrize("dialect", ["postgresql", "mysql"])
+def test_server_output(server: Path, dialect: str) -> None:
+    suffix = "postgres" if dialect == "postgresql" else dialect
+    with open(f"tests/testdata/tables/ddl_{suffix}.sql") as f:
+        expected = f.read().replace("[ABS_PATH]", str(Path.cwd()))
+    response = request(server, dialect, Path("tests/testdata/tables"))
+    assert response == {
+        "code": 0,
+        "stdout": "",
+        "stderr": "",
+        "outputs": {dialect: expected},
+    }
+
+
+def test_server_concurrent_requests(server: Path, project: Path) -> None:
+    dialects = ["postgresql", "mysql", "sqlite", "postgresql"]
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        responses = list(
+            executor.map(
+                lambda dialect: request(server, dialect, project / "models"),
+                dialects,
+            )
+        )
+    assert all(r is not None and r["code"] == 0 for r in responses)
+    outputs = [r["outputs"][d] for r, d in zip(responses, dialects) if r is not None]
+    assert "SERIAL" in outputs[0] and "AUTO_INCREMENT" in outputs[1]
+    assert outputs[0] == outputs[3]
+
+
+def test_server_reloads_changed_files(server: Path, project: Path) -> None:
+    response = request(server, "postgresql", project / "models")
+    assert response is not None and response["code"] == 0
+    team = (project / "models" / "served_team.py").absolute()
+    user = (project / "models" / "served_user.py").absolute()
+    team_module = ddl._loaded_modules[team].module
+    user_module = ddl._loaded_modules[user].module
+
+    write_model(project, "served", "User", length=60)
+    response = request(server, "postgresql", project / "models")
+    assert response is not None and response["code"] == 0, response
+    assert "name VARCHAR(60)" in response["outputs"]["postgresql"]
+    assert ddl._loaded_modules[team].module is team_module
+    assert ddl._loaded_modules[user].module is not user_module
+
+
+def test_server_unloads_deleted_files(server: Path, project: Path) -> None:
+    response = request(server, "postgresql", project / "models")
+    assert response is not None and response["code"] == 0
+    assert "CREATE TABLE served_team" in response["outputs"]["postgresql"]
+    team = (project / "models" / "served_team.py").absolute()
+
+    team.unlink()
+    response = request(server, "postgresql", project / "models")
+    assert response is not None and response["code"] == 0, response
+    assert "served_team" not in response["outputs"]["postgresql"]
+    assert "CREATE TABLE served_user" in response["outputs"]["postgresql"]
+    assert team not in ddl._loaded_modules
+
+
+def test_server_requests_during_changes(
+    server: Path, project: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    dump_models = main.dump_models
+
+    def slow_dump_models(dialects: Any, metadata_list: Any, *args: Any) -> Any:
+        tables = [dict(metadata.tables) for metadata in metadata_list]
+        time.sleep(0.2)
+        # The next request doesn't change the tables while they are emitted.
+        assert [dict(metadata.tables) for metadata in metadata_list] == tables
+        return dump_models(dialects, metadata_list, *args)
+
+    monkeypatch.setattr(main, "dump_models", slow_dump_models)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        first = executor.submit(request, server, "postgresql", project / "models")
+        time.sleep(0.1)
+        write_model(project, "served", "User", length=60)
+        second = executor.submit(request, server, "postgresql", project / "models")
+        responses = [first.result(), second.result()]
+    for response, length in zip(responses, (30, 60)):
+        assert response is not None and response["code"] == 0, response
+        assert f"name VARCHAR({length})" in response["outputs"]["postgresql"]
+
+
+def test_server_reloads_changed_dependencies(server: Path, project: Path) -> None:
+    response = request(server, "postgresql", project / "models")
+    assert response is not None and response["code"] == 0
+    write_base(project, "served", "__abstract__ = True")
+    os.utime(project / "served_base.py", ns=(0, 0))
+    response = request(server, "postgresql", project / "models")
+    assert response is not None and response["code"] == 0, response
+    assert response["outputs"]["postgresql"].count("CREATE TABLE") == 2
+
+
+def test_server_static(server: Path, project: Path) -> None:
+    static = request(server, "postgresql", project / "models", static=True)
+    assert static is not None and static["code"] == 0, static
+    # The models were executed statically, not imported.
+    assert (project / "models" / "served_user.py").absolute() not in ddl._loaded_modules
+    imported = request(server, "postgresql", project / "models")
+    assert imported is not None and imported["code"] == 0, imported
+    assert (project / "models" / "served_user.py").absolute() in ddl._loaded_modules
+    assert static["outputs"] == imported["outputs"]
+
+
+def test_server_reloads_changed_types(server: Path, project: Path) -> None:
+    write_custom_type(project, "served", "NUMERIC(10, 2)")
+    response = request(server, "postgresql", project / "models")
+    assert response is not None and response["code"] == 0, response
+    types = write_custom_type(project, "served", "NUMERIC(12, 4)")
+    os.utime(types, ns=(0, 0))
+    response = request(server, "postgresql", project / "models")
+    assert response is not None and response["code"] == 0, response
+    assert "amount NUMERIC(12, 4)" in response["outputs"]["postgresql"]
+
+
+def test_server_reports_errors(server: Path) -> None:
+    response = request(server, "mysql", Path("tests/testdata/invalid_models"))
+    assert response is not None
+    assert response["code"] == 1
+    assert "Exception: failure" in response["stderr"]
+    assert "--skip-errors" in response["stderr"]
+
+
+def test_cli_default_command() -> None:
+    runner = CliRunner()
+    args = ["--path", "tests/testdata/tables", "--dialect", "postgresql"]
+    default = runner.invoke(app, [*args, "--no-daemon"])
+    explicit = runner.invoke(app, ["load", *args, "--no-daemon"])
+    assert default.exit_code == 0
+    assert "CREATE TABLE user_account" in default.output
+    assert explicit.output == default.output
@@ -0,0 +1,65 @@
+"""Startup benchmark of the CLI, based on `python -X importtime`.
+
+The interpreter startup is paid on every Atlas invocation, so importing the
+CLI must not import SQLAlchemy, the dialects or the models loader, and the
+provider's own import overhead must stay within budget.
+"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+
+# Budget of the import time added by the provider on top of `typer`, in
+# microseconds. It is a few times the typical value, to tolerate slow runners.
+IMPORT_BUDGET_US = 60_000
+
+HEAVY_MODULES = {
+    "sqlalchemy",
+    "clickhouse_sqlalchemy",
+    "atlas_provider_sqlalchemy.ddl",
+    "atlas_provider_sqlalchemy.cache",
+    "concurrent.futures.process",
+}
+
+
+def provider_imports() -> dict[str, int]:
+    """Return the self import time, in microseconds, of each module imported
+    by the CLI once `typer` is already imported."""
+
+    env = {**os.environ, "PYTHONPATH": str(ROOT)}
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-X",
+            "importtime",
+            "-c",
+            "import typer; import atlas_provider_sqlalchemy.main",
+        ],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    lines = [
+        line.removeprefix("import time:").split("|")
+        for line in result.stderr.splitlines()
+        if line.startswith("import time:") and "self [us]" not in line
+    ]
+    names = [name.strip() for _, _, name in lines]
+    start = names.index("typer") + 1
+    return {name.strip(): int(us) for us, _, name in lines[start:]}
+
+
+def test_cli_import_skips_heavy_modules() -> None:
+    imported = provider_imports()
+    assert "atlas_provider_sqlalchemy.main" in imported
+    assert not HEAVY_MODULES & imported.keys()
+
+
+def test_cli_import_time_budget() -> None:
+    # Take the best of a few runs to reduce the noise.
+    overhead = min(sum(provider_imports().values()) for _ in range(3))
+    assert overhead < IMPORT_BUDGET_US, f"CLI imports took {overhead}us"
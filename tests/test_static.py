@@ -0,0 +1,184 @@
+import io
+import sys
+from pathlib import Path
+
+import pytest
+import sqlalchemy as sa
+
+from atlas_provider_sqlalchemy import static
+from atlas_provider_sqlalchemy.ddl import dump_ddl, get_metadata
+from atlas_provider_sqlalchemy.static import get_metadata_static
+
+SDK = """
+import sys
+
+sys.heavy_sdk_imported = True
+LENGTH = 60
+
+
+def notify(*args):
+    pass
+"""
+
+APP = """
+from heavy_sdk import notify
+
+app = notify("started")
+"""
+
+BASE = """
+from sqlalchemy.orm import DeclarativeBase
+
+
+class Base(DeclarativeBase):
+    pass
+"""
+
+USER = """
+from __future__ import annotations
+
+import enum
+from typing import Optional
+
+import sqlalchemy as sa
+from heavy_sdk import notify
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from app.base import Base
+
+
+class Role(enum.Enum):
+    admin = "admin"
+    member = "member"
+
+
+class User(Base):
+    __tablename__ = "static_user"
+    __table_args__ = (sa.UniqueConstraint("name", "team_id"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    name: Mapped[str] = mapped_column(sa.String(30), index=True)
+    nickname: Mapped[Optional[str]]
+    role: Mapped[Role]
+    team_id: Mapped[int] = mapped_column(sa.ForeignKey("static_team.id"))
+    team: Mapped["Team"] = relationship(back_populates="users")
+
+    def greet(self) -> None:
+        notify(self.name)
+"""
+
+TEAM = """
+import sqlalchemy as sa
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from app.base import Base
+from app.models.user import User
+
+
+class Team(Base):
+    __tablename__ = "static_team"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    users: Mapped[list[User]] = relationship(back_populates="team")
+
+
+memberships = sa.Table(
+    "static_membership",
+    Base.metadata,
+    sa.Column("user_id", sa.ForeignKey(User.id), primary_key=True),
+    sa.Column("team_id", sa.ForeignKey("static_team.id"), primary_key=True),
+)
+"""
+
+# Uses a setting of the SDK in its schema, so it must be imported for real.
+AUDIT = """
+import heavy_sdk
+import sqlalchemy as sa
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.base import Base
+
+
+class Audit(Base):
+    __tablename__ = "static_audit"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    user_id = mapped_column(sa.ForeignKey("static_user.id"))
+    message = mapped_column(sa.String(heavy_sdk.LENGTH))
+"""
+
+
+@pytest.fixture
+def project(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    site = tmp_path / "site"
+    (site / "heavy_sdk").mkdir(parents=True)
+    (site / "heavy_sdk" / "__init__.py").write_text(SDK)
+    root = tmp_path / "project"
+    (root / "app" / "models").mkdir(parents=True)
+    (root / "app" / "__init__.py").write_text(APP)
+    (root / "app" / "base.py").write_text(BASE)
+    (root / "app" / "models" / "__init__.py").write_text("")
+    (root / "app" / "models" / "user.py").write_text(USER)
+    (root / "app" / "models" / "team.py").write_text(TEAM)
+    monkeypatch.syspath_prepend(str(site))
+    monkeypatch.syspath_prepend(str(root))
+    monkeypatch.setattr(static, "_SITE_DIRS", (str(site),))
+    monkeypatch.delattr(sys, "heavy_sdk_imported", raising=False)
+    for name in list(sys.modules):
+        if name.split(".")[0] in ("app", "heavy_sdk"):
+            monkeypatch.delitem(sys.modules, name)
+    return root
+
+
+def dump(metadata: sa.MetaData) -> str:
+    output = io.StringIO()
+    dump_ddl("postgresql", [metadata], [], output)
+    return output.getvalue()
+
+
+def test_static_skips_third_party_imports(project: Path) -> None:
+    models = project / "app" / "models"
+    metadata = get_metadata_static(models)
+    assert not hasattr(sys, "heavy_sdk_imported")
+    assert set(metadata.tables) == {"static_user", "static_team", "static_membership"}
+    # The static modules are not left in `sys.modules`.
+    assert not any(name.split(".")[0] == "app" for name in sys.modules)
+
+    ddl = dump(metadata)
+    assert "name VARCHAR(30) NOT NULL" in ddl
+    assert "nickname VARCHAR," in ddl
+    assert "role role NOT NULL" in ddl
+    assert "UNIQUE (name, team_id)" in ddl
+    assert "CREATE INDEX ix_static_user_name ON static_user (name)" in ddl
+
+
+@pytest.mark.parametrize(
+    "path",
+    [
+        "tests/testdata/models",
+        "tests/testdata/old_models",
+        "tests/testdata/structured_models/models",
+        "tests/testdata/tables",
+    ],
+)
+def test_static_matches_import(path: str) -> None:
+    for dialect in ("postgresql", "mysql"):
+        expected, actual = io.StringIO(), io.StringIO()
+        dump_ddl(dialect, [get_metadata(Path(path))], [], expected)
+        dump_ddl(dialect, [get_metadata_static(Path(path))], [], actual)
+        assert actual.getvalue() == expected.getvalue()
+
+
+def test_static_falls_back_to_import(project: Path) -> None:
+    (project / "app" / "models" / "audit.py").write_text(AUDIT)
+    metadata = get_metadata_static(project / "app" / "models")
+    assert getattr(sys, "heavy_sdk_imported", False)
+    assert set(metadata.tables) == {
+        "static_user",
+        "static_team",
+        "static_membership",
+        "static_audit",
+    }
+    ddl = dump(metadata)
+    assert "message VARCHAR(60)" in ddl
+    assert "FOREIGN KEY(user_id) REFERENCES static_user (id)" in ddl
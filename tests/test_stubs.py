@@ -0,0 +1,114 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from atlas_provider_sqlalchemy.ddl import sqlalchemy_version
+from atlas_provider_sqlalchemy.main import app
+from atlas_provider_sqlalchemy.stubs import StubReport, reporting, stubbing
+
+pytestmark = pytest.mark.skipif(
+    sqlalchemy_version() < (2, 0),
+    reason="requires SQLAlchemy>=2.0",
+)
+
+MODELS = """
+import heavy_ml.models
+from app_config.settings import settings
+from heavy_cloud import Client
+from heavy_cloud.tasks import task
+
+import sqlalchemy as sa
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+
+client = Client(region=settings.REGION)
+classifier = heavy_ml.models.load("classifier")
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+@task(retries=3)
+class Document(Base, heavy_ml.models.Mixin):
+    __tablename__ = "stub_document"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    title: Mapped[str] = mapped_column(sa.String(100))
+"""
+
+
+def test_stubbing() -> None:
+    from sqlalchemy.orm import DeclarativeBase
+
+    report = StubReport(["heavy_cloud", "unused_sdk"])
+    with reporting(report), stubbing(report.patterns):
+        import heavy_cloud.tasks  # pyrefly: ignore[missing-import]
+        from heavy_cloud import Client  # pyrefly: ignore[missing-import]
+
+        @heavy_cloud.tasks.task
+        def work() -> None:
+            pass
+
+        class Base(DeclarativeBase):
+            pass
+
+        class Service(Client, Base):
+            __abstract__ = True
+
+        with Client(region="eu") as client:
+            assert list(client.list_buckets()) == []
+        assert work.__name__ == "work"
+        assert Service(timeout=5).endpoint is not None
+        assert Client | None is Client
+    assert not any(name.startswith("heavy_cloud") for name in sys.modules)
+    assert report.report() == {
+        "stubs": [
+            {"module": "heavy_cloud", "attributes": ["Client"]},
+            {"module": "heavy_cloud.tasks", "attributes": ["task"]},
+        ],
+        "unused": ["unused_sdk"],
+    }
+    with pytest.raises(ModuleNotFoundError):
+        import heavy_cloud  # noqa: F401  # pyrefly: ignore[missing-import]
+
+
+def test_cli_stub(tmp_path: Path) -> None:
+    models = tmp_path / "models"
+    models.mkdir()
+    (models / "document.py").write_text(MODELS)
+    report_path = tmp_path / "stubs.json"
+    result = CliRunner().invoke(
+        app,
+        [
+            "--path",
+            str(models),
+            "--dialect",
+            "postgresql",
+            "--no-daemon",
+            "--stub",
+            "heavy_*",
+            "--stub",
+            "app_config",
+            "--stub",
+            "torch",
+            "--stub-report",
+            str(report_path),
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    assert "CREATE TABLE stub_document" in result.stdout
+    assert "title VARCHAR(100) NOT NULL" in result.stdout
+    assert json.loads(report_path.read_text()) == {
+        "stubs": [
+            {"module": "app_config", "attributes": []},
+            {"module": "app_config.settings", "attributes": ["settings"]},
+            {"module": "heavy_cloud", "attributes": ["Client"]},
+            {"module": "heavy_cloud.tasks", "attributes": ["task"]},
+            {"module": "heavy_ml", "attributes": []},
+            {"module": "heavy_ml.models", "attributes": ["Mixin", "load"]},
+        ],
+        "unused": ["torch"],
+    }
@@ -0,0 +1,133 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+from atlas_provider_sqlalchemy import ddl
+from atlas_provider_sqlalchemy.main import Dialect
+from atlas_provider_sqlalchemy.watch import (
+    Builder,
+    InotifyWatcher,
+    PollingWatcher,
+)
+from tests.conftest import (
+    create_project,
+    write_base,
+    write_custom_type,
+    write_model,
+)
+
+
+@pytest.fixture
+def project(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    return create_project(tmp_path, monkeypatch, "watched")
+
+
+@pytest.fixture
+def builder(project: Path) -> Builder:
+    output = str(project / "schema.{dialect}.sql")
+    return Builder([Dialect.postgresql, Dialect.mysql], [project / "models"], output)
+
+
+def module(path: Path):
+    return ddl._loaded_modules[path.absolute()].module
+
+
+def test_builder_reloads_changed_files(project: Path, builder: Builder) -> None:
+    assert builder.build()
+    assert "VARCHAR(30)" in (project / "schema.postgresql.sql").read_text()
+    assert "AUTO_INCREMENT" in (project / "schema.mysql.sql").read_text()
+    assert builder.dependencies == {(project / "watched_base.py").absolute()}
+    user, team = (
+        project / "models" / "watched_user.py",
+        project / "models" / "watched_team.py",
+    )
+    team_module = module(team)
+
+    write_model(project, "watched", "User", length=60)
+    builder.invalidate({user.absolute()})
+    assert builder.build()
+    assert "VARCHAR(60)" in (project / "schema.postgresql.sql").read_text()
+    assert module(team) is team_module
+
+
+def test_builder_reloads_dependents(project: Path, builder: Builder) -> None:
+    assert builder.build()
+    team = project / "models" / "watched_team.py"
+    team_module = module(team)
+    base = write_base(project, "watched", "__abstract__ = True")
+    builder.invalidate({base.absolute()})
+    assert builder.build()
+    assert module(team) is not team_module
+    assert (project / "schema.postgresql.sql").read_text().count("CREATE TABLE") == 2
+
+
+def test_builder_reloads_changed_types(project: Path, builder: Builder) -> None:
+    write_custom_type(project, "watched", "NUMERIC(10, 2)")
+    assert builder.build()
+    types = write_custom_type(project, "watched", "NUMERIC(12, 4)")
+    builder.invalidate({types.absolute()})
+    assert builder.build()
+    assert "NUMERIC(12, 4)" in (project / "schema.postgresql.sql").read_text()
+
+
+def test_builder_keeps_output_on_error(project: Path, builder: Builder) -> None:
+    assert builder.build()
+    expected = (project / "schema.postgresql.sql").read_text()
+    (project / "models" / "broken.py").write_text("syntax error(")
+    assert not builder.build()
+    assert (project / "schema.postgresql.sql").read_text() == expected
+
+    # The tables of deleted files are removed from the output.
+    (project / "models" / "broken.py").unlink()
+    (project / "models" / "watched_team.py").unlink()
+    assert builder.build()
+    output = (project / "schema.postgresql.sql").read_text()
+    assert "watched_user" in output and "watched_team" not in output
+
+
+def test_builder_reloads_failed_file(project: Path, builder: Builder) -> None:
+    assert builder.build()
+    user = write_model(
+        project, "watched", "User", length=60, extra='raise RuntimeError("edited")'
+    )
+    builder.invalidate({user.absolute()})
+    assert not builder.build()
+
+    # The tables defined before the error don't clash with the fixed file.
+    write_model(project, "watched", "User", length=60)
+    builder.invalidate({user.absolute()})
+    assert builder.build()
+    assert "VARCHAR(60)" in (project / "schema.postgresql.sql").read_text()
+
+
+@pytest.mark.parametrize(
+    "watcher",
+    [
+        lambda: PollingWatcher(interval=0.01),
+        pytest.param(
+            InotifyWatcher,
+            marks=pytest.mark.skipif(
+                not sys.platform.startswith("linux"), reason="requires inotify"
+            ),
+        ),
+    ],
+)
+def test_watcher(project: Path, watcher) -> None:
+    w = watcher()
+    w.watch([project / "models"], [project / "watched_base.py"])
+    try:
+        assert w.wait(0.05) == set()
+        model = (project / "models" / "watched_user.py").absolute()
+        model.write_text("# changed\n")
+        assert model in w.wait(2)
+        base = (project / "watched_base.py").absolute()
+        base.write_text("# changed\n")
+        assert base in w.wait(2)
+        created = (project / "models" / "sub" / "new.py").absolute()
+        created.parent.mkdir()
+        w.wait(0.2)
+        created.write_text("")
+        assert created in w.wait(2)
+    finally:
+        w.close()